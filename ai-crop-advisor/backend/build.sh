@@ -16,6 +16,11 @@ gdown "$YIELD_MODEL_ID" -O models/yield_models.pkl
 echo "Installing Python dependencies..."
 pip install -r requirements.txt
 
+echo "Exporting memory-mappable model artifacts..."
+python -m services.model_artifacts
+python -m services.compact_model || echo "Compact crop model export skipped"
+python -m services.data_service || echo "Dataset columnar cache skipped"
+
 echo "Collecting static files and migrating database..."
 python manage.py collectstatic --no-input
 python manage.py migrate
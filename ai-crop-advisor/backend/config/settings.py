@@ -115,6 +115,38 @@ if os.getenv("DATABASE_URL"):
     DATABASES["default"] = dj_database_url.parse(os.environ.get("DATABASE_URL"))
 
 
+# Cache
+# Per-process memory by default; set REDIS_URL so all workers share one cache.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+if os.getenv("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
+# LLM explanations persist on disk across restarts; MAX_ENTRIES bounds the size.
+CACHES["explanations"] = {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+    "LOCATION": os.getenv("EXPLANATION_CACHE_DIR", str(BASE_DIR / ".cache" / "explanations")),
+    "OPTIONS": {"MAX_ENTRIES": int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "20000"))},
+}
+
+# State of background explanation jobs (explanation_mode="async"), apart from
+# "default" so other entries can't cull a job before it is polled. LocMem's
+# default MAX_ENTRIES (300) would drop jobs at about one request a second.
+CACHES["explanation_jobs"] = dict(CACHES["default"]) if os.getenv("REDIS_URL") else {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "explanation-jobs",
+    "OPTIONS": {"MAX_ENTRIES": int(os.getenv("EXPLANATION_JOB_MAX_ENTRIES", "20000"))},
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -161,3 +193,55 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
 }
 
+# ML inference
+# Serve crop probabilities from the NumPy export (python -m services.compact_model)
+ML_COMPACT_INFERENCE = os.getenv("ML_COMPACT_INFERENCE") == "True"
+
+# How often (seconds) to check models/manifest.json for a new active version
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+
+# decide_crop response cache ("local" per process, or "django" for CACHES["default"])
+DECISION_CACHE_ENABLED = os.getenv("DECISION_CACHE_ENABLED", "True") == "True"
+DECISION_CACHE_BACKEND = os.getenv("DECISION_CACHE_BACKEND", "local")
+DECISION_CACHE_MAX_ENTRIES = int(os.getenv("DECISION_CACHE_MAX_ENTRIES", "10000"))
+DECISION_CACHE_TTL_SECONDS = int(os.getenv("DECISION_CACHE_TTL_SECONDS", "3600"))
+# Decimal places input features are rounded to when building the cache key
+DECISION_CACHE_PRECISION = int(os.getenv("DECISION_CACHE_PRECISION", "1"))
+
+# LLM explanation cache (CACHES["explanations"])
+EXPLANATION_CACHE_TTL_SECONDS = int(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# pH is rounded to this step in both the cache key and the prompt
+EXPLANATION_CACHE_PH_STEP = float(os.getenv("EXPLANATION_CACHE_PH_STEP", "0.1"))
+
+# Background threads generating explanations for explanation_mode="async"
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "4"))
+# Jobs queued or running per process; beyond it async mode answers with the template
+EXPLANATION_QUEUE_SIZE = int(os.getenv("EXPLANATION_QUEUE_SIZE", "100"))
+EXPLANATION_JOBS_CACHE_ALIAS = os.getenv("EXPLANATION_JOBS_CACHE_ALIAS", "explanation_jobs")
+
+# Thread pool the async views run decide_crop on
+DECISION_THREADS = int(os.getenv("DECISION_THREADS", "4"))
+
+# Recommendation history per session ("local" per process, or "django" to
+# share it between workers through CACHES[SESSION_HISTORY_CACHE_ALIAS]; point
+# that alias at a DatabaseCache to keep history in the database)
+SESSION_HISTORY_BACKEND = os.getenv("SESSION_HISTORY_BACKEND", "local")
+SESSION_HISTORY_CACHE_ALIAS = os.getenv("SESSION_HISTORY_CACHE_ALIAS", "default")
+SESSION_HISTORY_MAX_PER_SESSION = int(os.getenv("SESSION_HISTORY_MAX_PER_SESSION", "5"))
+SESSION_HISTORY_MAX_SESSIONS = int(os.getenv("SESSION_HISTORY_MAX_SESSIONS", "10000"))
+SESSION_HISTORY_MAX_BYTES = int(os.getenv("SESSION_HISTORY_MAX_BYTES", str(32 * 1024 * 1024)))
+SESSION_HISTORY_TTL_SECONDS = int(os.getenv("SESSION_HISTORY_TTL_SECONDS", str(24 * 3600)))
+
+# Served recommendations are written to the Recommendation table in batches
+# by a background thread (services.recommendation_log)
+RECOMMENDATION_LOG_ENABLED = os.getenv("RECOMMENDATION_LOG_ENABLED", "True") == "True"
+RECOMMENDATION_LOG_BATCH_SIZE = int(os.getenv("RECOMMENDATION_LOG_BATCH_SIZE", "500"))
+RECOMMENDATION_LOG_FLUSH_SECONDS = float(os.getenv("RECOMMENDATION_LOG_FLUSH_SECONDS", "2"))
+RECOMMENDATION_LOG_MAX_QUEUE = int(os.getenv("RECOMMENDATION_LOG_MAX_QUEUE", "10000"))
+
+# MSP, cost, scale-of-finance, NPK and water tables; re-read when the file changes
+AGRONOMY_TABLES_PATH = os.getenv("AGRONOMY_TABLES_PATH", str(BASE_DIR / "data" / "agronomy_tables.json"))
+AGRONOMY_TABLES_POLL_SECONDS = int(os.getenv("AGRONOMY_TABLES_POLL_SECONDS", "60"))
+
+# How often the background health monitor re-runs the deep checks
+HEALTH_CHECK_INTERVAL_SECONDS = int(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "60"))
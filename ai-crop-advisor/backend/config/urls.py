@@ -17,11 +17,12 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
+from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
 )
-from core.views import ChatView, HealthCheckView
+from core.views import AsyncChatView, ChatView, HealthCheckView, LivenessView, ReadinessView
 
 
 urlpatterns = [
@@ -29,9 +30,12 @@ urlpatterns = [
 
     # Health
     path("api/health/", HealthCheckView.as_view()),
+    path("api/health/live/", LivenessView.as_view()),
+    path("api/health/ready/", ReadinessView.as_view()),
 
     # Chat (Ollama)
     path("api/chat/", ChatView.as_view()),
+    path("api/async/chat/", csrf_exempt(AsyncChatView.as_view())),
 
 
 
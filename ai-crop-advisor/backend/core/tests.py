@@ -1,3 +1,455 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.test import AsyncClient, Client, SimpleTestCase
+
+from services import llm_service
+from services.feature_mapper import FeatureMapper
+from services.llm_service import AsyncLLMService, AsyncSingleFlight, LLMService
+from services.system_check import PENDING, HealthMonitor, SystemCheck, readiness
+
+
+STREAM_TOKENS = ["Sow", " soybean", " after", " the", " first", " rains."]
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Chat-completions stub; the test sets `responses` to a queue of statuses."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(body)
+            server.client_ports.add(self.client_address[1])
+            status = server.responses.pop(0) if server.responses else 200
+        if server.delay:
+            server.delay.wait(5)
+        if server.latency:
+            time.sleep(server.latency)
+
+        if body.get("stream") and status == 200:
+            return self._stream_reply(server)
+
+        payload = json.dumps({"choices": [{"message": {"content": f" reply to {len(server.requests)} "}}]})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+    def _stream_reply(self, server):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        events = [{"choices": [{"delta": {"role": "assistant"}}]}]
+        events += [{"choices": [{"delta": {"content": token}}]} for token in STREAM_TOKENS]
+        for i, event in enumerate(events + ["[DONE]"]):
+            if i == 2 and server.stream_gate:
+                # Hold the rest back until the test has seen the first token.
+                server.stream_gate.wait(5)
+            data = event if isinstance(event, str) else json.dumps(event)
+            chunk = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class StubLLMServerMixin:
+
+    def setUp(self):
+        self.server = StubLLMServer(("127.0.0.1", 0), StubLLMHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.client_ports = set()
+        self.server.responses = []
+        self.server.delay = None
+        self.server.latency = 0
+        self.server.stream_gate = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        env = {
+            "GROQ_API_KEY": "test-key",
+            "GROQ_API_URL": f"http://127.0.0.1:{self.server.server_port}/v1/chat/completions",
+            "LLM_RETRY_BACKOFF": "0.01",
+        }
+        patcher = mock.patch.dict("os.environ", env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Fresh process-wide pool and limiter for every test.
+        for name in ("_session", "_limiter"):
+            patcher = mock.patch.object(llm_service, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(llm_service.stream_stats, {"streams": 0, "last_ttft_ms": None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(llm_service.single_flight_stats, {"upstream_calls": 0, "coalesced": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LLMServiceTests(StubLLMServerMixin, SimpleTestCase):
+
+    def test_connections_are_reused(self):
+        llm = LLMService()
+        replies = [llm.reason_multilingual("hello") for _ in range(3)]
+
+        self.assertEqual(replies, ["reply to 1", "reply to 2", "reply to 3"])
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_async_client_is_pooled_per_loop_and_closed_with_it(self):
+        from asgiref.sync import async_to_sync
+
+        clients = []
+
+        async def run():
+            llm = AsyncLLMService()
+            replies = [await llm.reason_multilingual("a"), await llm.reason_multilingual("b")]
+            clients.append(await llm_service.get_async_client())
+            return replies
+
+        self.assertEqual(asyncio.run(run()), ["reply to 1", "reply to 2"])
+        # One keep-alive connection within the loop, closed when it shut down.
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertTrue(clients[0].is_closed)
+
+        # Same under WSGI, where async_to_sync runs each call on a new loop.
+        async_to_sync(run)()
+        self.assertIsNot(clients[1], clients[0])
+        self.assertTrue(clients[1].is_closed)
+
+    def test_retries_on_server_errors(self):
+        self.server.responses = [503, 429]
+        self.assertEqual(LLMService().reason_multilingual("hello"), "reply to 3")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.responses = [502, 502, 502, 502]
+        reply = LLMService().reason_multilingual("hello")
+
+        self.assertTrue(reply.startswith("📝 (Groq Error: 502)"))
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.responses = [400]
+        LLMService().reason_multilingual("hello")
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_fails_fast_when_saturated(self):
+        self.server.delay = threading.Event()
+        with mock.patch.dict("os.environ", {"LLM_MAX_CONCURRENCY": "1"}):
+            busy = threading.Thread(target=LLMService().reason_multilingual, args=("slow",))
+            busy.start()
+            while not self.server.requests:
+                threading.Event().wait(0.01)
+
+            reply = LLMService().reason_multilingual("second")
+            self.server.delay.set()
+            busy.join()
+
+        self.assertTrue(reply.startswith("📝 (AI busy)"))
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class AsyncLLMServiceTests(StubLLMServerMixin, SimpleTestCase):
+
+    def test_retries_and_replies(self):
+        self.server.responses = [503]
+        reply = asyncio.run(AsyncLLMService().reason_multilingual("hello"))
+
+        self.assertEqual(reply, "reply to 2")
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_fails_fast_when_saturated(self):
+        self.server.latency = 0.2
+
+        async def run():
+            llm = AsyncLLMService()
+            return await asyncio.gather(*(llm.reason_multilingual(f"hi {i}") for i in range(3)))
+
+        with mock.patch.dict("os.environ", {"LLM_ASYNC_MAX_CONCURRENCY": "2"}):
+            replies = asyncio.run(run())
+
+        self.assertEqual(sum(r.startswith("📝 (AI busy)") for r in replies), 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    async def test_async_chat_view(self):
+        response = await AsyncClient().post(
+            "/api/async/chat/", {"message": "Best crop for black soil?", "lang": "hi"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"reply": "reply to 1"})
+        self.assertIn("Reply in Hindi", self.server.requests[0]["messages"][0]["content"])
+
+
+class SingleFlightTests(StubLLMServerMixin, SimpleTestCase):
+
+    def test_identical_prompts_share_one_call(self):
+        self.server.delay = threading.Event()
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(LLMService().reason_multilingual, "best crop for black soil") for _ in range(5)]
+            while llm_service.single_flight_stats["coalesced"] < 4:
+                time.sleep(0.01)
+            self.server.delay.set()
+            replies = [f.result() for f in futures]
+
+        self.assertEqual(replies, ["reply to 1"] * 5)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(llm_service.single_flight_stats, {"upstream_calls": 1, "coalesced": 4})
+
+    def test_finished_calls_are_not_reused(self):
+        llm = LLMService()
+        self.assertEqual([llm.reason_multilingual("hi"), llm.reason_multilingual("hi")], ["reply to 1", "reply to 2"])
+
+    def test_async_identical_prompts_share_one_call(self):
+        self.server.latency = 0.1
+
+        async def run():
+            llm = AsyncLLMService()
+            return await asyncio.gather(
+                *(llm.reason_multilingual("best crop for black soil") for _ in range(5)),
+                llm.reason_multilingual("something else"),
+            )
+
+        replies = asyncio.run(run())
+
+        self.assertEqual(len(set(replies[:5])), 1)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(llm_service.single_flight_stats, {"upstream_calls": 2, "coalesced": 4})
+
+    def test_async_leader_cancellation_does_not_fail_followers(self):
+        async def run():
+            flights = AsyncSingleFlight()
+            release = asyncio.Event()
+            calls = []
+
+            async def fetch():
+                calls.append(1)
+                await release.wait()
+                return "shared reply"
+
+            leader = asyncio.ensure_future(flights.do("key", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do("key", fetch))
+            await asyncio.sleep(0)
+
+            leader.cancel()
+            await asyncio.sleep(0)
+            release.set()
+            reply = await follower
+            # The finished call is forgotten; the next caller starts a new one.
+            await flights.do("key", fetch)
+            return leader.cancelled(), reply, len(calls)
+
+        leader_cancelled, reply, calls = asyncio.run(run())
+
+        self.assertTrue(leader_cancelled)
+        self.assertEqual(reply, "shared reply")
+        self.assertEqual(calls, 2)
+
+    def test_can_be_disabled(self):
+        self.server.latency = 0.1
+        with mock.patch.dict("os.environ", {"LLM_SINGLE_FLIGHT": "false"}):
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                list(pool.map(lambda _: LLMService().reason_multilingual("hi"), range(3)))
+        self.assertEqual(len(self.server.requests), 3)
+
+
+class LLMThroughputLoadTest(StubLLMServerMixin, SimpleTestCase):
+    """Sync pool vs. one event loop against an LLM stub with fixed latency."""
+
+    CALLS = 64
+    LATENCY = 0.2
+    SYNC_THREADS = 8
+
+    def test_async_throughput_beats_thread_pool(self):
+        self.server.latency = self.LATENCY
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.SYNC_THREADS) as pool:
+            sync_replies = list(pool.map(lambda i: LLMService().reason_multilingual(f"q{i}"), range(self.CALLS)))
+        sync_elapsed = time.perf_counter() - started
+
+        async def run():
+            llm = AsyncLLMService()
+            return await asyncio.gather(*(llm.reason_multilingual(f"q{i}") for i in range(self.CALLS)))
+
+        started = time.perf_counter()
+        async_replies = asyncio.run(run())
+        async_elapsed = time.perf_counter() - started
+
+        for reply in sync_replies + async_replies:
+            self.assertFalse(reply.startswith("📝"), reply)
+
+        # The thread pool is bound by SYNC_THREADS in flight; the event loop
+        # holds every call in flight at once.
+        self.assertGreaterEqual(sync_elapsed, self.CALLS / self.SYNC_THREADS * self.LATENCY * 0.9)
+        self.assertLess(async_elapsed, sync_elapsed / 3)
+
+
+def read_events(response) -> list:
+    body = b"".join(response.streaming_content).decode()
+    events = []
+    for block in filter(None, body.split("\n\n")):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines.get("event", "message"), json.loads(lines["data"])))
+    return events
+
+
+class LLMStreamingTests(StubLLMServerMixin, SimpleTestCase):
+
+    def test_tokens_arrive_before_the_reply_is_complete(self):
+        self.server.stream_gate = threading.Event()
+        chunks = LLMService().stream_multilingual("hello")
+
+        self.assertEqual(next(chunks), "Sow")
+        self.assertEqual(llm_service.stream_stats["streams"], 1)
+        self.assertIsNotNone(llm_service.stream_stats["last_ttft_ms"])
+
+        self.server.stream_gate.set()
+        self.assertEqual("Sow" + "".join(chunks), "".join(STREAM_TOKENS))
+        self.assertTrue(self.server.requests[0]["stream"])
+
+    def test_errors_fall_back_before_first_token(self):
+        self.server.responses = [400]
+        chunks = list(LLMService().stream_multilingual("hello"))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].startswith("📝 (Groq Error: 400)"))
+
+    def test_async_stream(self):
+        self.server.responses = [503]
+
+        async def run():
+            return [chunk async for chunk in AsyncLLMService().stream_multilingual("hello")]
+
+        self.assertEqual(asyncio.run(run()), STREAM_TOKENS)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_chat_view_streams_events(self):
+        response = self.client.post(
+            "/api/chat/", {"message": "When to sow?", "stream": True}, content_type="application/json",
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = read_events(response)
+        self.assertEqual([data["delta"] for _, data in events[:-1]], STREAM_TOKENS)
+        self.assertEqual(events[-1], ("done", {"reply": "".join(STREAM_TOKENS)}))
+
+    def test_async_chat_view_streams_events(self):
+        async def run():
+            response = await AsyncClient().post(
+                "/api/async/chat/", {"message": "When to sow?", "stream": True}, content_type="application/json",
+            )
+            body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+            return response, body
+
+        response, body = asyncio.run(run())
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn('"reply": "Sow soybean after the first rains."', body)
+
+
+class HealthTests(SimpleTestCase):
+
+    def monitor(self, **statuses):
+        """A HealthMonitor whose checks return `statuses` (or raise) without a thread."""
+        monitor = HealthMonitor(interval=60)
+        monitor.start = lambda: None
+        for name in HealthMonitor.CHECKS:
+            status = statuses.get(name, "ready")
+            check = mock.Mock(side_effect=status) if isinstance(status, Exception) else mock.Mock(return_value=status)
+            setattr(monitor.checker, f"check_{name}", check)
+        return monitor
+
+    def test_monitor_caches_each_check(self):
+        monitor = self.monitor(dataset="loaded", ml_client=RuntimeError("boom"))
+        self.assertEqual({c["status"] for c in monitor.snapshot().values()}, {PENDING})
+
+        with self.assertLogs("services.system_check", "ERROR"):
+            monitor.run_once()
+        checks = monitor.snapshot()
+        self.assertEqual({name: c["status"] for name, c in checks.items()},
+                         {"dataset": "loaded", "feature_mapper": "ready", "ml_client": "error"})
+        self.assertTrue(all(c["checked_at"] and c["duration_ms"] is not None for c in checks.values()))
+
+        # Requests read the cached results; they never run a check.
+        monitor.snapshot()
+        self.assertEqual(monitor.checker.check_dataset.call_count, 1)
+
+    def test_health_view_reports_degraded_checks(self):
+        monitor = self.monitor(dataset="error")
+        monitor.run_once()
+        with mock.patch("core.views.get_health_monitor", return_value=monitor):
+            body = Client().get("/api/health/").json()
+        self.assertEqual(body["status"], "degraded")
+        self.assertEqual(body["services"]["dataset"], "error")
+        self.assertEqual(body["services"]["api"], "up")
+
+    def test_dataset_columns_are_reread_only_when_the_file_changes(self):
+        checker = SystemCheck()
+        fingerprint = {"size_bytes": 10, "mtime_ns": 1}
+        with mock.patch("services.system_check.dataset_fingerprint", side_effect=lambda: dict(fingerprint)), \
+                mock.patch("services.system_check.DatasetService") as dataset:
+            dataset.return_value.get_columns.return_value = ["N"]
+            self.assertEqual(checker.check_dataset(), "error")
+            self.assertEqual(checker.check_dataset(), "error")
+            self.assertEqual(dataset.return_value.get_columns.call_count, 1)
+
+            fingerprint["mtime_ns"] = 2
+            dataset.return_value.get_columns.return_value = list(FeatureMapper.REQUIRED_COLUMNS)
+            self.assertEqual(checker.check_dataset(), "loaded")
+            self.assertEqual(dataset.return_value.get_columns.call_count, 2)
+
+    def readiness_patches(self, loaded_at, ml_status):
+        monitor = self.monitor(ml_client=ml_status)
+        monitor.run_once()
+        registry = mock.Mock()
+        registry.info.return_value = {"loaded_at": loaded_at, "active_version": "v1"}
+        return (
+            mock.patch("services.system_check.get_health_monitor", return_value=monitor),
+            mock.patch("services.ml_client.get_model_registry", return_value=registry),
+        )
+
+    def test_readiness(self):
+        for loaded_at, ml_status, expected in [
+            ("2026-01-01T00:00:00", "ready", True),
+            (None, "ready", False),
+            ("2026-01-01T00:00:00", "error", False),
+        ]:
+            monitor_patch, registry_patch = self.readiness_patches(loaded_at, ml_status)
+            with monitor_patch, registry_patch:
+                ready, details = readiness()
+                response = Client().get("/api/health/ready/")
+            self.assertEqual(ready, expected)
+            self.assertEqual(details["model_version"], "v1")
+            self.assertEqual(response.status_code, 200 if expected else 503)
+
+    def test_liveness_does_no_work(self):
+        with mock.patch("core.views.readiness") as ready, mock.patch("core.views.get_health_monitor") as monitor:
+            response = Client().get("/api/health/live/")
+        self.assertEqual((response.status_code, response.json()), (200, {"status": "alive"}))
+        ready.assert_not_called()
+        monitor.assert_not_called()
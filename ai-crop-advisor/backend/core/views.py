@@ -1,12 +1,15 @@
+import json
 from datetime import datetime
 
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema
 
-from services.llm_service import LLMService
-from services.system_check import SystemCheck
+from services.llm_service import AsyncLLMService, LLMService
+from services.system_check import get_health_monitor, readiness
 
 
 # -----------------------------
@@ -16,22 +19,24 @@ class HealthCheckSerializer(serializers.Serializer):
     status = serializers.CharField()
     timestamp = serializers.DateTimeField()
     services = serializers.DictField()
+    checks = serializers.DictField()
 
 
 class ChatRequestSerializer(serializers.Serializer):
     message = serializers.CharField(required=True, max_length=1000)
+    stream = serializers.BooleanField(default=False)
 
 
 class HealthCheckView(APIView):
 
     @extend_schema(
         responses=HealthCheckSerializer,
-        description="System health check endpoint"
+        description="System health from the latest background checks"
     )
     def get(self, request):
 
-        checker = SystemCheck()
-        services = checker.run_all()
+        checks = get_health_monitor().snapshot()
+        services = {"api": "up", **{name: check["status"] for name, check in checks.items()}}
 
         overall_status = "ok"
         if "error" in services.values():
@@ -41,9 +46,82 @@ class HealthCheckView(APIView):
             "status": overall_status,
             "timestamp": datetime.utcnow().isoformat(),
             "services": services,
+            "checks": checks,
         })
 
 
+class LivenessView(APIView):
+    """Process is up. Does no work, so it is safe to probe often."""
+
+    @extend_schema(responses={200: dict})
+    def get(self, request):
+        return Response({"status": "alive"})
+
+
+class ReadinessView(APIView):
+    """Ready to serve: model and price tables are loaded in this worker."""
+
+    @extend_schema(responses={200: dict, 503: dict})
+    def get(self, request):
+        ready, details = readiness()
+        return Response(
+            {"status": "ready" if ready else "not_ready", **details},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+
+def build_chat_prompt(message: str, lang: str) -> str:
+    language_hint = {
+        "en": "English",
+        "hi": "Hindi",
+        "mr": "Marathi",
+        "gu": "Gujarati",
+    }.get(lang.strip().lower(), "English")
+
+    return (
+        "You are an AI Crop Advisor for Indian farmers. "
+        "Answer clearly and practically. Keep it short unless the user asks for detail. "
+        "If you need missing info (location, season, soil pH, N/P/K, rainfall), ask 1-2 questions. "
+        f"Reply in {language_hint}.\n\n"
+        f"User: {message}\n"
+        "Assistant:"
+    )
+
+
+def _chat_event(chunk: str) -> str:
+    return f"data: {json.dumps({'delta': chunk})}\n\n"
+
+
+def _chat_done(chunks: list) -> str:
+    return f"event: done\ndata: {json.dumps({'reply': ''.join(chunks).strip()})}\n\n"
+
+
+def chat_event_stream(chunks):
+    """Server-sent events for a streamed reply: one `data` event per chunk,
+    then a `done` event carrying the full reply."""
+    seen = []
+    for chunk in chunks:
+        seen.append(chunk)
+        yield _chat_event(chunk)
+    yield _chat_done(seen)
+
+
+async def achat_event_stream(chunks):
+    seen = []
+    async for chunk in chunks:
+        seen.append(chunk)
+        yield _chat_event(chunk)
+    yield _chat_done(seen)
+
+
+def chat_stream_response(events) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream until the reply is complete.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class ChatView(APIView):
 
     @extend_schema(
@@ -55,24 +133,10 @@ class ChatView(APIView):
         serializer = ChatRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        message = serializer.validated_data["message"]
-        lang = request.data.get("lang", "en").strip().lower()
-
-        language_hint = {
-            "en": "English",
-            "hi": "Hindi",
-            "mr": "Marathi",
-            "gu": "Gujarati",
-        }.get(lang, "English")
-
-        prompt = (
-            "You are an AI Crop Advisor for Indian farmers. "
-            "Answer clearly and practically. Keep it short unless the user asks for detail. "
-            "If you need missing info (location, season, soil pH, N/P/K, rainfall), ask 1-2 questions. "
-            f"Reply in {language_hint}.\n\n"
-            f"User: {message}\n"
-            "Assistant:"
-        )
+        prompt = build_chat_prompt(serializer.validated_data["message"], request.data.get("lang", "en"))
+
+        if serializer.validated_data["stream"]:
+            return chat_stream_response(chat_event_stream(LLMService().stream_multilingual(prompt)))
 
         try:
             llm = LLMService()
@@ -87,3 +151,35 @@ class ChatView(APIView):
             )
 
         return Response({"reply": reply})
+
+
+class AsyncChatView(View):
+    """ChatView for ASGI servers, on AsyncLLMService."""
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            data = None
+
+        serializer = ChatRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        prompt = build_chat_prompt(serializer.validated_data["message"], str(data.get("lang", "en")))
+
+        if serializer.validated_data["stream"]:
+            return chat_stream_response(achat_event_stream(AsyncLLMService().stream_multilingual(prompt)))
+
+        try:
+            reply = await AsyncLLMService().reason_multilingual(prompt)
+        except Exception as exc:
+            return JsonResponse(
+                {
+                    "error": "AI service unavailable. Start Ollama and try again.",
+                    "details": str(exc),
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        return JsonResponse({"reply": reply})
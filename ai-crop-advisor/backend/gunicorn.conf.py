@@ -0,0 +1,21 @@
+"""Gunicorn settings, picked up automatically from the backend directory."""
+
+import gc
+
+# Import the Django app in the master so the ML models are loaded once and
+# shared copy-on-write by every forked worker.
+preload_app = True
+
+
+def when_ready(server):
+    from services.ml_client import preload_models
+
+    try:
+        client = preload_models()
+        server.log.info(f"Preloaded ML models ({client.model_version})")
+    except Exception as e:
+        server.log.warning(f"ML model preload skipped: {e}")
+
+    # Keep the preloaded objects out of future GC passes; collection would
+    # otherwise touch their headers and un-share the pages in each worker.
+    gc.freeze()
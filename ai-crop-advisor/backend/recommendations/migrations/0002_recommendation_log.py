@@ -0,0 +1,65 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recommendations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recommendation",
+            name="confidence",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="recommendation",
+            name="inputs",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="recommendation",
+            name="latency_ms",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="recommendation",
+            name="model_version",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="recommendation",
+            name="outputs",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="recommendation",
+            name="source",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="recommendation",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="recommendation",
+            index=models.Index(fields=["created_at"], name="rec_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recommendation",
+            index=models.Index(
+                fields=["crop", "created_at"], name="rec_crop_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recommendation",
+            index=models.Index(
+                fields=["model_version", "created_at"], name="rec_model_created_idx"
+            ),
+        ),
+    ]
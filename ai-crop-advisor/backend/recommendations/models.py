@@ -1,6 +1,24 @@
 from django.db import models
+from django.utils import timezone
+
 
-# Create your models here.
 class Recommendation(models.Model):
+    """One recommendation served by the API, written in batches by
+    services.recommendation_log."""
+
     crop = models.CharField(max_length=100)
-    created_at = models.DateTimeField(auto_now_add=True)
+    confidence = models.FloatField(null=True)
+    inputs = models.JSONField(default=dict)
+    outputs = models.JSONField(default=dict)
+    model_version = models.CharField(max_length=64, blank=True, default="")
+    source = models.CharField(max_length=64, blank=True, default="")
+    latency_ms = models.FloatField(null=True)
+    # Set when the recommendation is served, not when the batch is flushed.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="rec_created_at_idx"),
+            models.Index(fields=["crop", "created_at"], name="rec_crop_created_idx"),
+            models.Index(fields=["model_version", "created_at"], name="rec_model_created_idx"),
+        ]
@@ -7,6 +7,7 @@ class ChatRequestSerializer(serializers.Serializer):
         choices=["en", "mr", "hi", "gu"],
         default="en"
     )
+    stream = serializers.BooleanField(default=False)
 
 
 class SoilSerializer(serializers.Serializer):
@@ -39,4 +40,12 @@ class RecommendRequestSerializer(serializers.Serializer):
     lang = serializers.ChoiceField(
         choices=["en", "mr", "hi", "gu"],
         default="en"
-    )
\ No newline at end of file
+    )
+
+    # "async": answer without waiting for the LLM; poll explanation_id instead
+    explanation_mode = serializers.ChoiceField(choices=["sync", "async"], default="sync")
+
+
+class BatchRecommendRequestSerializer(serializers.Serializer):
+
+    items = RecommendRequestSerializer(many=True, allow_empty=False, max_length=10000)
@@ -1,3 +1,1279 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+import pandas as pd
+from django.test import AsyncClient, Client, SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from services.agronomy_tables import AgronomyTablesLoader, get_agronomy_tables
+from services.analytics_service import generate_farm_analytics
+from services.compact_model import COMPACT_DIRNAME, CompactCropModel, export_pipeline, save_compact_model
+from services.data_service import META_FILENAME, DatasetService, columnar_dir
+from services.decision_engine import decide_crop, decide_crop_batch
+from services.explanation_service import ExplanationService
+from services.ml_client import FAST, FAST_MODEL_FILENAME, YIELD_FEATURES, MLClient
+from services.model_artifacts import LazyYieldModels, split_yield_models
+from services.model_registry import MANIFEST_FILENAME, ModelRegistry, activate, validate_version
+from services.profit_service import calculate_profit
+from services import recommendation_log
+from services.recommendation_log import RecommendationWriter
+from services.response_cache import DjangoCacheBackend, LocalLRUBackend, ResponseCache
+from services.session_history import (
+    MAX_TEXT_CHARS, DjangoCacheHistoryBackend, LocalHistoryBackend, SessionHistoryStore, entry_bytes,
+)
+from services.vector_analytics import calculate_profits, generate_farm_analytics_batch
+from recommendations.views import BatchRecommendView, ExplanationStreamView, ModelReloadView, _candidates, _expand
+from services import explanation_jobs
+
+# ml_engine sits next to the backend and is not installed as a package.
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ENGINE_ROOT not in sys.path:
+    sys.path.append(ENGINE_ROOT)
+
+FEATURES = [
+    "N", "P", "K", "temperature", "humidity", "ph", "rainfall",
+    "NPK_ratio", "temp_humidity", "rainfall_humidity",
+]
+CROPS = ["rice", "wheat", "maize", "cotton", "banana", "coffee"]
+
+
+def build_crop_pipeline(seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 200, (400, len(FEATURES))), columns=FEATURES)
+    labels = np.array(CROPS)[(X["N"] // 20).astype(int) % len(CROPS)]
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(labels)
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("model", RandomForestClassifier(n_estimators=25, max_depth=8, random_state=seed)),
+    ]).fit(X, y)
+    return pipeline, encoder, X
+
+
+def write_crop_artifacts(models_dir, seed=0):
+    pipeline, encoder, X = build_crop_pipeline(seed)
+    joblib.dump({
+        "pipeline": pipeline,
+        "label_encoder": encoder,
+        "model_version": f"test-{seed}",
+        "features": FEATURES,
+        "accuracy": 0.9,
+    }, os.path.join(models_dir, "crop_pipeline.pkl"))
+    return pipeline, X
+
+
+class CompactModelParityTests(SimpleTestCase):
+
+    def test_predict_proba_matches_pipeline(self):
+        pipeline, _, X = build_crop_pipeline()
+        compact = CompactCropModel(export_pipeline(pipeline))
+        probe = np.random.default_rng(1).uniform(0, 200, (300, len(FEATURES)))
+
+        np.testing.assert_allclose(
+            compact.predict_proba(probe),
+            pipeline.predict_proba(pd.DataFrame(probe, columns=FEATURES)),
+            atol=1e-9,
+        )
+        np.testing.assert_allclose(
+            compact.predict_proba(X.to_numpy()), pipeline.predict_proba(X), atol=1e-9
+        )
+
+    def test_ml_client_uses_compact_model_behind_flag(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            pipeline, _ = write_crop_artifacts(models_dir)
+            save_compact_model(pipeline, os.path.join(models_dir, COMPACT_DIRNAME))
+
+            reference = MLClient(models_dir=models_dir)
+            compact = MLClient(models_dir=models_dir, compact=True)
+            self.assertIsNone(reference.compact_model)
+            self.assertIsNotNone(compact.compact_model)
+
+            features = {"N": 90, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+            self.assertEqual(reference.predict_top_k(features), compact.predict_top_k(features))
+
+    def test_unsupported_estimator_is_rejected(self):
+        pipeline = Pipeline([("scaler", StandardScaler()), ("model", LogisticRegression())])
+        with self.assertRaises(ValueError):
+            export_pipeline(pipeline)
+
+
+def write_yield_artifacts(models_dir, crops=("Rice", "Wheat", "Maize", "Cotton")):
+    from xgboost import XGBRegressor
+
+    rng = np.random.default_rng(3)
+    X = pd.DataFrame(rng.uniform(0, 10, (200, len(YIELD_FEATURES))), columns=YIELD_FEATURES)
+    season_encoder = LabelEncoder().fit(["Kharif", "Rabi"])
+    state_encoder = LabelEncoder().fit(["Maharashtra", "Gujarat"])
+    models = {
+        crop: XGBRegressor(n_estimators=20, max_depth=3, random_state=i).fit(X, X["Area"] * (i + 1))
+        for i, crop in enumerate(crops)
+    }
+    joblib.dump({
+        "crop_models": models,
+        "season_encoder": season_encoder,
+        "state_encoder": state_encoder,
+        "valid_crops": list(crops),
+    }, os.path.join(models_dir, "yield_models.pkl"))
+    return models
+
+
+def reference_yield(client, crop, features):
+    """MLClient._predict_yield as it was: one row, sklearn encoders, one predict()."""
+    key = crop.capitalize()
+    if key not in client.valid_yield_crops or key not in client.yield_models:
+        return None
+    area = float(features.get("area", 1.0))
+    fertilizer = float(features.get("N", 0) + features.get("P", 0) + features.get("K", 0))
+    pesticide = float(features.get("pesticide", 10.0))
+    encoded = []
+    for encoder, value in ((client.season_encoder, features.get("season", "Kharif")),
+                           (client.state_encoder, features.get("state", "Maharashtra"))):
+        try:
+            encoded.append(encoder.transform([value])[0])
+        except ValueError:
+            encoded.append(encoder.transform([encoder.classes_[0]])[0])
+    row = pd.DataFrame([[
+        features.get("crop_year", 2024), area, float(features.get("rainfall", 0) * 12), fertilizer, pesticide,
+        fertilizer / area if area > 0 else 0, pesticide / area if area > 0 else 0, *encoded,
+    ]], columns=YIELD_FEATURES)
+    return max(float(client.yield_models[key].predict(row)[0]), 0.0)
+
+
+class YieldPredictionTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        write_crop_artifacts(tmp.name)
+        write_yield_artifacts(tmp.name)
+        self.client_ml = MLClient(models_dir=tmp.name)
+        rng = np.random.default_rng(5)
+        self.features_list = [
+            {"N": n, "P": p, "K": k, "rainfall": r, "area": a, "season": season, "state": state}
+            for n, p, k, r, a, season, state in zip(
+                *rng.uniform(0, 200, (4, 60)).tolist(), rng.choice([0.0, 0.5, 2.0, 40.0], 60).tolist(),
+                rng.choice(["Kharif", "Rabi"], 60).tolist(), rng.choice(["Maharashtra", "Gujarat"], 60).tolist(),
+            )
+        ]
+
+    def test_grouped_yields_match_per_row_predictions(self):
+        crops = ["rice", "Wheat", "maize", "COTTON", "banana", "dragonfruit"]
+        requests = [(crop, field) for field in range(len(self.features_list)) for crop in crops]
+        yields = self.client_ml._predict_yields(requests, self.features_list)
+
+        for (crop, field), value in zip(requests, yields):
+            expected = reference_yield(self.client_ml, crop, self.features_list[field])
+            if expected is None:
+                self.assertIsNone(value)
+            else:
+                self.assertAlmostEqual(value, expected, places=4)
+        # Crops without a yield model get None, not an error.
+        self.assertIsNone(yields[crops.index("banana")])
+
+    def test_unknown_season_and_state_fall_back_like_the_encoders(self):
+        base = self.features_list[0]
+        for season, state in [("Zaid", "Atlantis"), ("kharif", "Maharashtra"), (None, "Gujarat"), ("Rabi", "")]:
+            features = {**base, "season": season, "state": state}
+            expected = []
+            for encoder, value in ((self.client_ml.season_encoder, season), (self.client_ml.state_encoder, state)):
+                try:
+                    expected.append(int(encoder.transform([value])[0]))
+                except ValueError:
+                    expected.append(int(encoder.transform(encoder.classes_[:1])[0]))
+            self.assertEqual(self.client_ml._yield_row(features)[-2:], expected)
+            self.assertAlmostEqual(self.client_ml._predict_yield("rice", features),
+                                   reference_yield(self.client_ml, "rice", features), places=4)
+
+
+class ModelArtifactTests(SimpleTestCase):
+
+    def test_split_yield_models_load_only_scored_crops(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            write_crop_artifacts(models_dir)
+            write_yield_artifacts(models_dir)
+            single = MLClient(models_dir=models_dir)
+            split_yield_models(models_dir)
+            split = MLClient(models_dir=models_dir)
+
+            self.assertIsInstance(split.yield_models, LazyYieldModels)
+            self.assertEqual(split.yield_models.loaded_count, 0)
+
+            features = {"N": 90, "P": 40, "K": 40, "rainfall": 200, "area": 2.0}
+            expected = single._predict_yield("rice", features)
+            self.assertIsNotNone(expected)
+            self.assertEqual(split._predict_yield("rice", features), expected)
+            # Only the scored crop was read from disk.
+            self.assertEqual(split.yield_models.loaded_count, 1)
+            self.assertEqual(set(split.yield_models), set(single.yield_models))
+
+    def test_compact_crop_model_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            pipeline, _ = write_crop_artifacts(models_dir)
+            save_compact_model(pipeline, os.path.join(models_dir, COMPACT_DIRNAME))
+            compact = MLClient(models_dir=models_dir, compact=True).compact_model
+
+            # Read-only page-cache mappings, shared by every worker process.
+            for array in (compact.left, compact.right, compact.threshold, compact.value):
+                self.assertIsInstance(array, np.memmap)
+
+
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.models_dir = tmp.name
+        for seed, version in enumerate(["v1", "v2"]):
+            os.makedirs(os.path.join(self.models_dir, version))
+            write_crop_artifacts(os.path.join(self.models_dir, version), seed)
+        activate("v1", self.models_dir)
+        self.registry = ModelRegistry(self.models_dir, poll_seconds=0)
+
+    def get_after_reload(self):
+        """get(), then wait for any background reload it started."""
+        self.registry.get()
+        deadline = time.monotonic() + 10
+        while self.registry.info()["reloading"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.registry.get()
+
+    def test_activating_a_version_swaps_the_client(self):
+        old = self.registry.get()
+        self.assertEqual(old.model_version, "test-0")
+
+        activate("v2", self.models_dir)
+        new = self.get_after_reload()
+
+        self.assertEqual(new.model_version, "test-1")
+        self.assertEqual(self.registry.info()["active_version"], "v2")
+        self.assertEqual(self.registry.info()["reload_count"], 1)
+        # Holders of the old client keep a working model.
+        self.assertEqual(old.model_version, "test-0")
+
+    def test_failed_reload_keeps_old_client_and_is_retried(self):
+        self.registry.get()
+        os.makedirs(os.path.join(self.models_dir, "v3"))
+        with open(os.path.join(self.models_dir, "v3", "crop_pipeline.pkl"), "wb") as f:
+            f.write(b"half-copied")
+
+        activate("v3", self.models_dir)
+        client = self.get_after_reload()
+        self.assertEqual(client.model_version, "test-0")
+        self.assertIsNotNone(self.registry.info()["last_error"])
+
+        # Once the files are fixed the next poll loads them, without another
+        # manifest change.
+        write_crop_artifacts(os.path.join(self.models_dir, "v3"), seed=3)
+        client = self.get_after_reload()
+        self.assertEqual(client.model_version, "test-3")
+        self.assertIsNone(self.registry.info()["last_error"])
+
+    def test_versions_outside_models_dir_are_rejected(self):
+        for version in ["../v1", "/tmp", "v1/../v2", "..", "", None, "a\\b"]:
+            with self.subTest(version=version):
+                with self.assertRaises(ValueError):
+                    validate_version(version)
+        with self.assertRaises(ValueError):
+            self.registry._resolve("../" + os.path.basename(self.models_dir))
+
+    def post_reload(self, body):
+        request = APIRequestFactory().post("/api/model-info/reload/", body, format="json")
+        force_authenticate(request, user=mock.Mock(is_staff=True, is_authenticated=True))
+        with mock.patch("recommendations.views.get_model_registry", return_value=self.registry):
+            return ModelReloadView.as_view()(request)
+
+    def test_reload_view_activates_for_every_worker(self):
+        self.registry.get()
+        response = self.post_reload({"version": "v2"})
+        self.assertEqual(response.status_code, 202)
+
+        with open(os.path.join(self.models_dir, MANIFEST_FILENAME)) as f:
+            self.assertEqual(json.load(f)["active"], "v2")
+        # A second worker's registry follows the manifest.
+        other = ModelRegistry(self.models_dir, poll_seconds=0)
+        self.assertEqual(other.get().model_version, "test-1")
+
+    def test_reload_view_rejects_bad_versions(self):
+        self.assertEqual(self.post_reload({"version": "../../etc"}).status_code, 400)
+        self.assertEqual(self.post_reload({"version": "missing"}).status_code, 404)
+        with open(os.path.join(self.models_dir, MANIFEST_FILENAME)) as f:
+            self.assertEqual(json.load(f)["active"], "v1")
+
+
+class FastTierTests(SimpleTestCase):
+
+    def write_student(self, models_dir, pipeline, X, classes=None):
+        student = DecisionTreeRegressor(max_depth=6, random_state=0).fit(X.to_numpy(), pipeline.predict_proba(X))
+        joblib.dump({
+            "pipeline": Pipeline([("student", student)]),
+            "classes": pipeline.classes_ if classes is None else classes,
+            "features": FEATURES,
+            "model_version": "test-0-fast",
+            "teacher_version": "test-0",
+            "metrics": {"top1_agreement": 0.99},
+        }, os.path.join(models_dir, FAST_MODEL_FILENAME))
+        return student
+
+    def test_fast_tier_serves_distilled_student(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            pipeline, X = write_crop_artifacts(models_dir)
+            student = self.write_student(models_dir, pipeline, X)
+            client = MLClient(models_dir=models_dir)
+
+            probe = np.random.default_rng(2).uniform(0, 200, (50, len(FEATURES)))
+            features_list = [dict(zip(FEATURES, row)) for row in probe.tolist()]
+            expected = student.predict(np.array([client._enrich_row(f) for f in features_list]))
+            np.testing.assert_allclose(client._predict_proba(features_list, FAST), expected, atol=1e-9)
+
+            self.assertEqual(client.version_for(FAST), "test-0-fast")
+            self.assertEqual(client.version_for(None), "test-0")
+            self.assertEqual(client.fast_info["top1_agreement"], 0.99)
+            self.assertEqual(client.predict(features_list[0], tier=FAST)["model_version"], "test-0-fast")
+            np.testing.assert_allclose(
+                client._predict_proba(features_list), pipeline.predict_proba(pd.DataFrame(
+                    [client._enrich_row(f) for f in features_list], columns=FEATURES)), atol=1e-12,
+            )
+
+    def test_mismatched_student_falls_back_to_main_model(self):
+        with tempfile.TemporaryDirectory() as models_dir:
+            pipeline, X = write_crop_artifacts(models_dir)
+            self.write_student(models_dir, pipeline, X, classes=pipeline.classes_[::-1])
+            client = MLClient(models_dir=models_dir)
+
+            self.assertIsNone(client.fast_model)
+            self.assertEqual(client.version_for(FAST), "test-0")
+            features = {"N": 90, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200}
+            self.assertEqual(client.predict_top_k(features, tier=FAST), client.predict_top_k(features))
+
+    def test_distill_script_writes_loadable_student(self):
+        from ml_engine.trainers.distill_crop_model import distill
+
+        with tempfile.TemporaryDirectory() as models_dir:
+            pipeline, X = write_crop_artifacts(models_dir)
+            dataset = os.path.join(models_dir, "scenarios.csv")
+            X[FEATURES[:7]].assign(label="rice").to_csv(dataset, index=False)
+            with mock.patch("builtins.print"):
+                report = distill([dataset], teacher_dir=models_dir, max_depth=6)
+
+            metrics = report["metrics"]
+            for key in ("top1_agreement", "top5_agreement", "sklearn_top1_agreement",
+                        "student_latency_ms", "student_sklearn_latency_ms"):
+                self.assertIn(key, metrics)
+            self.assertGreater(metrics["top1_agreement"], 0.5)
+
+            client = MLClient(models_dir=models_dir)
+            self.assertIsNotNone(client.fast_model)
+            self.assertEqual(client.version_for(FAST), "test-0-fast")
+            self.assertEqual(client.fast_info["top1_agreement"], metrics["top1_agreement"])
+
+
+def random_requests(n, seed=0):
+    """n valid /api/recommend/ bodies."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "soil": {"N": n_, "P": p, "K": k, "ph": ph},
+            "climate": {"temperature": t, "humidity": h, "rainfall": r},
+            "area": area,
+        }
+        for n_, p, k, ph, t, h, r, area in zip(
+            *rng.uniform(0, 200, (3, n)).round(1), rng.uniform(4, 9, n).round(1),
+            rng.uniform(10, 40, n).round(1), rng.uniform(10, 100, n).round(1),
+            rng.uniform(0, 500, n).round(1), rng.choice([0.5, 1.0, 2.5], n),
+        )
+    ]
+
+
+class DecisionEngineMixin:
+    """Toy crop and yield models behind decision_engine, with a fresh cache."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        write_crop_artifacts(tmp.name)
+        write_yield_artifacts(tmp.name, crops=("Rice", "Wheat", "Maize", "Cotton", "Banana", "Coffee"))
+        self.client_ml = MLClient(models_dir=tmp.name)
+        self.decision_cache = ResponseCache(LocalLRUBackend())
+        for name, value in (("get_ml_client", self.client_ml), ("get_decision_cache", self.decision_cache)):
+            patcher = mock.patch(f"services.decision_engine.{name}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class RankingParityTests(DecisionEngineMixin, SimpleTestCase):
+
+    def test_single_and_batch_candidates_match(self):
+        features_list = [
+            {**r["soil"], **r["climate"], "area": r["area"]} for r in random_requests(300)
+        ]
+        batch = self.client_ml.predict_top_k_batch(features_list, k=5)
+        probs = self.client_ml._predict_proba(features_list)
+        # 25 trees: ties between classes are common.
+        self.assertTrue(any(len(set(row)) < len(row) for row in np.sort(probs, axis=1)[:, -5:].tolist()))
+
+        expected_order = np.argsort(-probs, axis=1, kind="stable")[:, :5]
+        for features, candidates, order in zip(features_list, batch, expected_order):
+            self.assertEqual(self.client_ml.predict_top_k(features, k=5), candidates)
+            self.assertEqual([c["crop"] for c in candidates], self.client_ml.crop_names[order].tolist())
+
+    @override_settings(DECISION_CACHE_ENABLED=False)
+    def test_decide_crop_matches_batch(self):
+        requests = random_requests(100, seed=1)
+        for data, result in zip(requests, decide_crop_batch(requests)):
+            self.assertEqual(decide_crop(data), result)
+
+
+@override_settings(RECOMMENDATION_LOG_ENABLED=False)
+class BatchRecommendViewTests(DecisionEngineMixin, SimpleTestCase):
+
+    def post(self, items):
+        return Client().post("/api/recommend/batch/", {"items": items}, content_type="application/json")
+
+    def lines(self, response):
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.endswith("\n"))
+        return [json.loads(line) for line in body.splitlines()]
+
+    @mock.patch.object(BatchRecommendView, "CHUNK_SIZE", 4)
+    def test_results_stream_in_order_across_chunks(self):
+        items = random_requests(10)
+        response = self.post(items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(response["X-Batch-Size"], "10")
+
+        lines = self.lines(response)
+        self.assertEqual([line["index"] for line in lines], list(range(10)))
+        expected = decide_crop_batch([{**item, "last_crop": None, "state": "Maharashtra", "season": "Kharif",
+                                       "pesticide": 0.0, "crop_year": 2024} for item in items])
+        for line, result in zip(lines, expected):
+            self.assertEqual(line["recommendation"]["crop"], result["crop"])
+            self.assertEqual(line["candidates"], result["candidates"])
+            self.assertNotIn("explanation", line)
+
+    def test_batch_items_share_the_decision_cache(self):
+        items = random_requests(6)
+        first = self.lines(self.post(items))
+        self.assertEqual((self.decision_cache.hits, self.decision_cache.misses), (0, 6))
+
+        # A single request for the same field is served from the batch's entry.
+        with mock.patch.object(ExplanationService, "generate", return_value="Grow it."):
+            single = Client().post("/api/recommend/", items[2], content_type="application/json")
+        self.assertEqual((self.decision_cache.hits, self.decision_cache.misses), (1, 6))
+        self.assertEqual(single.json()["candidates"], first[2]["candidates"])
+
+        self.assertEqual(self.lines(self.post(items)), first)
+        self.assertEqual((self.decision_cache.hits, self.decision_cache.misses), (7, 6))
+
+    def test_invalid_items_are_reported_per_item(self):
+        items = random_requests(3)
+        items[1]["soil"]["ph"] = 12
+        response = self.post(items)
+        self.assertEqual(response.status_code, 400)
+        # Keyed by the index of each invalid item.
+        errors = response.json()["items"]
+        self.assertEqual(list(errors), ["1"])
+        self.assertIn("ph", errors["1"]["soil"])
+
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_more_than_10000_items_are_rejected(self):
+        response = self.post(random_requests(1) * 10001)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("items", response.json())
+
+
+class TopKRankingTests(SimpleTestCase):
+
+    def test_matches_stable_argsort_with_ties(self):
+        from ml_engine.models.crop_suitability import top_k_indices
+
+        row = np.array([[2, 3, 3, 2, 2, 2, 3, 1, 3]], dtype=float)
+        np.testing.assert_array_equal(top_k_indices(row, 7), [[1, 2, 6, 8, 0, 3, 4]])
+
+        rng = np.random.default_rng(5)
+        for _ in range(200):
+            n_rows, n_classes = rng.integers(1, 30), rng.integers(1, 25)
+            # Few distinct values, mostly zeros: like forest probabilities.
+            probs = rng.choice([0.0, 0.0, 0.0, 0.1, 0.25, 0.5], size=(n_rows, n_classes))
+            for k in (0, 1, 3, n_classes - 1, n_classes, n_classes + 2):
+                expected = np.argsort(-probs, axis=1, kind="stable")[:, :max(0, min(k, n_classes))]
+                np.testing.assert_array_equal(top_k_indices(probs, k), expected)
+
+    def test_batch_matches_single_row_ranking(self):
+        from ml_engine.models.crop_suitability import CropSuitabilityModel
+
+        rng = np.random.default_rng(6)
+        model = CropSuitabilityModel(n_estimators=5, max_depth=3)
+        features = pd.DataFrame(rng.uniform(0, 200, (300, len(model.features))), columns=model.features)
+        model.train(features.assign(label=np.array(CROPS)[rng.integers(len(CROPS), size=300)]))
+
+        batch = model.predict_top_k_batch(features.head(50), k=4)
+        singles = [model.predict_top_k(row, k=4) for row in features.head(50).to_dict("records")]
+        self.assertEqual(batch, singles)
+        for row, ranked in zip(model._predict_proba(features.head(50).to_numpy()), batch):
+            order = np.argsort(-row, kind="stable")[:4]
+            self.assertEqual([crop for crop, _ in ranked], model.class_names[order].tolist())
+
+
+class VectorAnalyticsParityTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 500
+        self.crops = list(rng.choice(list(get_agronomy_tables().crops) + ["rice", "dragonfruit"], n))
+        self.soils = [{"N": n_, "P": p, "K": k} for n_, p, k in rng.uniform(0, 300, (n, 3)).tolist()]
+        self.climates = [
+            {"temperature": t, "humidity": h, "rainfall": r}
+            for t, h, r in zip(rng.uniform(10, 45, n).tolist(), rng.uniform(10, 100, n).tolist(), rng.uniform(0, 2500, n).tolist())
+        ]
+        self.areas = rng.choice([0.005, 1.0, 2.5, 40.0], n).tolist()
+        self.yields = rng.uniform(0, 150, n).tolist()
+
+    def test_profits_match_scalar(self):
+        expected = [calculate_profit(*args) for args in zip(self.crops, self.yields, self.areas)]
+        self.assertEqual(calculate_profits(self.crops, self.yields, self.areas), expected)
+
+    def test_analytics_match_scalar(self):
+        expected = [generate_farm_analytics(*args) for args in zip(self.crops, self.soils, self.climates, self.areas)]
+        self.assertEqual(generate_farm_analytics_batch(self.crops, self.soils, self.climates, self.areas), expected)
+
+
+class RecommendationWriterTests(SimpleTestCase):
+
+    def setUp(self):
+        from recommendations.models import Recommendation
+
+        self.batches = []
+        patcher = mock.patch.object(
+            Recommendation.objects, "bulk_create", side_effect=lambda rows, **kwargs: self.batches.append(list(rows)),
+        )
+        self.bulk_create = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rows_are_written_in_batches_and_flushed_on_close(self):
+        writer = RecommendationWriter(batch_size=3, flush_seconds=60)
+        for i in range(7):
+            self.assertTrue(writer.submit(i))
+        writer.close()
+
+        self.assertEqual(sum(self.batches, []), list(range(7)))
+        self.assertEqual([len(b) for b in self.batches], [3, 3, 1])
+        self.assertEqual(writer.info(), {
+            "queued": 7, "written": 7, "dropped": 0, "failed": 0, "batches": 3, "pending": 0,
+        })
+
+    def test_partial_batch_is_flushed_after_flush_seconds(self):
+        writer = RecommendationWriter(batch_size=100, flush_seconds=0.05)
+        self.addCleanup(writer.close)
+        writer.submit("row")
+        deadline = time.monotonic() + 5
+        while not self.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.batches, [["row"]])
+
+    def test_full_queue_drops_rows_instead_of_blocking(self):
+        import threading
+
+        release = threading.Event()
+
+        def slow_bulk_create(rows, **kwargs):
+            release.wait(5)
+            self.batches.append(list(rows))
+
+        self.bulk_create.side_effect = slow_bulk_create
+        writer = RecommendationWriter(batch_size=1, flush_seconds=0, max_queue=1)
+
+        writer.submit(0)
+        deadline = time.monotonic() + 5
+        while writer.info()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The writer thread is stuck on row 0; row 1 fills the queue.
+        self.assertTrue(writer.submit(1))
+        self.assertFalse(writer.submit(2))
+        release.set()
+        writer.close()
+
+        self.assertEqual(sum(self.batches, []), [0, 1])
+        self.assertEqual(writer.info()["dropped"], 1)
+
+    def test_counters_are_exact_under_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        writer = RecommendationWriter(batch_size=50, flush_seconds=60, max_queue=100)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: [writer.submit(i) for _ in range(500)], range(8)))
+        writer.close()
+        info = writer.info()
+        self.assertEqual(info["queued"] + info["dropped"], 4000)
+        self.assertEqual(info["written"], info["queued"])
+
+    def test_failed_batches_are_counted(self):
+        self.bulk_create.side_effect = RuntimeError("database is down")
+        writer = RecommendationWriter(batch_size=2, flush_seconds=60)
+        for i in range(2):
+            writer.submit(i)
+        with self.assertLogs("services.recommendation_log", "ERROR"):
+            writer.close()
+        self.assertEqual((writer.info()["failed"], writer.info()["written"]), (2, 0))
+
+
+class RecommendationLogDatabaseTests(TransactionTestCase):
+    """The writer thread has its own connection, so rows must be committed."""
+
+    def test_recorded_recommendations_reach_the_table(self):
+        from recommendations.models import Recommendation
+
+        writer = RecommendationWriter(batch_size=2, flush_seconds=60)
+        result = {"crop": "Rice", "confidence": 0.8, "model_version": "test-0", "source": "ml",
+                  "financials": {"net_profit": 1.0}}
+        with mock.patch("services.recommendation_log.get_recommendation_writer", return_value=writer):
+            for i in range(3):
+                recommendation_log.record({"soil": {"N": i}}, result, latency_ms=12.34, explanation="Grow rice.")
+        writer.close()
+
+        self.assertEqual(writer.info()["written"], 3)
+        self.assertEqual(Recommendation.objects.count(), 3)
+        row = Recommendation.objects.order_by("id").last()
+        self.assertEqual((row.crop, row.model_version, row.latency_ms), ("Rice", "test-0", 12.3))
+        self.assertEqual(row.inputs, {"soil": {"N": 2}})
+        self.assertEqual(row.outputs["explanation"], "Grow rice.")
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(LocalLRUBackend(max_entries=2))
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(LocalLRUBackend(ttl=60))
+        with mock.patch("services.response_cache.time.monotonic", return_value=1000.0):
+            cache.set("a", 1)
+        with mock.patch("services.response_cache.time.monotonic", return_value=1059.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("services.response_cache.time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_cached_values_are_copies(self):
+        cache = ResponseCache(LocalLRUBackend())
+        value = {"crops": ["rice"]}
+        cache.set("a", value)
+        value["crops"].append("wheat")
+        cache.get("a")["crops"].append("maize")
+        self.assertEqual(cache.get("a"), {"crops": ["rice"]})
+
+    def test_counters_are_exact_under_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        cache = ResponseCache(LocalLRUBackend())
+        cache.set("hit", 1)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: [cache.get("hit" if i % 2 else "miss") for _ in range(500)], range(16)))
+        self.assertEqual((cache.hits, cache.misses), (4000, 4000))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_django_backend_clears_only_its_prefix(self):
+        from django.core.cache import caches
+
+        shared = caches["default"]
+        self.addCleanup(shared.clear)
+        shared.set("unrelated", "kept")
+        mine = ResponseCache(DjangoCacheBackend(prefix="mine"))
+        other = ResponseCache(DjangoCacheBackend(prefix="other"))
+        mine.set("k", {"v": 1})
+        other.set("k", {"v": 2})
+
+        mine.clear()
+        self.assertIsNone(mine.get("k"))
+        self.assertEqual(other.get("k"), {"v": 2})
+        self.assertEqual(shared.get("unrelated"), "kept")
+
+        mine.set("k", {"v": 3})
+        self.assertEqual(mine.get("k"), {"v": 3})
+        # Entries written before generations existed read as misses.
+        shared.set("mine:legacy", "text")
+        self.assertIsNone(mine.get("legacy"))
+
+
+class ExplanationCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache(LocalLRUBackend())
+        patcher = mock.patch("services.explanation_service.get_explanation_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = ExplanationService()
+
+    def test_async_mode_counts_one_miss_per_request(self):
+        with mock.patch.object(self.service.llm, "reason_multilingual", return_value="Plant rice."):
+            self.assertIsNone(self.service.cached("rice", 6.47))
+            self.assertEqual(self.service.generate("rice", 6.47, recheck=True), "Plant rice.")
+            self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+            self.assertEqual(self.service.cached("rice", 6.52), "Plant rice.")
+            self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_fallback_quotes_the_raw_ph(self):
+        with mock.patch.object(self.service.llm, "reason_multilingual", side_effect=RuntimeError("down")):
+            text = self.service.generate("rice", 6.47)
+        self.assertIn("soil pH of 6.47", text)
+        self.assertIsNone(self.service.cached("rice", 6.47))
+
+
+class SessionHistoryTests(SimpleTestCase):
+
+    def entry(self, i):
+        return {"crop": f"crop-{i}", "confidence": 0.5, "timestamp": f"t{i}"}
+
+    def test_local_history_keeps_newest_entries(self):
+        backend = LocalHistoryBackend(max_per_session=3)
+        for i in range(5):
+            backend.add("s", self.entry(i))
+        self.assertEqual([e["crop"] for e in backend.get("s")], ["crop-2", "crop-3", "crop-4"])
+        self.assertEqual(backend.stats()["approx_bytes"], sum(entry_bytes(self.entry(i)) for i in range(2, 5)))
+
+        backend.clear("s")
+        self.assertEqual(backend.get("s"), [])
+        self.assertEqual(backend.stats()["approx_bytes"], 0)
+
+    def test_least_recently_used_sessions_are_evicted(self):
+        backend = LocalHistoryBackend(max_sessions=2)
+        backend.add("a", self.entry(0))
+        backend.add("b", self.entry(1))
+        backend.get("a")
+        backend.add("c", self.entry(2))
+        self.assertEqual(backend.get("b"), [])
+        self.assertEqual(len(backend.get("a")), 1)
+        self.assertEqual(backend.stats()["evictions"], 1)
+
+    def test_byte_budget_evicts_sessions(self):
+        size = entry_bytes(self.entry(0))
+        backend = LocalHistoryBackend(max_bytes=size * 3)
+        for session in "abcde":
+            backend.add(session, self.entry(0))
+        self.assertEqual(backend.stats()["sessions"], 3)
+        self.assertLessEqual(backend.stats()["approx_bytes"], size * 3)
+        self.assertEqual(backend.get("a"), [])
+
+    def test_idle_sessions_expire(self):
+        backend = LocalHistoryBackend(ttl=60)
+        with mock.patch("services.session_history.time.monotonic", return_value=1000.0):
+            backend.add("s", self.entry(0))
+        with mock.patch("services.session_history.time.monotonic", return_value=1061.0):
+            self.assertEqual(backend.get("s"), [])
+        self.assertEqual(backend.stats()["expirations"], 1)
+
+    def test_long_crop_names_are_truncated(self):
+        store = SessionHistoryStore(LocalHistoryBackend())
+        store.add("s", "x" * 10000, 0.9)
+        self.assertEqual(len(store.get("s")[0]["crop"]), MAX_TEXT_CHARS)
+
+    def test_shared_history_appends_concurrently(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from django.core.cache import caches
+
+        backend = DjangoCacheHistoryBackend(max_per_session=50, prefix="test_history")
+        self.addCleanup(caches["default"].clear)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: backend.add("s", self.entry(i)), range(40)))
+        self.assertEqual(sorted(e["crop"] for e in backend.get("s")), sorted(f"crop-{i}" for i in range(40)))
+
+        trimmed = DjangoCacheHistoryBackend(max_per_session=3, prefix="test_history")
+        for i in range(5):
+            trimmed.add("t", self.entry(i))
+        self.assertEqual([e["crop"] for e in trimmed.get("t")], ["crop-2", "crop-3", "crop-4"])
+        trimmed.clear("t")
+        self.assertEqual(trimmed.get("t"), [])
+
+
+class CandidateExpansionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.data = {
+            "soil": {"N": 90, "P": 40, "K": 40, "ph": 6.5},
+            "climate": {"temperature": 25, "humidity": 80, "rainfall": 200},
+            "area": 2.0,
+        }
+        self.result = {"crop": "Rice", "candidates": [
+            {"crop": "Rice", "confidence": 0.6, "estimated_yield": 40.0, "financials": {"net_profit": 1.0}},
+            {"crop": "Wheat", "confidence": 0.3, "estimated_yield": 30.0, "financials": {"net_profit": 2.0}},
+        ]}
+
+    def test_only_known_parts_are_expanded(self):
+        request = APIRequestFactory().get("/api/recommend/", {"expand": " candidates.analytics ,bogus,"})
+        self.assertEqual(_expand(request), {"candidates.analytics"})
+        self.assertEqual(_expand(APIRequestFactory().get("/api/recommend/")), set())
+
+    def test_candidates_are_copied_without_analytics_by_default(self):
+        candidates = _candidates([(self.data, self.result)], set())[0]
+        self.assertEqual(candidates, self.result["candidates"])
+        candidates[0]["crop"] = "changed"
+        self.assertEqual(self.result["candidates"][0]["crop"], "Rice")
+        self.assertNotIn("analytics", self.result["candidates"][0])
+
+    def test_expanded_analytics_match_scalar(self):
+        other = ({**self.data, "area": 0.5}, {"candidates": self.result["candidates"][1:]})
+        expanded = _candidates([(self.data, self.result), other, (self.data, {"candidates": []})],
+                               {"candidates.analytics"})
+
+        for (data, _), candidates in zip([(self.data, None), other], expanded):
+            for candidate in candidates:
+                self.assertEqual(candidate["analytics"], generate_farm_analytics(
+                    candidate["crop"], data["soil"], data["climate"], data["area"]))
+        self.assertEqual(expanded[2], [])
+        # The cached decision result is never modified.
+        self.assertNotIn("analytics", self.result["candidates"][0])
+
+
+class AgronomyTablesReloadTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "agronomy_tables.json")
+        self.mtime_ns = time.time_ns()
+        self.write("v1", 2300)
+        self.loader = AgronomyTablesLoader(self.path, poll_seconds=None)
+
+    def touch(self):
+        # A second per write: distinct mtimes even on coarse-grained filesystems.
+        self.mtime_ns += int(1e9)
+        os.utime(self.path, ns=(self.mtime_ns, self.mtime_ns))
+
+    def write(self, version, rice_msp):
+        defaults = {"msp_per_quintal": 3000, "cost_per_hectare": 40000, "scale_of_finance": 45000,
+                    "ideal_npk": {"N": 100, "P": 50, "K": 50}, "water_req_mm": 800}
+        with open(self.path, "w") as f:
+            json.dump({"version": version, "defaults": defaults,
+                       "crops": {"Rice": {"msp_per_quintal": rice_msp, "ideal_npk": {"N": 120}}}}, f)
+        self.touch()
+
+    def test_changed_file_is_swapped_in(self):
+        old = self.loader.get()
+        self.assertEqual((old.version, old.value("msp_per_quintal", "rice")), ("v1", 2300))
+        self.assertEqual(old.value("ideal_p", "Rice"), 50)
+        self.assertEqual(old.value("msp_per_quintal", "dragonfruit"), 3000)
+        self.assertFalse(self.loader.reload_if_changed())
+
+        self.write("v2-new", 2400)
+        self.assertTrue(self.loader.reload_if_changed())
+        new = self.loader.get()
+        self.assertEqual((new.version, new.value("msp_per_quintal", "RICE")), ("v2-new", 2400))
+        # Readers holding the old snapshot keep consistent values.
+        self.assertEqual(old.value("msp_per_quintal", "rice"), 2300)
+        self.assertEqual(self.loader.info()["reload_count"], 1)
+
+    def test_invalid_file_keeps_previous_tables(self):
+        self.loader.get()
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.touch()
+
+        with self.assertLogs("services.agronomy_tables", "ERROR"):
+            self.assertFalse(self.loader.reload_if_changed())
+        self.assertEqual(self.loader.get().version, "v1")
+        self.assertIsNotNone(self.loader.info()["last_error"])
+
+    def test_edit_without_version_bump_changes_decision_cache_key(self):
+        from services.decision_engine import _cache_key
+
+        data = {"soil": {"N": 90}, "climate": {"rainfall": 200}}
+        with mock.patch("services.decision_engine.get_agronomy_tables", side_effect=self.loader.get):
+            before = _cache_key(data, "test-0")
+            self.write("v1", 2400)
+            self.loader.reload_if_changed()
+            self.assertEqual(self.loader.get().version, "v1")
+            self.assertNotEqual(_cache_key(data, "test-0"), before)
+
+    def test_get_polls_at_most_every_poll_seconds(self):
+        loader = AgronomyTablesLoader(self.path, poll_seconds=60)
+        with mock.patch("services.agronomy_tables.time.monotonic", return_value=1000.0):
+            loader.get()
+            self.write("v2-new", 2400)
+            self.assertEqual(loader.get().version, "v1")
+        with mock.patch("services.agronomy_tables.time.monotonic", return_value=1061.0):
+            self.assertEqual(loader.get().version, "v2-new")
+
+
+class ColumnarDatasetTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.csv_path = os.path.join(tmp.name, "scenarios.csv")
+        self.write_csv(rows=50)
+
+    def write_csv(self, rows, seed=0):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame(rng.uniform(0, 200, (rows, 3)), columns=["N", "P", "rainfall"])
+        df["label"] = rng.choice(CROPS, rows)
+        df.to_csv(self.csv_path, index=False)
+        return df
+
+    def test_columns_round_trip_and_project(self):
+        expected = pd.read_csv(self.csv_path)
+        service = DatasetService(self.csv_path)
+
+        df = service.load_dataset(columns=["rainfall", "label"])
+        self.assertEqual(list(df.columns), ["rainfall", "label"])
+        np.testing.assert_allclose(df["rainfall"], expected["rainfall"], rtol=1e-6)
+        self.assertEqual(list(df["label"]), list(expected["label"]))
+        self.assertEqual(len(service.load_dataset(nrows=5)), 5)
+
+        stats = service.get_stats()
+        self.assertNotIn("label", stats)
+        self.assertAlmostEqual(stats["N"]["mean"], expected["N"].mean())
+        self.assertEqual(stats["P"]["max"], expected["P"].max())
+        with self.assertRaises(ValueError):
+            service.load_dataset(columns=["missing"])
+
+    def test_cache_is_rebuilt_when_the_csv_changes(self):
+        DatasetService(self.csv_path).get_meta()
+        meta_path = columnar_dir(Path(self.csv_path)) / META_FILENAME
+        built_at = os.stat(meta_path).st_mtime_ns
+
+        # An unchanged CSV reuses the cache.
+        self.assertEqual(DatasetService(self.csv_path).get_meta()["rows"], 50)
+        self.assertEqual(os.stat(meta_path).st_mtime_ns, built_at)
+
+        expected = self.write_csv(rows=80, seed=1)
+        service = DatasetService(self.csv_path)
+        self.assertEqual(service.get_meta()["rows"], 80)
+        np.testing.assert_allclose(service.load_dataset(columns=["N"])["N"], expected["N"], rtol=1e-6)
+
+    def test_unwritable_cache_falls_back_to_the_csv(self):
+        with mock.patch("services.data_service.build_columnar_cache", side_effect=PermissionError("read-only")):
+            service = DatasetService(self.csv_path)
+            self.assertEqual(service.get_columns(), ["N", "P", "rainfall", "label"])
+            self.assertEqual(len(service.load_dataset(columns=["N"], nrows=3)), 3)
+            self.assertIn("rainfall", service.get_stats())
+        self.assertFalse(columnar_dir(Path(self.csv_path)).exists())
+
+
+class ExplanationJobTests(SimpleTestCase):
+
+    def setUp(self):
+        import threading
+
+        self.release = threading.Event()
+        patcher = mock.patch.object(ExplanationService, "generate",
+                                    side_effect=lambda **kwargs: self.release.wait(5) and "Grow rice.")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+
+    def wait_ready(self, job_id):
+        deadline = time.monotonic() + 5
+        while explanation_jobs.get_job(job_id)["status"] != explanation_jobs.READY and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return explanation_jobs.get_job(job_id)
+
+    def test_full_queue_rejects_new_jobs_until_one_finishes(self):
+        import threading
+
+        with mock.patch("services.explanation_jobs._slots", return_value=threading.BoundedSemaphore(1)):
+            job_id = explanation_jobs.submit(crop="rice", soil_ph=6.47)
+            self.assertIsNotNone(job_id)
+            with self.assertLogs("services.explanation_jobs", "WARNING"):
+                self.assertIsNone(explanation_jobs.submit(crop="rice", soil_ph=6.47))
+
+            self.release.set()
+            self.assertEqual(self.wait_ready(job_id)["explanation"], "Grow rice.")
+            self.assertIsNotNone(explanation_jobs.submit(crop="rice", soil_ph=6.47))
+
+    def test_full_queue_answers_with_the_template(self):
+        from recommendations.views import _queue_explanation
+
+        service = mock.Mock(cached=mock.Mock(return_value=None))
+        with mock.patch("services.explanation_jobs.submit", return_value=None):
+            explanation, job_id = _queue_explanation(service, {"crop": "rice", "soil_ph": 6.47})
+        self.assertIsNone(job_id)
+        self.assertEqual(explanation, ExplanationService.fallback("rice", 6.47))
+
+    def test_jobs_are_not_culled_by_other_cache_traffic(self):
+        from django.core.cache import caches
+
+        self.release.set()
+        job_id = explanation_jobs.submit(crop="rice", soil_ph=6.47)
+        for i in range(1000):
+            caches["default"].set(f"unrelated:{i}", i)
+            explanation_jobs._cache().set(f"explanation_job:filler-{i}", {"status": "ready"})
+        self.assertIsNotNone(explanation_jobs.get_job(job_id))
+
+
+class SyntheticGeneratorTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        # Wide spreads so plenty of draws land out of range and are redrawn or clipped.
+        rng = np.random.default_rng(0)
+        rows = []
+        for crop, centre in zip(CROPS, np.linspace(0, 1, len(CROPS))):
+            for _ in range(20):
+                row = {f: low + (high - low) * (centre + rng.normal(0, 0.5)) for f, (low, high) in self.bounds().items()}
+                rows.append({**row, "label": crop})
+        self.climate_path = self.dir / "climate.csv"
+        pd.DataFrame(rows).to_csv(self.climate_path, index=False)
+
+    def bounds(self):
+        from ml_engine.utils.synthetic_generator import BOUNDS
+        return BOUNDS
+
+    def write(self, name, workers, seed=7):
+        from ml_engine.utils.synthetic_generator import write_synthetic_dataset
+        return write_synthetic_dataset(
+            self.dir / name, n=2500, climate_path=self.climate_path,
+            seed=seed, chunk_size=300, workers=workers,
+        ).read_bytes()
+
+    def test_same_seed_gives_the_same_file_for_any_worker_count(self):
+        serial = self.write("serial.csv", workers=1)
+        for workers in (2, 3):
+            self.assertEqual(self.write(f"workers-{workers}.csv", workers=workers), serial)
+        self.assertNotEqual(self.write("other-seed.csv", workers=1, seed=8), serial)
+        self.assertFalse(list(self.dir.glob("*.tmp")))
+
+    def test_every_column_stays_within_its_bounds(self):
+        self.write("scenarios.csv", workers=1)
+        df = pd.read_csv(self.dir / "scenarios.csv")
+        self.assertEqual(len(df), 2500)
+        self.assertEqual(set(df["label"]), set(CROPS))
+        for feature, (low, high) in self.bounds().items():
+            self.assertGreaterEqual(df[feature].min(), low, feature)
+            self.assertLessEqual(df[feature].max(), high, feature)
+
+
+def write_crop_csv(path, rows_per_crop=12, seed=0):
+    """A crop_suitability training CSV with one well-separated cluster per crop."""
+    from ml_engine.models.crop_suitability import CropSuitabilityModel
+
+    features = CropSuitabilityModel().features
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(0, 100, (len(CROPS), 1))
+    noise = rng.normal(0, 1, (rows_per_crop * len(CROPS), len(features)))
+    df = pd.DataFrame(np.repeat(centres, rows_per_crop, axis=0) + noise, columns=features)
+    df["label"] = np.repeat(CROPS, rows_per_crop)
+    df["unused"] = "x"
+    df.to_csv(path, index=False)
+    return features
+
+
+class CropSuitabilityTrainerTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.csv_path = self.dir / "crops.csv"
+        # Separated clusters, so every fold scores near 1.
+        self.features = write_crop_csv(self.csv_path)
+
+    def train(self, **kwargs):
+        from ml_engine.trainers.crop_suitability_trainer import train
+
+        with mock.patch("builtins.print"):
+            return train([self.csv_path], **{
+                "n_jobs": 1, "folds": 3, "n_estimators": 10, "max_depth": 4, "random_state": 0,
+                "artifacts_dir": self.dir / "artifacts", **kwargs,
+            })
+
+    def test_manifest_and_fold_metrics(self):
+        manifest = self.train(version="v1", promote=False)
+
+        self.assertEqual(set(manifest), {
+            "version", "created_at", "features", "classes", "params", "datasets", "rows", "metrics",
+            "load_seconds", "cv_seconds", "train_seconds", "peak_rss_bytes", "peak_cv_worker_rss_bytes",
+            "sklearn_version",
+        })
+        self.assertEqual(manifest["version"], "v1")
+        self.assertEqual(manifest["features"], self.features)
+        self.assertEqual(manifest["classes"], sorted(CROPS))
+        self.assertEqual(manifest["rows"], 12 * len(CROPS))
+        self.assertEqual(manifest["params"], {"n_estimators": 10, "max_depth": 4, "random_state": 0, "n_jobs": 1})
+
+        metrics = manifest["metrics"]
+        self.assertEqual(metrics["cv_folds"], 3)
+        self.assertEqual(len(metrics["fold_accuracy"]), 3)
+        self.assertTrue(all(0.9 <= s <= 1 for s in metrics["fold_accuracy"]))
+        self.assertAlmostEqual(metrics["accuracy_mean"], np.mean(metrics["fold_accuracy"]), places=3)
+        self.assertAlmostEqual(metrics["accuracy_std"], np.std(metrics["fold_accuracy"]), places=3)
+
+        version_dir = self.dir / "artifacts" / "crop_suitability" / "v1"
+        self.assertEqual(json.loads((version_dir / "manifest.json").read_text()), manifest)
+        self.assertTrue((version_dir / "crop_suitability.pkl").exists())
+        self.assertFalse((self.dir / "artifacts" / "crop_suitability.pkl").exists())
+
+    def test_promote_and_skipping_cv(self):
+        manifest = self.train(folds=1, version="v2")
+
+        self.assertEqual(manifest["metrics"], {})
+        self.assertIsNone(manifest["cv_seconds"])
+        model = joblib.load(self.dir / "artifacts" / "crop_suitability.pkl")
+        self.assertIsNone(model.model.n_jobs)
+        self.assertFalse(list((self.dir / "artifacts").glob("*.tmp")))
+
+
+class HyperparameterSearchTests(SimpleTestCase):
+
+    def result(self, name, accuracy, latency_ms, size_bytes):
+        return {"estimator": name, "params": {}, "accuracy": accuracy, "latency_ms": latency_ms, "size_bytes": size_bytes}
+
+    def test_pareto_front_keeps_ties_and_drops_dominated_points(self):
+        from ml_engine.trainers.hyperparameter_search import pareto_front
+
+        best = self.result("best", 0.99, 2.0, 500)
+        tied = self.result("tied", 0.99, 2.0, 500)
+        fast = self.result("fast", 0.90, 0.5, 800)
+        small = self.result("small", 0.80, 3.0, 100)
+        worse = self.result("worse", 0.95, 2.5, 600)       # beaten by best everywhere
+        bigger = self.result("bigger", 0.99, 2.0, 501)     # equal to best but one objective
+        results = [best, tied, fast, small, worse, bigger]
+
+        self.assertEqual([r["estimator"] for r in pareto_front(results)], ["best", "tied", "fast", "small"])
+        # With size ignored, small is slower and less accurate than best.
+        self.assertEqual(
+            [r["estimator"] for r in pareto_front(results, (("accuracy", 1), ("latency_ms", -1)))],
+            ["best", "tied", "fast", "bigger"],
+        )
+        self.assertEqual(pareto_front([]), [])
+        self.assertEqual(pareto_front([worse]), [worse])
+
+    def test_choose(self):
+        from ml_engine.trainers.hyperparameter_search import choose
+
+        accurate = self.result("accurate", 0.99, 2.0, 500)
+        fast = self.result("fast", 0.95, 0.5, 800)
+        fast_small = self.result("fast_small", 0.96, 0.5, 300)
+        slow = self.result("slow", 0.97, 1.0, 100)
+        front = [accurate, fast, fast_small, slow]
+
+        # Fastest meeting the target; equal latency goes to the smaller model.
+        self.assertIs(choose(front, target_accuracy=0.95), fast_small)
+        self.assertIs(choose(front, target_accuracy=0.97), slow)
+        # Unreachable or no target: most accurate.
+        self.assertIs(choose(front, target_accuracy=0.999), accurate)
+        self.assertIs(choose(front), accurate)
+
+    def test_successive_halving_search(self):
+        from ml_engine.trainers.hyperparameter_search import pareto_front, search
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        csv_path = Path(tmp.name) / "crops.csv"
+        features = write_crop_csv(csv_path, rows_per_crop=40)
+
+        with mock.patch("builtins.print"):
+            report = search([csv_path], n_candidates=6, estimators=("random_forest", "extra_trees"),
+                            min_rows=40, eta=2, workers=2, validation_size=0.25, target_accuracy=0.9)
+
+        self.assertEqual(report["features"], features)
+        self.assertEqual(report["settings"]["validation_rows"], 60)
+        rungs = report["rungs"]
+        self.assertEqual(len(rungs[0]), 6)
+        # Data grows by eta per rung; the last rung (which may come early, once
+        # one survivor is left) always trains on the full training split.
+        rows = [rung[0]["rows"] for rung in rungs]
+        self.assertEqual(rows[:-1], [40 * 2 ** i for i in range(len(rungs) - 1)])
+        self.assertEqual(rows[-1], 180)
+        for previous, rung in zip(rungs, rungs[1:]):
+            self.assertLessEqual(len(rung), len(previous))
+            previous_configs = [(r["estimator"], r["params"]) for r in previous]
+            self.assertTrue(all((r["estimator"], r["params"]) in previous_configs for r in rung))
+
+        front = report["pareto_front"]
+        self.assertEqual(sorted(map(id, front)), sorted(map(id, pareto_front(rungs[-1]))))
+        self.assertEqual([r["latency_ms"] for r in front], sorted(r["latency_ms"] for r in front))
+        self.assertIn(report["chosen"], front)
+        self.assertGreaterEqual(report["chosen"]["accuracy"], 0.9)
+
+
+def parse_sse(body: str) -> list:
+    """[(event, data or None), ...]; comment-only blocks are skipped."""
+    events = []
+    for block in filter(None, body.split("\n\n")):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("event", "message"), json.loads(fields["data"]) if "data" in fields else None))
+    return events
+
+
+@mock.patch.object(ExplanationStreamView, "POLL_INTERVAL", 0.01)
+class ExplanationStreamTests(SimpleTestCase):
+
+    def set_job(self, job_id, status, explanation=None):
+        explanation_jobs._cache().set(explanation_jobs._job_key(job_id), {"status": status, "explanation": explanation})
+
+    def stream(self, job_id, on_waiting=None):
+        """Read the stream over ASGI; on_waiting runs after each keep-alive."""
+        async def run():
+            response = await AsyncClient().get(f"/api/explanations/{job_id}/stream/")
+            chunks = []
+            async for chunk in response.streaming_content:
+                chunks.append(chunk.decode())
+                if on_waiting and chunk.startswith(b": waiting"):
+                    on_waiting()
+            return response, "".join(chunks)
+
+        return asyncio.run(run())
+
+    def test_unknown_id(self):
+        response, body = self.stream("nope")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(parse_sse(body), [("error", {"error": "Unknown or expired explanation_id."})])
+
+    def test_ready_job_is_sent_at_once(self):
+        self.set_job("done", explanation_jobs.READY, "Grow rice.")
+        _, body = self.stream("done")
+        self.assertEqual(parse_sse(body), [
+            ("explanation", {"explanation_id": "done", "status": "ready", "explanation": "Grow rice."}),
+        ])
+
+    def test_pending_job_streams_until_ready(self):
+        self.set_job("later", explanation_jobs.PENDING)
+        _, body = self.stream("later", on_waiting=lambda: self.set_job("later", explanation_jobs.READY, "Grow maize."))
+
+        self.assertIn(": waiting", body)
+        self.assertEqual(parse_sse(body)[-1][1]["explanation"], "Grow maize.")
+
+    @mock.patch.object(ExplanationStreamView, "TIMEOUT", 0.05)
+    def test_timeout(self):
+        self.set_job("slow", explanation_jobs.PENDING)
+        _, body = self.stream("slow")
+        self.assertEqual(parse_sse(body), [("timeout", {"explanation_id": "slow", "status": "pending", "explanation": None})])
+
+    def test_wsgi_returns_current_state_and_asks_to_reconnect(self):
+        self.set_job("wsgi", explanation_jobs.PENDING)
+        started = time.monotonic()
+        response = Client().get("/api/explanations/wsgi/stream/")
+        body = b"".join(response.streaming_content).decode()
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(body.startswith(f"retry: {ExplanationStreamView.RETRY_MS}\n"))
+
+        self.set_job("wsgi", explanation_jobs.READY, "Grow cotton.")
+        body = b"".join(Client().get("/api/explanations/wsgi/stream/").streaming_content).decode()
+        self.assertEqual(parse_sse(body)[0][0], "explanation")
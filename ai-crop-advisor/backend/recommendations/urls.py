@@ -1,8 +1,21 @@
 from django.urls import path
-from .views import RecommendView, ChatView, ModelInfoView
+from django.views.decorators.csrf import csrf_exempt
+from .views import (
+    RecommendView, AsyncRecommendView, BatchRecommendView, ExplanationView, ExplanationStreamView,
+    ChatView, ModelInfoView, ModelReloadView,
+)
+from core.views import AsyncChatView
 
 urlpatterns = [
     path('recommend/', RecommendView.as_view()),
+    path('recommend/batch/', BatchRecommendView.as_view()),
+    path('explanations/<str:explanation_id>/', ExplanationView.as_view()),
+    path('explanations/<str:explanation_id>/stream/', ExplanationStreamView.as_view()),
     path('chat/', ChatView.as_view()),
+    # ASGI (uvicorn) endpoints; this app's chat/ is shadowed by core's api/chat/,
+    # and async/advisory/ is the same view as api/async/chat/
+    path('async/recommend/', csrf_exempt(AsyncRecommendView.as_view())),
+    path('async/advisory/', csrf_exempt(AsyncChatView.as_view())),
     path('model-info/', ModelInfoView.as_view()),
+    path('model-info/reload/', ModelReloadView.as_view()),
 ]
@@ -1,16 +1,121 @@
 """API views for Crop Recommendation, Chat Advisory, and Model Info."""
 
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from drf_spectacular.utils import extend_schema
 
-from .serializers import RecommendRequestSerializer, ChatRequestSerializer
-from services.decision_engine import decide_crop
-from services.explanation_service import ExplanationService
+from .serializers import RecommendRequestSerializer, BatchRecommendRequestSerializer, ChatRequestSerializer
+from services.agronomy_tables import get_tables_loader
+from services.decision_engine import (
+    adecide_crop, decide_crop, decide_crop_batch, expand_candidate_analytics, get_decision_cache,
+)
+from core.views import chat_event_stream, chat_stream_response
+from services import explanation_jobs, recommendation_log
+from services.explanation_service import ExplanationService, get_explanation_cache
+from services import llm_service
 from services.llm_service import LLMService
-from services.ml_client import get_ml_client
-from services.session_history import history_store
+from services.ml_client import FAST, get_ml_client, get_model_registry
+from services.model_registry import activate
+from services.session_history import get_history_store
+
+
+def _decision_input(data: dict) -> dict:
+    return {
+        "soil": data["soil"],
+        "climate": data["climate"],
+        "last_crop": data.get("last_crop"),
+        "state": data.get("state", "Maharashtra"),
+        "season": data.get("season", "Kharif"),
+        "area": data.get("area", 1.0),
+        "pesticide": data.get("pesticide", 0.0),
+        "crop_year": data.get("crop_year", 2024),
+    }
+
+
+def _explanation_args(data: dict, result: dict) -> dict:
+    return dict(
+        crop=result.get("crop"), soil_ph=data["soil"]["ph"], confidence=result.get("confidence", 0.0),
+        reason=result.get("reason"), last_crop=data.get("last_crop"), lang=data.get("lang", "en"),
+    )
+
+
+# Optional response parts, requested with ?expand=a,b
+EXPANDABLE = {"candidates.analytics"}
+
+
+def _expand(request) -> set:
+    requested = {part.strip() for part in request.GET.get("expand", "").split(",") if part.strip()}
+    return requested & EXPANDABLE
+
+
+def _tier(request):
+    """?tier=fast serves from the distilled model (when one is loaded)."""
+    return FAST if request.GET.get("tier") == FAST else None
+
+
+def _candidates(pairs: list, expand: set) -> list:
+    """Per-field copies of the ranked candidates, with analytics if expanded."""
+    candidates = [[dict(c) for c in result.get("candidates", [])] for _, result in pairs]
+    if "candidates.analytics" in expand:
+        expand_candidate_analytics([(data, field) for (data, _), field in zip(pairs, candidates)])
+    return candidates
+
+
+def _queue_explanation(service, explanation_args: dict) -> tuple:
+    """(explanation, explanation_id) for explanation_mode="async"."""
+    explanation = service.cached(**explanation_args)
+    if explanation is not None:
+        return explanation, None
+    explanation_id = explanation_jobs.submit(**explanation_args)
+    if explanation_id is None:
+        # Queue full: the template now, rather than a job that may expire unread.
+        return ExplanationService.fallback(explanation_args["crop"], explanation_args["soil_ph"]), None
+    return None, explanation_id
+
+
+def _recommend_payload(result: dict, explanation, explanation_id, history, candidates=None) -> dict:
+    return {
+        "recommendation": {
+            "crop": result.get("crop"),
+            "confidence": result.get("confidence", 0.0),
+            "estimated_yield": result.get("estimated_yield"),
+            "financials": result.get("financials"),
+        },
+        "analytics": result.get("analytics"),
+        "explanation": explanation,
+        "explanation_id": explanation_id,
+        "explanation_status": explanation_jobs.PENDING if explanation_id else explanation_jobs.READY,
+        "source": result.get("source"),
+        "model_version": result.get("model_version"),
+        "reason": result.get("reason", "unknown"),
+        "candidates": candidates if candidates is not None else result.get("candidates", []),
+        "history": history,
+    }
+
+
+def _record_history(session_key, result: dict) -> list:
+    """Add `result` to the session's history and return the updated history."""
+    session_id = session_key or "anonymous"
+    store = get_history_store()
+    store.add(session_id, result.get("crop"), result.get("confidence", 0.0))
+    return store.get(session_id)
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
 
 
 class RecommendView(APIView):
@@ -21,52 +126,184 @@ class RecommendView(APIView):
 
     @extend_schema(request=RecommendRequestSerializer, responses={200: dict})
     def post(self, request):
+        started = time.perf_counter()
         serializer = RecommendRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
-        soil = data["soil"]
-        climate = data["climate"]
-        last_crop = data.get("last_crop")
-        lang = data.get("lang", "en")
-
-        result = decide_crop({
-            "soil": soil,
-            "climate": climate,
-            "last_crop": last_crop,
-            "state": data.get("state", "Maharashtra"),
-            "season": data.get("season", "Kharif"),
-            "area": data.get("area", 1.0),
-            "pesticide": data.get("pesticide", 0.0),
-            "crop_year": data.get("crop_year", 2024),
-        })
+        inputs = _decision_input(data)
+        result = decide_crop(inputs, _tier(request))
+        explanation_args = _explanation_args(data, result)
+
+        explanation_id = None
+        if data.get("explanation_mode") == "async":
+            explanation, explanation_id = _queue_explanation(self.explanation_service, explanation_args)
+        else:
+            explanation = self.explanation_service.generate(**explanation_args)
+
+        history = _record_history(request.session.session_key, result)
+        recommendation_log.record(inputs, result, (time.perf_counter() - started) * 1000, explanation)
+        candidates = _candidates([(inputs, result)], _expand(request))[0]
+        return Response(_recommend_payload(result, explanation, explanation_id, history, candidates))
+
+
+class AsyncRecommendView(View):
+    """RecommendView for ASGI servers.
+
+    decide_crop runs on the bounded decision thread pool and the LLM call
+    is awaited on AsyncLLMService, so no thread is held while it waits.
+    """
+
+    async def post(self, request):
+        started = time.perf_counter()
+        serializer = RecommendRequestSerializer(data=_json_body(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        inputs = _decision_input(data)
+        result = await adecide_crop(inputs, _tier(request))
+        explanation_args = _explanation_args(data, result)
+        service = ExplanationService()
+
+        explanation_id = None
+        if data.get("explanation_mode") == "async":
+            explanation, explanation_id = await sync_to_async(_queue_explanation, thread_sensitive=False)(
+                service, explanation_args
+            )
+        else:
+            explanation = await service.agenerate(**explanation_args)
+
+        # A shared history backend does blocking cache I/O.
+        history = await sync_to_async(_record_history, thread_sensitive=False)(request.session.session_key, result)
+        recommendation_log.record(inputs, result, (time.perf_counter() - started) * 1000, explanation)
+        candidates = _candidates([(inputs, result)], _expand(request))[0]
+        return JsonResponse(_recommend_payload(result, explanation, explanation_id, history, candidates))
+
+
+class ExplanationView(APIView):
+    """Poll for an explanation queued by RecommendView in async mode."""
+
+    @extend_schema(responses={200: dict, 404: dict})
+    def get(self, request, explanation_id):
+        job = explanation_jobs.get_job(explanation_id)
+        if job is None:
+            return Response({"error": "Unknown or expired explanation_id."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"explanation_id": explanation_id, **job})
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 
-        crop = result.get("crop")
-        confidence = result.get("confidence", 0.0)
+class ExplanationStreamView(View):
+    """Server-Sent Events: one `explanation` event once the text is ready.
 
-        explanation = self.explanation_service.generate(
-            crop=crop, soil_ph=soil["ph"], confidence=confidence,
-            reason=result.get("reason"), last_crop=last_crop, lang=lang,
+    Under ASGI the stream stays open and the job is re-checked with
+    asyncio.sleep, so a waiting client holds no thread. Under WSGI holding
+    the stream would pin a worker for the whole LLM call, so the response
+    carries the current state and closes; while the job is pending it asks
+    the EventSource to reconnect after RETRY_MS, which makes it a poll of
+    ExplanationView under the hood.
+    """
+
+    POLL_INTERVAL = 0.25
+    TIMEOUT = 30
+    RETRY_MS = 1000
+
+    async def get(self, request, explanation_id):
+        if isinstance(request, ASGIRequest):
+            events = self._events(explanation_id)
+        else:
+            job = await sync_to_async(explanation_jobs.get_job, thread_sensitive=False)(explanation_id)
+            events = [self._final_event(explanation_id, job) or f"retry: {self.RETRY_MS}\n: waiting\n\n"]
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _final_event(self, explanation_id, job):
+        if job is None:
+            return _sse("error", {"error": "Unknown or expired explanation_id."})
+        if job["status"] == explanation_jobs.READY:
+            return _sse("explanation", {"explanation_id": explanation_id, **job})
+        return None
+
+    async def _events(self, explanation_id):
+        deadline = time.monotonic() + self.TIMEOUT
+        get_job = sync_to_async(explanation_jobs.get_job, thread_sensitive=False)
+        while True:
+            job = await get_job(explanation_id)
+            event = self._final_event(explanation_id, job)
+            if event is not None:
+                yield event
+                return
+            if time.monotonic() >= deadline:
+                yield _sse("timeout", {"explanation_id": explanation_id, **job})
+                return
+            # Comment line keeps proxies from closing an idle stream.
+            yield ": waiting\n\n"
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+
+class BatchRecommendView(APIView):
+    """Bulk recommendations for soil-card campaigns, streamed as NDJSON.
+
+    Fields are scored in chunks so each chunk costs a single classifier call
+    and results start flowing before the whole campaign is done. LLM
+    explanations and session history are skipped in bulk mode.
+    """
+
+    CHUNK_SIZE = 500
+
+    @extend_schema(request=BatchRecommendRequestSerializer, responses={200: dict})
+    def post(self, request):
+        serializer = BatchRecommendRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data["items"]
+        response = StreamingHttpResponse(
+            self._stream(items, _expand(request), _tier(request)), content_type="application/x-ndjson"
         )
+        response["X-Batch-Size"] = str(len(items))
+        return response
 
-        session_id = request.session.session_key or "anonymous"
-        history_store.add(session_id, crop, confidence)
+    def _stream(self, items, expand, tier=None):
+        for start in range(0, len(items), self.CHUNK_SIZE):
+            inputs = [_decision_input(data) for data in items[start:start + self.CHUNK_SIZE]]
+            results = decide_crop_batch(inputs, tier)
+            candidates = _candidates(list(zip(inputs, results)), expand)
 
-        return Response({
-            "recommendation": {
-                "crop": crop,
-                "confidence": confidence,
-                "estimated_yield": result.get("estimated_yield"),
-                "financials": result.get("financials"),
-            },
-            "analytics": result.get("analytics"),
-            "explanation": explanation,
-            "source": result.get("source"),
-            "model_version": result.get("model_version"),
-            "reason": result.get("reason", "unknown"),
-            "history": history_store.get(session_id),
-        })
+            for offset, result in enumerate(results):
+                yield json.dumps({
+                    "index": start + offset,
+                    "recommendation": {
+                        "crop": result.get("crop"),
+                        "confidence": result.get("confidence", 0.0),
+                        "estimated_yield": result.get("estimated_yield"),
+                        "financials": result.get("financials"),
+                    },
+                    "analytics": result.get("analytics"),
+                    "source": result.get("source"),
+                    "model_version": result.get("model_version"),
+                    "reason": result.get("reason", "unknown"),
+                    "candidates": candidates[offset],
+                }) + "\n"
+
+
+def build_chat_prompt(message: str, lang: str) -> str:
+    lang_name = {"en": "English", "hi": "Hindi", "mr": "Marathi", "gu": "Gujarati"}.get(lang, "English")
+
+    return f"""You are an agricultural AI advisor.
+Your role: Provide concise, practical farming advice. Do NOT hallucinate data.
+Respond in {lang_name}.
+
+User question: {message}
+
+Provide a helpful agricultural advisory response in {lang_name}:"""
 
 
 class ChatView(APIView):
@@ -82,17 +319,10 @@ class ChatView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        message = serializer.validated_data["message"]
-        lang = serializer.validated_data.get("lang", "en")
-        lang_name = {"en": "English", "hi": "Hindi", "mr": "Marathi", "gu": "Gujarati"}.get(lang, "English")
+        prompt = build_chat_prompt(serializer.validated_data["message"], serializer.validated_data.get("lang", "en"))
 
-        prompt = f"""You are an agricultural AI advisor.
-Your role: Provide concise, practical farming advice. Do NOT hallucinate data.
-Respond in {lang_name}.
-
-User question: {message}
-
-Provide a helpful agricultural advisory response in {lang_name}:"""
+        if serializer.validated_data["stream"]:
+            return chat_stream_response(chat_event_stream(self.llm_service.stream_multilingual(prompt)))
 
         try:
             return Response({"reply": self.llm_service.reason_multilingual(prompt)})
@@ -116,5 +346,46 @@ class ModelInfoView(APIView):
             "model_version": self.ml_client.model_version,
             "accuracy": self.ml_client.accuracy,
             "features": self.ml_client.feature_order,
+            "fast_tier": self.ml_client.fast_info,
             "confidence_threshold": 0.5,
+            "registry": get_model_registry().info(),
+            "decision_cache": get_decision_cache().stats(),
+            "explanation_cache": get_explanation_cache().stats(),
+            "llm_streaming": dict(llm_service.stream_stats),
+            "llm_single_flight": dict(llm_service.single_flight_stats),
+            "session_history": get_history_store().stats(),
+            "agronomy_tables": get_tables_loader().info(),
+            "recommendation_log": recommendation_log.get_recommendation_writer().info(),
         })
+
+
+class ModelReloadView(APIView):
+    """Admin-only: activate a model version for every worker.
+
+    The manifest is rewritten, which every gunicorn worker polls (see
+    MODEL_REGISTRY_POLL_SECONDS); this worker also starts loading at once.
+    Without a version the active one is re-activated, e.g. after its files
+    were replaced.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(request=dict, responses={202: dict, 400: dict, 404: dict})
+    def post(self, request):
+        registry = get_model_registry()
+        version = request.data.get("version")
+        try:
+            if version is None:
+                version = registry.read_manifest()["active"]
+            activate(version, registry.models_dir)
+        except FileNotFoundError as e:
+            if version is None:
+                return Response({"error": "No model manifest; pass a version to activate."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except (ValueError, KeyError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        registry.reload(version=version)
+        return Response({"status": "activating", "version": version, "registry": registry.info()},
+                        status=status.HTTP_202_ACCEPTED)
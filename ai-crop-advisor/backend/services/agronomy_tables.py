@@ -0,0 +1,164 @@
+"""
+Agronomy Tables
+
+MSP prices, cultivation costs, KCC scale of finance, ideal NPK and water
+requirements, loaded from a versioned JSON file (data/agronomy_tables.json)
+instead of being hard-coded.
+
+Each crop gets a canonical integer id. Every column is held both as a tuple
+(scalar lookups in profit_service / analytics_service) and as a NumPy array
+(vector_analytics), indexed by that id; the last id is reserved for unknown
+crops and holds the file's defaults.
+
+The file is re-checked at most every AGRONOMY_TABLES_POLL_SECONDS. A changed
+file is parsed into a new AgronomyTables and swapped in with a single
+reference assignment, so a lookup never sees half-updated prices; if the
+new file is invalid the previous tables stay in use.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "agronomy_tables.json")
+POLL_SECONDS = 60
+
+COLUMNS = ("msp_per_quintal", "cost_per_hectare", "scale_of_finance", "ideal_n", "ideal_p", "ideal_k", "water_req_mm")
+
+
+def _flatten(entry: dict) -> dict:
+    row = {k: v for k, v in entry.items() if k != "ideal_npk"}
+    npk = entry.get("ideal_npk", {})
+    for nutrient in ("N", "P", "K"):
+        if nutrient in npk:
+            row[f"ideal_{nutrient.lower()}"] = npk[nutrient]
+    return row
+
+
+class AgronomyTables:
+    """Immutable snapshot of one version of the tables file."""
+
+    def __init__(self, data: dict):
+        self.version = data.get("version")
+        # Changes whenever any value does, even if "version" wasn't bumped.
+        self.fingerprint = hashlib.sha1(
+            json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+        self.crops = tuple(sorted(data["crops"]))
+        self.unknown_id = len(self.crops)
+
+        # Common spellings resolve with one dict lookup; anything else falls
+        # back to the capitalize() normalization the tables always used.
+        index = {}
+        for crop_id, crop in enumerate(self.crops):
+            for alias in (crop, crop.capitalize(), crop.lower(), crop.upper()):
+                index.setdefault(alias, crop_id)
+        self._index = index
+
+        defaults = _flatten(data["defaults"])
+        missing = [c for c in COLUMNS if c not in defaults]
+        if missing:
+            raise ValueError(f"Agronomy tables defaults missing {missing}")
+
+        rows = [_flatten(data["crops"][crop]) for crop in self.crops] + [defaults]
+        self.values = {column: tuple(row.get(column, defaults[column]) for row in rows) for column in COLUMNS}
+        self.arrays = {}
+        for column, values in self.values.items():
+            array = np.array(values)
+            array.setflags(write=False)
+            self.arrays[column] = array
+
+    def crop_id(self, crop: str) -> int:
+        crop_id = self._index.get(crop)
+        if crop_id is None:
+            crop_id = self._index.get(crop.capitalize(), self.unknown_id)
+        return crop_id
+
+    def crop_ids(self, crops) -> np.ndarray:
+        return np.fromiter((self.crop_id(crop) for crop in crops), dtype=np.intp, count=len(crops))
+
+    def value(self, column: str, crop: str):
+        return self.values[column][self.crop_id(crop)]
+
+
+class AgronomyTablesLoader:
+
+    def __init__(self, path: str = DEFAULT_PATH, poll_seconds: float = POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._tables = None
+        self._mtime = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"version": None, "loaded_at": None, "reload_count": 0, "last_error": None}
+
+    def _load(self) -> None:
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path) as f:
+            tables = AgronomyTables(json.load(f))
+
+        first_load = self._tables is None
+        # A single reference assignment: readers holding the old tables keep them.
+        self._tables = tables
+        self._mtime = mtime
+        self.stats.update({
+            "version": tables.version,
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+            "last_error": None,
+        })
+        if not first_load:
+            self.stats["reload_count"] += 1
+        logger.info(f"Loaded agronomy tables {tables.version} ({len(tables.crops)} crops)")
+
+    def get(self) -> AgronomyTables:
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    self._load()
+
+        now = time.monotonic()
+        if self.poll_seconds is not None and now >= self._next_poll:
+            self._next_poll = now + self.poll_seconds
+            self.reload_if_changed()
+        return self._tables
+
+    def reload_if_changed(self) -> bool:
+        # Another thread already reloading: keep serving the current tables.
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return False
+            self._load()
+            return True
+        except Exception as e:
+            self.stats["last_error"] = str(e)
+            logger.error(f"Agronomy tables reload failed, keeping {self.stats['version']}: {e}")
+            return False
+        finally:
+            self._lock.release()
+
+    def info(self) -> dict:
+        return {**self.stats, "path": self.path}
+
+
+@lru_cache(maxsize=1)
+def get_tables_loader() -> AgronomyTablesLoader:
+    from django.conf import settings
+    return AgronomyTablesLoader(
+        path=getattr(settings, "AGRONOMY_TABLES_PATH", DEFAULT_PATH),
+        poll_seconds=getattr(settings, "AGRONOMY_TABLES_POLL_SECONDS", POLL_SECONDS),
+    )
+
+
+def get_agronomy_tables() -> AgronomyTables:
+    return get_tables_loader().get()
@@ -0,0 +1,173 @@
+"""
+Compact Crop Model
+
+Flattens the sklearn crop pipeline (scalers + tree ensemble) into plain
+NumPy arrays so inference needs neither pandas nor sklearn validation.
+
+Export once after each model update:
+
+    python -m services.compact_model [models_dir]
+
+Multi-output tree regressors are accepted too: a student distilled from the
+pipeline's probabilities (ml_engine.trainers.distill_crop_model) has one
+output per class, and its leaf values are already class probabilities.
+"""
+
+import os
+import sys
+
+import joblib
+import numpy as np
+
+COMPACT_DIRNAME = "crop_pipeline_compact"
+
+SUPPORTED_FORESTS = ("RandomForestClassifier", "ExtraTreesClassifier")
+SUPPORTED_REGRESSORS = ("DecisionTreeRegressor", "RandomForestRegressor", "ExtraTreesRegressor")
+
+
+def _export_scaler(step, n_features: int) -> tuple:
+    name = type(step).__name__
+    if name == "StandardScaler":
+        mean = step.mean_ if step.mean_ is not None else np.zeros(n_features)
+        scale = step.scale_ if step.scale_ is not None else np.ones(n_features)
+        return "standard", np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+    if name == "MinMaxScaler":
+        return "minmax", np.asarray(step.scale_, dtype=np.float64), np.asarray(step.min_, dtype=np.float64)
+    raise ValueError(f"Unsupported preprocessing step: {name}")
+
+
+def export_pipeline(pipeline, classes=None) -> dict:
+    """Return the flat array representation of a fitted pipeline.
+
+    classes labels the output columns; it is required for regressors,
+    which have no classes_ of their own.
+    """
+    steps = [s for _, s in pipeline.steps if s not in (None, "passthrough")]
+    *preprocessors, estimator = steps
+
+    estimator_name = type(estimator).__name__
+    if estimator_name in ("DecisionTreeClassifier", "DecisionTreeRegressor"):
+        trees = [estimator]
+    elif estimator_name in SUPPORTED_FORESTS + SUPPORTED_REGRESSORS:
+        trees = estimator.estimators_
+    else:
+        raise ValueError(f"Unsupported estimator: {estimator_name}")
+
+    regressor = estimator_name in SUPPORTED_REGRESSORS
+    if regressor and classes is None:
+        raise ValueError(f"{estimator_name} export needs the output classes")
+
+    n_features = estimator.n_features_in_
+    arrays = {"classes": np.asarray(classes if classes is not None else estimator.classes_)}
+
+    kinds = []
+    for i, step in enumerate(preprocessors):
+        kind, a, b = _export_scaler(step, n_features)
+        kinds.append(kind)
+        arrays[f"pre{i}_a"] = a
+        arrays[f"pre{i}_b"] = b
+    arrays["pre_kinds"] = np.asarray(kinds, dtype="U16")
+
+    roots, left, right, feature, threshold, value = [], [], [], [], [], []
+    offset = 0
+    for est in trees:
+        tree = est.tree_
+        roots.append(offset)
+        # Leaves keep -1 so traversal can tell them apart after the offset.
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        # Classifiers: (nodes, 1, classes); regressors: (nodes, outputs, 1).
+        node_value = tree.value[:, :, 0] if regressor else tree.value[:, 0, :]
+        value.append(node_value / node_value.sum(axis=1, keepdims=True))
+        offset += tree.node_count
+
+    arrays.update({
+        "roots": np.asarray(roots, dtype=np.int64),
+        "left": np.concatenate(left).astype(np.int64),
+        "right": np.concatenate(right).astype(np.int64),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+    })
+    return arrays
+
+
+class CompactCropModel:
+    """Pure-NumPy predict_proba over an exported pipeline."""
+
+    def __init__(self, arrays: dict):
+        self.classes = arrays["classes"]
+        self.preprocessing = [
+            (str(kind), arrays[f"pre{i}_a"], arrays[f"pre{i}_b"])
+            for i, kind in enumerate(arrays["pre_kinds"])
+        ]
+        self.roots = arrays["roots"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r") -> "CompactCropModel":
+        """Load an exported directory; arrays are memory-mapped by default
+        so every worker process shares the same page-cache copy."""
+        arrays = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in os.listdir(path) if name.endswith(".npy")
+        }
+        return cls(arrays)
+
+    def _transform(self, X: np.ndarray) -> np.ndarray:
+        for kind, a, b in self.preprocessing:
+            if kind == "standard":
+                X = (X - a) / b
+            else:
+                X = X * a + b
+        # sklearn trees compare float32 inputs against float64 thresholds.
+        return X.astype(np.float32).astype(np.float64)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = self._transform(np.asarray(X, dtype=np.float64))
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+
+        active = self.left[nodes] != -1
+        while active.any():
+            current = nodes[active]
+            go_left = X[np.broadcast_to(rows, nodes.shape)[active], self.feature[current]] <= self.threshold[current]
+            nodes[active] = np.where(go_left, self.left[current], self.right[current])
+            active = self.left[nodes] != -1
+
+        return self.value[nodes].mean(axis=1)
+
+
+def save_compact_model(pipeline, path: str) -> None:
+    """Write one uncompressed .npy per array so they can be mmap'd."""
+    os.makedirs(path, exist_ok=True)
+    for name, array in export_pipeline(pipeline).items():
+        np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+
+
+def main(models_dir: str = None) -> int:
+    from services.ml_client import MODELS_DIR
+
+    models_dir = models_dir or MODELS_DIR
+    crop_data = joblib.load(os.path.join(models_dir, "crop_pipeline.pkl"))
+    out_path = os.path.join(models_dir, COMPACT_DIRNAME)
+
+    try:
+        save_compact_model(crop_data["pipeline"], out_path)
+    except ValueError as e:
+        print(f"Cannot export compact model: {e}")
+        return 1
+
+    print(f"Compact model saved to {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(*sys.argv[1:2]))
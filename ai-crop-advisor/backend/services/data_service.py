@@ -3,39 +3,179 @@ Data Service
 
 Responsible for loading and validating ML datasets.
 Backend never directly reads CSV elsewhere.
+
+The CSV is converted once into a columnar cache next to it: one .npy file
+per column (float32 for numeric columns, integer codes for text columns
+such as the crop label) plus meta.json with dtypes, categories, row count
+and per-column statistics. Reads memory-map only the columns they ask for,
+and column statistics come from meta.json without touching any rows. The
+cache records the CSV's size and mtime and is rebuilt when they change.
+
+Build the cache ahead of time:
+
+    python -m services.data_service
 """
 
+import json
+import os
+import shutil
+import sys
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_PATH = BASE_DIR / "data" / "synthetic_agro_scenarios_100k.csv"
+META_FILENAME = "meta.json"
+
+
+def columnar_dir(csv_path: Path) -> Path:
+    return csv_path.with_name(f"{csv_path.stem}_columns")
+
+
+def _source_fingerprint(csv_path: Path) -> dict:
+    stat = os.stat(csv_path)
+    return {"size_bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_columnar_cache(csv_path: Path = DATA_PATH) -> dict:
+    """Convert the CSV into the columnar cache; returns the new meta."""
+    out_dir = columnar_dir(csv_path)
+    fingerprint = _source_fingerprint(csv_path)
+    df = pd.read_csv(csv_path)
+
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    meta = {"source": fingerprint, "rows": len(df), "columns": {}}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series):
+            np.save(tmp_dir / f"{column}.npy", series.to_numpy(dtype=np.float32))
+            # Statistics from the original float64 values, not the float32 copy.
+            meta["columns"][column] = {
+                "dtype": "float32",
+                "mean": float(series.mean()),
+                "std": float(series.std()),
+                "min": float(series.min()),
+                "max": float(series.max()),
+            }
+        else:
+            categorical = series.astype("category")
+            codes = categorical.cat.codes.to_numpy()
+            np.save(tmp_dir / f"{column}.npy", codes.astype(np.int16 if len(categorical.cat.categories) < 2 ** 15 else np.int32))
+            meta["columns"][column] = {
+                "dtype": "category",
+                "categories": [str(c) for c in categorical.cat.categories],
+            }
+
+    with open(tmp_dir / META_FILENAME, "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Move the finished cache into place; readers never see a partial one.
+    old_dir = out_dir.with_name(f"{out_dir.name}.old-{os.getpid()}")
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
 
 
 class DatasetService:
 
-    def __init__(self):
+    def __init__(self, csv_path: Path = DATA_PATH):
+        self.csv_path = Path(csv_path)
+        self.cache_dir = columnar_dir(self.csv_path)
         self.df = None
+        self._meta = None
+
+    def _read_meta(self):
+        try:
+            with open(self.cache_dir / META_FILENAME) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
 
-    def load_dataset(self):
-        """Load dataset safely."""
-        if not DATA_PATH.exists():
+    def get_meta(self) -> dict:
+        """meta.json of an up-to-date cache, building it if needed."""
+        if self._meta is not None:
+            return self._meta
+
+        meta = self._read_meta()
+        if self.csv_path.exists():
+            if meta is None or meta.get("source") != _source_fingerprint(self.csv_path):
+                try:
+                    meta = build_columnar_cache(self.csv_path)
+                except OSError:
+                    # Read-only deploy: serve straight from the CSV.
+                    meta = None
+        elif meta is None:
             raise FileNotFoundError("Dataset not found")
 
-        self.df = pd.read_csv(DATA_PATH)
+        self._meta = meta
+        return meta
+
+    def load_dataset(self, columns=None, nrows=None):
+        """Load dataset safely, optionally only some columns / leading rows."""
+        meta = self.get_meta()
+
+        if meta is None:
+            self.df = pd.read_csv(self.csv_path, usecols=columns, nrows=nrows)
+            return self.df
+
+        names = list(columns) if columns is not None else list(meta["columns"])
+        missing = [name for name in names if name not in meta["columns"]]
+        if missing:
+            raise ValueError(f"Dataset has no columns {missing}")
+
+        data = {}
+        for name in names:
+            values = np.load(self.cache_dir / f"{name}.npy", mmap_mode="r")
+            if nrows is not None:
+                values = values[:nrows]
+            info = meta["columns"][name]
+            if info["dtype"] == "category":
+                data[name] = pd.Categorical.from_codes(np.asarray(values), categories=info["categories"])
+            else:
+                data[name] = values
+
+        self.df = pd.DataFrame(data, copy=False)
         return self.df
 
     def get_columns(self):
         """Return dataset columns."""
-        if self.df is None:
-            self.load_dataset()
+        meta = self.get_meta()
+        if meta is None:
+            return list(pd.read_csv(self.csv_path, nrows=0).columns)
+
+        return list(meta["columns"])
+
+    def get_stats(self) -> dict:
+        """Per-column statistics (mean, std, min, max) without loading rows."""
+        meta = self.get_meta()
+        if meta is None:
+            df = pd.read_csv(self.csv_path)
+            return {
+                column: {"mean": float(df[column].mean()), "std": float(df[column].std()),
+                         "min": float(df[column].min()), "max": float(df[column].max())}
+                for column in df.select_dtypes("number").columns
+            }
 
-        return list(self.df.columns)
+        return {name: info for name, info in meta["columns"].items() if info["dtype"] != "category"}
 
     def get_sample(self, n=5):
         """Return sample rows."""
-        if self.df is None:
-            self.load_dataset()
+        return self.load_dataset(nrows=n).to_dict(orient="records")
+
+
+def main(csv_path: str = None) -> int:
+    meta = build_columnar_cache(Path(csv_path) if csv_path else DATA_PATH)
+    print(f"Wrote columnar cache for {meta['rows']} rows, {len(meta['columns'])} columns")
+    return 0
+
 
-        return self.df.head(n).to_dict(orient="records")
+if __name__ == "__main__":
+    raise SystemExit(main(*sys.argv[1:2]))
@@ -1,86 +1,265 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from services.agronomy_tables import get_agronomy_tables
 from services.ml_client import get_ml_client
-from services.profit_service import calculate_profit
-from services.analytics_service import generate_farm_analytics
+from services.vector_analytics import calculate_profits, generate_farm_analytics_batch
+from services.response_cache import ResponseCache, build_cache, fingerprint
 
 CONFIDENCE_THRESHOLD = 0.4
 BASELINE_YIELD_PER_HA = 3.0
+TOP_K = 5
 
 logger = logging.getLogger(__name__)
 
 
-def decide_crop(data: dict) -> dict:
-    ml_client = get_ml_client()
+def _build_features(data: dict) -> dict:
+    return {
+        **data.get("soil", {}),
+        **data.get("climate", {}),
+        "area": data.get("area", 1.0),
+        "pesticide": data.get("pesticide", 0.0),
+        "season": data.get("season", "Kharif"),
+        "state": data.get("state", "Maharashtra"),
+        "crop_year": data.get("crop_year", 2024),
+    }
+
+
+@lru_cache(maxsize=1)
+def get_decision_cache() -> ResponseCache:
+    from django.conf import settings
+    return build_cache(
+        backend=getattr(settings, "DECISION_CACHE_BACKEND", "local"),
+        max_entries=getattr(settings, "DECISION_CACHE_MAX_ENTRIES", 10000),
+        ttl=getattr(settings, "DECISION_CACHE_TTL_SECONDS", 3600),
+        prefix="decision",
+    )
 
-    try:
-        features = {
-            **data.get("soil", {}),
-            **data.get("climate", {}),
-            "area": data.get("area", 1.0),
-            "pesticide": data.get("pesticide", 0.0),
-            "season": data.get("season", "Kharif"),
-            "state": data.get("state", "Maharashtra"),
-            "crop_year": data.get("crop_year", 2024),
-        }
 
-        candidates = ml_client.predict_top_k(features, k=5)
-        best, highest_profit = None, -float("inf")
+def _cache_key(data: dict, model_version: str) -> str:
+    """Inputs quantized so near-identical soil cards share an entry."""
+    from django.conf import settings
+    precision = getattr(settings, "DECISION_CACHE_PRECISION", 1)
 
-        for c in candidates:
-            if c.get("estimated_yield") is None:
-                c["estimated_yield"] = features["area"] * BASELINE_YIELD_PER_HA
+    def q(values: dict) -> dict:
+        return {k: round(float(v), precision) for k, v in sorted(values.items())}
 
-            c["financials"] = calculate_profit(c["crop"], c["estimated_yield"], features["area"])
-            c["profit"] = c["financials"]["net_profit_inr"] if c["financials"] else -float("inf")
+    return fingerprint(
+        model_version,
+        # Financials depend on the price tables, so any edit to them misses.
+        get_agronomy_tables().fingerprint,
+        q(data.get("soil", {})),
+        q(data.get("climate", {})),
+        round(float(data.get("area", 1.0)), precision),
+        round(float(data.get("pesticide", 0.0)), precision),
+        data.get("season", "Kharif"),
+        data.get("state", "Maharashtra"),
+        data.get("crop_year", 2024),
+    )
 
-            if c["profit"] > highest_profit:
-                highest_profit = c["profit"]
-                best = c
 
-        if not best or best["profit"] == -float("inf"):
-            best = candidates[0]
+def _cache_enabled() -> bool:
+    from django.conf import settings
+    return getattr(settings, "DECISION_CACHE_ENABLED", True)
 
-        crop = best["crop"]
-        confidence = best["confidence"]
 
-        if confidence < CONFIDENCE_THRESHOLD:
-            fallback_crop = "Wheat" if data.get("soil", {}).get("ph", 0) >= 6 else "Millet"
-            fallback_yield = data.get("area", 1.0) * BASELINE_YIELD_PER_HA
-            return {
-                "crop": fallback_crop,
-                "confidence": 0.85,
-                "estimated_yield": fallback_yield,
-                "financials": calculate_profit(fallback_crop, fallback_yield, data.get("area", 1.0)),
-                "analytics": generate_farm_analytics(fallback_crop, data.get("soil", {}), data.get("climate", {}), data.get("area", 1.0)),
-                "source": "rule_fallback",
-                "model_version": ml_client.model_version,
-                "reason": "low_confidence_fallback",
-            }
+def _error_fallback(e: Exception) -> dict:
+    return {
+        "crop": "Millet",
+        "confidence": 0.80,
+        "estimated_yield": None,
+        "financials": None,
+        "analytics": {},
+        "source": "rule_fallback_error",
+        "model_version": "unknown",
+        "reason": "ml_error_fallback",
+        "error": str(e),
+        "candidates": [],
+    }
 
-        analytics = generate_farm_analytics(crop, data.get("soil", {}), data.get("climate", {}), data.get("area", 1.0))
-        logger.info(f"Selected: {crop} | Profit: {highest_profit}")
 
+def _attach_financials(decisions: list) -> None:
+    """Fill estimated_yield and financials on every candidate of every
+    (features, candidates) pair with a single vectorized profit pass."""
+    flat = [(features, c) for features, candidates in decisions for c in candidates]
+    for features, c in flat:
+        if c.get("estimated_yield") is None:
+            c["estimated_yield"] = features["area"] * BASELINE_YIELD_PER_HA
+
+    financials = calculate_profits(
+        [c["crop"] for _, c in flat],
+        [c["estimated_yield"] for _, c in flat],
+        [features["area"] for features, _ in flat],
+    )
+    for (_, c), fin in zip(flat, financials):
+        c["financials"] = fin
+        c["profit"] = fin["net_profit_inr"] if fin else -float("inf")
+
+
+def _attach_analytics(pairs: list) -> None:
+    """Fill result["analytics"] for every (data, result) pair in one pass."""
+    analytics = generate_farm_analytics_batch(
+        [result["crop"] for _, result in pairs],
+        [data.get("soil", {}) for data, _ in pairs],
+        [data.get("climate", {}) for data, _ in pairs],
+        [data.get("area", 1.0) for data, _ in pairs],
+    )
+    for (_, result), a in zip(pairs, analytics):
+        result["analytics"] = a
+
+
+def _candidate_summaries(candidates: list) -> list:
+    return [
+        {
+            "crop": str(c["crop"]),
+            "confidence": c["confidence"],
+            "estimated_yield": c.get("estimated_yield"),
+            "financials": c.get("financials"),
+        }
+        for c in candidates
+    ]
+
+
+def expand_candidate_analytics(pairs: list) -> None:
+    """Add "analytics" to each candidate of every (data, candidates) pair,
+    in one vectorized pass. Only run when a client asks for it."""
+    flat = [(data, c) for data, candidates in pairs for c in candidates]
+    analytics = generate_farm_analytics_batch(
+        [c["crop"] for _, c in flat],
+        [data.get("soil", {}) for data, _ in flat],
+        [data.get("climate", {}) for data, _ in flat],
+        [data.get("area", 1.0) for data, _ in flat],
+    )
+    for (_, c), a in zip(flat, analytics):
+        c["analytics"] = a
+
+
+def _select_crop(data: dict, features: dict, candidates: list, model_version: str) -> dict:
+    """Most profitable candidate; expects _attach_financials to have run.
+    analytics is left for _attach_analytics."""
+    best, highest_profit = None, -float("inf")
+
+    for c in candidates:
+        if c["profit"] > highest_profit:
+            highest_profit = c["profit"]
+            best = c
+
+    if not best or best["profit"] == -float("inf"):
+        best = candidates[0]
+
+    crop = best["crop"]
+    confidence = best["confidence"]
+
+    if confidence < CONFIDENCE_THRESHOLD:
+        fallback_crop = "Wheat" if data.get("soil", {}).get("ph", 0) >= 6 else "Millet"
+        fallback_yield = data.get("area", 1.0) * BASELINE_YIELD_PER_HA
         return {
-            "crop": crop,
-            "confidence": confidence,
-            "estimated_yield": best.get("estimated_yield"),
-            "financials": best.get("financials"),
-            "analytics": analytics,
-            "source": "financial_optimization_engine",
-            "model_version": ml_client.model_version,
-            "reason": "ml_prediction",
+            "crop": fallback_crop,
+            "confidence": 0.85,
+            "estimated_yield": fallback_yield,
+            "financials": calculate_profits([fallback_crop], [fallback_yield], [data.get("area", 1.0)])[0],
+            "analytics": None,
+            "source": "rule_fallback",
+            "model_version": model_version,
+            "reason": "low_confidence_fallback",
+            "candidates": _candidate_summaries(candidates),
         }
 
+    logger.info(f"Selected: {crop} | Profit: {highest_profit}")
+
+    return {
+        "crop": crop,
+        "confidence": confidence,
+        "estimated_yield": best.get("estimated_yield"),
+        "financials": best.get("financials"),
+        "analytics": None,
+        "source": "financial_optimization_engine",
+        "model_version": model_version,
+        "reason": "ml_prediction",
+        "candidates": _candidate_summaries(candidates),
+    }
+
+
+def decide_crop(data: dict, tier: str = None) -> dict:
+    """tier="fast" scores with the distilled model when one is loaded."""
+    ml_client = get_ml_client()
+    model_version = ml_client.version_for(tier)
+
+    try:
+        key = None
+        if _cache_enabled():
+            key = _cache_key(data, model_version)
+            cached = get_decision_cache().get(key)
+            if cached is not None:
+                return cached
+
+        features = _build_features(data)
+        candidates = ml_client.predict_top_k(features, k=TOP_K, tier=tier)
+        _attach_financials([(features, candidates)])
+        result = _select_crop(data, features, candidates, model_version)
+        _attach_analytics([(data, result)])
+
+        if key is not None:
+            get_decision_cache().set(key, result)
+        return result
+
     except Exception as e:
         logger.error(f"Decision engine error: {e}")
-        return {
-            "crop": "Millet",
-            "confidence": 0.80,
-            "estimated_yield": None,
-            "financials": None,
-            "analytics": {},
-            "source": "rule_fallback_error",
-            "model_version": "unknown",
-            "reason": "ml_error_fallback",
-            "error": str(e),
-        }
+        return _error_fallback(e)
+
+
+@lru_cache(maxsize=1)
+def get_decision_executor() -> ThreadPoolExecutor:
+    """Bounded pool so CPU-bound decisions can't starve an async worker."""
+    from django.conf import settings
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "DECISION_THREADS", 4),
+        thread_name_prefix="decide-crop",
+    )
+
+
+async def adecide_crop(data: dict, tier: str = None) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_decision_executor(), decide_crop, data, tier)
+
+
+def decide_crop_batch(data_list: list, tier: str = None) -> list:
+    """Vectorized decide_crop: one classifier call for the whole batch."""
+    ml_client = get_ml_client()
+    model_version = ml_client.version_for(tier)
+    cache = get_decision_cache() if _cache_enabled() else None
+    results = [None] * len(data_list)
+    keys = [None] * len(data_list)
+
+    try:
+        if cache is not None:
+            for i, data in enumerate(data_list):
+                keys[i] = _cache_key(data, model_version)
+                results[i] = cache.get(keys[i])
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        features_list = [_build_features(data_list[i]) for i in pending]
+        batch_candidates = ml_client.predict_top_k_batch(features_list, k=TOP_K, tier=tier)
+        _attach_financials(list(zip(features_list, batch_candidates)))
+    except Exception as e:
+        logger.error(f"Batch decision engine error: {e}")
+        return [_error_fallback(e) for _ in data_list]
+
+    selected = []
+
+    for i, features, candidates in zip(pending, features_list, batch_candidates):
+        try:
+            results[i] = _select_crop(data_list[i], features, candidates, model_version)
+            selected.append(i)
+        except Exception as e:
+            logger.error(f"Decision engine error: {e}")
+            results[i] = _error_fallback(e)
+
+    _attach_analytics([(data_list[i], results[i]) for i in selected])
+    if cache is not None:
+        for i in selected:
+            cache.set(keys[i], results[i])
+
+    return results
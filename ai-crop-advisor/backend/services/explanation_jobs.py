@@ -0,0 +1,87 @@
+"""
+Explanation Jobs
+
+Runs LLM explanations on a background thread pool so the recommend
+endpoint can answer as soon as the crop decision is ready.
+
+Job state lives in its own Django cache alias (EXPLANATION_JOBS_CACHE_ALIAS),
+so other cache traffic can't cull a job before it is polled. With the
+default LocMem cache a job can only be polled on the worker that created
+it; set REDIS_URL so any worker can answer the poll.
+
+At most EXPLANATION_QUEUE_SIZE jobs are queued or running per process.
+When they are all taken submit() returns None and the caller answers with
+the template explanation, so no job waits in the queue past its TTL.
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from services.explanation_service import ExplanationService
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+JOB_TTL_SECONDS = 15 * 60
+
+
+@lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    from django.conf import settings
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, "EXPLANATION_WORKERS", 4),
+        thread_name_prefix="explanation",
+    )
+
+
+@lru_cache(maxsize=1)
+def _slots() -> threading.BoundedSemaphore:
+    from django.conf import settings
+    return threading.BoundedSemaphore(getattr(settings, "EXPLANATION_QUEUE_SIZE", 100))
+
+
+def _cache():
+    from django.conf import settings
+    from django.core.cache import caches
+    return caches[getattr(settings, "EXPLANATION_JOBS_CACHE_ALIAS", "explanation_jobs")]
+
+
+def _job_key(job_id: str) -> str:
+    return f"explanation_job:{job_id}"
+
+
+def get_job(job_id: str) -> dict:
+    """{"status": ..., "explanation": ...} or None for unknown/expired ids."""
+    return _cache().get(_job_key(job_id))
+
+
+def _run(job_id: str, kwargs: dict) -> None:
+    try:
+        # submit() callers have already counted the lookup via cached().
+        explanation = ExplanationService().generate(**kwargs, recheck=True)
+    except Exception as e:
+        logger.error(f"Background explanation {job_id} failed: {e}")
+        explanation = ExplanationService.fallback(kwargs["crop"], kwargs["soil_ph"])
+    finally:
+        _slots().release()
+    _cache().set(_job_key(job_id), {"status": READY, "explanation": explanation}, timeout=JOB_TTL_SECONDS)
+
+
+def submit(**kwargs):
+    """Queue ExplanationService.generate(**kwargs); returns the job id, or
+    None when the queue is full."""
+    if not _slots().acquire(blocking=False):
+        logger.warning("Explanation queue full, answering with the template")
+        return None
+    job_id = uuid.uuid4().hex
+    try:
+        _cache().set(_job_key(job_id), {"status": PENDING, "explanation": None}, timeout=JOB_TTL_SECONDS)
+        get_executor().submit(_run, job_id, kwargs)
+    except Exception:
+        _slots().release()
+        raise
+    return job_id
@@ -1,15 +1,124 @@
 import logging
+from functools import lru_cache
+
 from services.llm_service import LLMService
+from services.response_cache import ResponseCache, DjangoCacheBackend, fingerprint
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def get_explanation_cache() -> ResponseCache:
+    from django.conf import settings
+    return ResponseCache(DjangoCacheBackend(
+        alias=getattr(settings, "EXPLANATION_CACHE_ALIAS", "explanations"),
+        ttl=getattr(settings, "EXPLANATION_CACHE_TTL_SECONDS", 30 * 24 * 3600),
+        prefix="explanation",
+    ))
+
+
+def _bucket_ph(soil_ph, step: float) -> float:
+    return round(round(float(soil_ph) / step) * step, 2)
+
+
+def _confidence_band(confidence) -> str:
+    if confidence and confidence > 0.8:
+        return "high"
+    if confidence and confidence < 0.5:
+        return "low"
+    return "normal"
+
+
 class ExplanationService:
 
     def __init__(self):
         self.llm = LLMService()
 
-    def generate(self, crop, soil_ph, confidence=None, reason=None, last_crop=None, lang="en"):
+    def _normalize(self, crop, soil_ph, confidence, last_crop, lang) -> tuple:
+        from django.conf import settings
+
+        # Prompt on the bucketed pH so a cached text is true for the whole bucket.
+        soil_ph = _bucket_ph(soil_ph, getattr(settings, "EXPLANATION_CACHE_PH_STEP", 0.1))
+        band = _confidence_band(confidence)
+        last_crop = (last_crop or "").strip().capitalize() or None
+        key = fingerprint(str(crop).lower(), soil_ph, band, last_crop, lang)
+        return soil_ph, band, last_crop, key
+
+    def _cache_get(self, key, count: bool = True):
+        try:
+            return get_explanation_cache().get(key, count=count)
+        except Exception as e:
+            logger.warning(f"Explanation cache unavailable: {e}")
+            return None
+
+    def cached(self, crop, soil_ph, confidence=None, reason=None, last_crop=None, lang="en"):
+        """The cached explanation for these inputs, without calling the LLM."""
+        return self._cache_get(self._normalize(crop, soil_ph, confidence, last_crop, lang)[3])
+
+    def generate(self, crop, soil_ph, confidence=None, reason=None, last_crop=None, lang="en", recheck=False):
+        """The explanation for these inputs, from the cache or the LLM.
+
+        With recheck, the caller has already counted this lookup through
+        cached(); the cache is consulted again (another worker may have
+        filled it since) without counting a second hit or miss.
+        """
+        prompt_ph, band, last_crop, key = self._normalize(crop, soil_ph, confidence, last_crop, lang)
+
+        cached = self._cache_get(key, count=not recheck)
+        if cached is not None:
+            return cached
+
+        try:
+            reply = self.llm.reason_multilingual(self._build_prompt(crop, prompt_ph, band, last_crop, lang))
+        except Exception as e:
+            logger.error(f"Explanation generation failed: {e}")
+            reply = None
+        return self._finish(key, reply, crop, soil_ph)
+
+    async def agenerate(self, crop, soil_ph, confidence=None, reason=None, last_crop=None, lang="en"):
+        """generate() for async views, on AsyncLLMService."""
+        from asgiref.sync import sync_to_async
+        from services.llm_service import AsyncLLMService
+
+        prompt_ph, band, last_crop, key = self._normalize(crop, soil_ph, confidence, last_crop, lang)
+
+        cached = await sync_to_async(self._cache_get, thread_sensitive=False)(key)
+        if cached is not None:
+            return cached
+
+        try:
+            reply = await AsyncLLMService().reason_multilingual(
+                self._build_prompt(crop, prompt_ph, band, last_crop, lang)
+            )
+        except Exception as e:
+            logger.error(f"Explanation generation failed: {e}")
+            reply = None
+        return await sync_to_async(self._finish, thread_sensitive=False)(key, reply, crop, soil_ph)
+
+    @staticmethod
+    def fallback(crop, soil_ph) -> str:
+        """Template explanation used whenever the LLM can't provide one."""
+        return f"Based on your soil pH of {soil_ph}, planting {crop} is highly recommended to maximize yield."
+
+    def _finish(self, key, reply, crop, soil_ph) -> str:
+        """Clean and cache an LLM reply, or fall back to the template.
+
+        The template is not cached, so it quotes the farmer's own pH rather
+        than the bucket's.
+        """
+        cleaned = reply.replace("*", "").replace("#", "").strip() if reply else ""
+        if not cleaned or "📝" in cleaned:
+            if reply is not None:
+                logger.error("Explanation generation failed: LLM unavailable")
+            return self.fallback(crop, soil_ph)
+
+        try:
+            get_explanation_cache().set(key, cleaned)
+        except Exception as e:
+            logger.warning(f"Explanation cache unavailable: {e}")
+        return cleaned
+
+    def _build_prompt(self, crop, soil_ph, band, last_crop, lang) -> str:
         lang_map = {
             "en": "English",
             "hi": "Hindi (in native Devanagari script, NOT English letters)",
@@ -18,11 +127,10 @@ class ExplanationService:
         }
         language = lang_map.get(lang, "English")
 
-        note = ""
-        if confidence and confidence > 0.8:
-            note = "The AI model is highly confident in this recommendation."
-        elif confidence and confidence < 0.5:
-            note = "This is a safe fallback recommendation due to unusual soil data."
+        note = {
+            "high": "The AI model is highly confident in this recommendation.",
+            "low": "This is a safe fallback recommendation due to unusual soil data.",
+        }.get(band, "")
 
         script_rule = ""
         if lang != "en":
@@ -30,7 +138,7 @@ class ExplanationService:
 - Use native script (Devanagari, Gujarati). Do not use English characters.
 - Translate crop names properly (e.g., 'गहू' for Wheat, 'तांदूळ' for Rice)."""
 
-        prompt = f"""You are an AI agricultural assistant. Output exactly 3 sentences in {language}.
+        return f"""You are an AI agricultural assistant. Output exactly 3 sentences in {language}.
 No greetings, no pleasantries, no filler. Do not use words like 'अरे', 'नमस्कार', or 'मित्रा'.
 Start immediately with the recommendation.
 
@@ -43,14 +151,3 @@ RULES:
 - Use formal, standard agricultural vocabulary.{script_rule}
 
 OUTPUT (3 SENTENCES IN {language}):"""
-
-        try:
-            reply = self.llm.reason_multilingual(prompt)
-            cleaned = reply.replace("*", "").replace("#", "").strip()
-            if "📝" in cleaned:
-                raise Exception("LLM unavailable")
-            return cleaned
-        except Exception as e:
-            logger.error(f"Explanation generation failed: {e}")
-
-        return f"Based on your soil pH of {soil_ph}, planting {crop} is highly recommended to maximize yield."
\ No newline at end of file
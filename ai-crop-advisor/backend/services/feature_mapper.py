@@ -2,15 +2,16 @@
 Feature Mapper
 
 Transforms API input into ML-ready feature vector.
-Loads dataset only once per process.
+Reads dataset column statistics only once per process.
 """
 
+import pandas as pd
+
 from services.data_service import DatasetService
 
 
 class FeatureMapper:
 
-    _cached_dataset = None
     _cached_averages = None
 
     REQUIRED_COLUMNS = [
@@ -25,14 +26,15 @@ class FeatureMapper:
 
     def __init__(self):
 
-        if FeatureMapper._cached_dataset is None:
-            ds = DatasetService()
-            dataset = ds.load_dataset()
+        if FeatureMapper._cached_averages is None:
+            # Column statistics come from the dataset's stats sidecar;
+            # no rows are loaded.
+            stats = DatasetService().get_stats()
 
             # Validate required columns exist
             missing = [
                 col for col in self.REQUIRED_COLUMNS
-                if col not in dataset.columns
+                if col not in stats
             ]
 
             if missing:
@@ -40,12 +42,10 @@ class FeatureMapper:
                     f"Dataset missing required columns: {missing}"
                 )
 
-            FeatureMapper._cached_dataset = dataset
-            FeatureMapper._cached_averages = dataset.mean(
-                numeric_only=True
+            FeatureMapper._cached_averages = pd.Series(
+                {col: info["mean"] for col, info in stats.items()}
             )
 
-        self.dataset = FeatureMapper._cached_dataset
         self.averages = FeatureMapper._cached_averages
 
     def build_feature_vector(self, api_input: dict) -> dict:
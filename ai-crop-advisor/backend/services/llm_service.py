@@ -1,47 +1,484 @@
 import os
+import random
+import threading
+import time
+import asyncio
+import hashlib
+import json
+import weakref
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_limiter = None
+
+# Time-to-first-token for streamed completions, per process.
+stream_stats = {"streams": 0, "last_ttft_ms": None, "avg_ttft_ms": None, "max_ttft_ms": None}
+_stats_lock = threading.Lock()
+
+
+def record_ttft(ttft_ms: float) -> None:
+    with _stats_lock:
+        n = stream_stats["streams"] + 1
+        avg = stream_stats["avg_ttft_ms"] or 0.0
+        stream_stats.update({
+            "streams": n,
+            "last_ttft_ms": round(ttft_ms, 1),
+            "avg_ttft_ms": round(avg + (ttft_ms - avg) / n, 1),
+            "max_ttft_ms": round(max(ttft_ms, stream_stats["max_ttft_ms"] or 0.0), 1),
+        })
+
+
+# Single-flight: identical prompts already in flight share one upstream call.
+single_flight_stats = {"upstream_calls": 0, "coalesced": 0}
+
+
+def _count(stat: str) -> None:
+    with _stats_lock:
+        single_flight_stats[stat] += 1
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; concurrent callers with the same key
+    wait for and share the in-flight result (or exception)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key: str, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            _count("coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        _count("upstream_calls")
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop.
+
+    The shared call runs as its own task, so cancelling any caller (the
+    first one included) never cancels it for the others.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key: str, fn):
+        flight = self._flights.get(key)
+        if flight is not None:
+            _count("coalesced")
+        else:
+            _count("upstream_calls")
+            flight = self._flights[key] = asyncio.ensure_future(fn())
+            flight.add_done_callback(lambda f: self._finish(key, f))
+        return await asyncio.shield(flight)
+
+    def _finish(self, key: str, flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the outcome as retrieved even when every caller went away.
+        if not flight.cancelled():
+            flight.exception()
+
+
+_single_flight = SingleFlight()
+
+
+def _single_flight_enabled() -> bool:
+    return os.getenv("LLM_SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+
+
+def _prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha1(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session so calls reuse TCP+TLS connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(os.getenv("LLM_POOL_SIZE", "16"))
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+                session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+                _session = session
+    return _session
+
+
+def get_limiter() -> threading.BoundedSemaphore:
+    """Caps concurrent upstream LLM calls per process."""
+    global _limiter
+    if _limiter is None:
+        with _session_lock:
+            if _limiter is None:
+                _limiter = threading.BoundedSemaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+    return _limiter
+
+
+_SSE_DONE = object()
+
+
+def _sse_content(line: str):
+    """Text delta from one `data: ...` line of an OpenAI-style stream.
+
+    Returns None for keep-alives and empty deltas, _SSE_DONE at the end.
+    """
+    if not line or not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return _SSE_DONE
+    try:
+        choices = json.loads(data).get("choices") or [{}]
+    except ValueError:
+        return None
+    return choices[0].get("delta", {}).get("content") or None
+
 
 class LLMService:
 
     def __init__(self):
-        self.url = "https://api.groq.com/openai/v1/chat/completions"
+        self.url = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
         self.api_key = os.getenv("GROQ_API_KEY")
         self.model = "llama-3.3-70b-versatile"
+        self.timeout = (_env_float("LLM_CONNECT_TIMEOUT", 3.05), _env_float("LLM_READ_TIMEOUT", 15))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.backoff = _env_float("LLM_RETRY_BACKOFF", 0.5)
+        self.max_backoff = _env_float("LLM_RETRY_MAX_BACKOFF", 4.0)
+        self.queue_timeout = _env_float("LLM_QUEUE_TIMEOUT", 0)
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            # Full jitter: spreads retries from many workers instead of syncing them.
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+        return min(delay, self.max_backoff)
+
+    def _headers(self) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+
+    def _payload(self, prompt: str, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 512,
+            "stream": stream,
+        }
+
+    def _parse_reply(self, response, prompt: str) -> str:
+        """Reply text or 📝 fallback; works for requests and httpx responses."""
+        if response.status_code != 200:
+            logger.error(f"Groq API error {response.status_code}: {response.text}")
+            return f"📝 (Groq Error: {response.status_code}) \n\nRaw Data:\n{prompt}"
+
+        data = response.json()
+        if "choices" in data and len(data["choices"]) > 0:
+            return data["choices"][0]["message"]["content"].strip()
+
+        return f"📝 (Empty response)\n\n{prompt}"
+
+    def _post(self, payload: dict, stream: bool = False) -> requests.Response:
+        """POST with retries on 429/5xx and failed connects.
+
+        Read timeouts are not retried: the request may already be running
+        upstream and another full wait would only delay the fallback.
+        """
+        session = get_session()
+        headers = self._headers()
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = session.post(self.url, headers=headers, json=payload, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError:
+                if last_attempt:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            logger.warning(f"Groq API {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+            response.close()
+            time.sleep(self._retry_delay(attempt, response))
+
+    def _acquire(self, limiter) -> bool:
+        if self.queue_timeout > 0:
+            acquired = limiter.acquire(timeout=self.queue_timeout)
+        else:
+            acquired = limiter.acquire(blocking=False)
+        if not acquired:
+            logger.warning("LLM concurrency limit reached, using fallback")
+        return acquired
 
     def reason_multilingual(self, prompt: str) -> str:
+        if not _single_flight_enabled():
+            return self._call_llm(prompt)
+        return _single_flight.do(_prompt_key(self.model, prompt), lambda: self._call_llm(prompt))
+
+    def _call_llm(self, prompt: str) -> str:
         if not self.api_key:
             return f"📝 (GROQ_API_KEY missing) \n\nRaw Data:\n{prompt}"
 
+        limiter = get_limiter()
+        if not self._acquire(limiter):
+            return f"📝 (AI busy)\n\n{prompt}"
+
         try:
-            response = requests.post(
-                self.url,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 512,
-                    "stream": False,
-                },
-                timeout=15,
-            )
+            return self._parse_reply(self._post(self._payload(prompt)), prompt)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Groq connection failed: {e}")
+            return f"📝 (Cloud AI Offline)\n\n{prompt}"
+        finally:
+            limiter.release()
 
-            if response.status_code != 200:
-                logger.error(f"Groq API error {response.status_code}: {response.text}")
-                return f"📝 (Groq Error: {response.status_code}) \n\nRaw Data:\n{prompt}"
+    def stream_multilingual(self, prompt: str):
+        """Yield reply text chunks as the completion streams in (stream=True).
+
+        Failures before the first token yield the usual 📝 fallback as a
+        single chunk; failures mid-stream end the stream early.
+        """
+        if not self.api_key:
+            yield f"📝 (GROQ_API_KEY missing) \n\nRaw Data:\n{prompt}"
+            return
 
-            data = response.json()
-            if "choices" in data and len(data["choices"]) > 0:
-                return data["choices"][0]["message"]["content"].strip()
+        limiter = get_limiter()
+        if not self._acquire(limiter):
+            yield f"📝 (AI busy)\n\n{prompt}"
+            return
 
-            return f"📝 (Empty response)\n\n{prompt}"
+        started = time.perf_counter()
+        response = None
+        first = True
+        try:
+            response = self._post(self._payload(prompt, stream=True), stream=True)
+            if response.status_code != 200:
+                yield self._parse_reply(response, prompt)
+                return
+
+            for line in response.iter_lines(decode_unicode=True):
+                content = _sse_content(line)
+                if content is None:
+                    continue
+                if content is _SSE_DONE:
+                    break
+                if first:
+                    first = False
+                    record_ttft((time.perf_counter() - started) * 1000)
+                yield content
 
         except requests.exceptions.RequestException as e:
+            logger.error(f"Groq stream failed: {e}")
+            if first:
+                yield f"📝 (Cloud AI Offline)\n\n{prompt}"
+        finally:
+            if response is not None:
+                response.close()
+            limiter.release()
+
+
+# Per-event-loop pooled clients and limiters: httpx clients and asyncio
+# semaphores are bound to the loop they were created on.
+#
+# Connection pooling only pays off on a long-lived loop, i.e. under ASGI
+# (uvicorn), where every request shares the server's loop. Under WSGI each
+# async_to_sync call runs on a fresh loop that is closed afterwards, so its
+# client is used for one request and closed with the loop (see
+# _close_on_loop_shutdown) rather than leaked.
+_async_clients = weakref.WeakKeyDictionary()
+_async_limiters = weakref.WeakKeyDictionary()
+_async_flights = weakref.WeakKeyDictionary()
+
+
+async def _close_on_loop_shutdown(client):
+    # Parked at the yield; asyncio.run() and asgiref close a loop's pending
+    # async generators with loop.shutdown_asyncgens(), which runs the finally.
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def get_async_client():
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        pool_size = int(os.getenv("LLM_ASYNC_POOL_SIZE", "100"))
+        client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size,
+        ))
+        # The loop only keeps a weak reference to the generator.
+        entry = _async_clients[loop] = (client, _close_on_loop_shutdown(client))
+        await entry[1].__anext__()
+    return entry[0]
+
+
+def get_async_limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limiter = _async_limiters.get(loop)
+    if limiter is None:
+        limiter = asyncio.Semaphore(int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY", "256")))
+        _async_limiters[loop] = limiter
+    return limiter
+
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    loop = asyncio.get_running_loop()
+    flights = _async_flights.get(loop)
+    if flights is None:
+        flights = _async_flights[loop] = AsyncSingleFlight()
+    return flights
+
+
+class AsyncLLMService(LLMService):
+    """LLMService on httpx.AsyncClient: waits on the LLM without holding a thread."""
+
+    async def _apost(self, payload: dict, stream: bool = False):
+        import httpx
+
+        client = await get_async_client()
+        timeout = httpx.Timeout(self.timeout[1], connect=self.timeout[0])
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            request = client.build_request("POST", self.url, headers=self._headers(), json=payload, timeout=timeout)
+            try:
+                response = await client.send(request, stream=stream)
+            except httpx.ConnectError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            logger.warning(f"Groq API {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+            await response.aclose()
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def _aacquire(self, limiter) -> bool:
+        if self.queue_timeout > 0:
+            try:
+                await asyncio.wait_for(limiter.acquire(), timeout=self.queue_timeout)
+                acquired = True
+            except asyncio.TimeoutError:
+                acquired = False
+        else:
+            # Nothing awaits between the check and the acquire, so this can't race.
+            acquired = not limiter.locked() and await limiter.acquire()
+        if not acquired:
+            logger.warning("LLM concurrency limit reached, using fallback")
+        return acquired
+
+    async def reason_multilingual(self, prompt: str) -> str:
+        if not _single_flight_enabled():
+            return await self._acall_llm(prompt)
+        return await get_async_single_flight().do(_prompt_key(self.model, prompt), lambda: self._acall_llm(prompt))
+
+    async def _acall_llm(self, prompt: str) -> str:
+        import httpx
+
+        if not self.api_key:
+            return f"📝 (GROQ_API_KEY missing) \n\nRaw Data:\n{prompt}"
+
+        limiter = get_async_limiter()
+        if not await self._aacquire(limiter):
+            return f"📝 (AI busy)\n\n{prompt}"
+
+        try:
+            return self._parse_reply(await self._apost(self._payload(prompt)), prompt)
+        except (httpx.HTTPError, ValueError) as e:
             logger.error(f"Groq connection failed: {e}")
-            return f"📝 (Cloud AI Offline)\n\n{prompt}"
\ No newline at end of file
+            return f"📝 (Cloud AI Offline)\n\n{prompt}"
+        finally:
+            limiter.release()
+
+    async def stream_multilingual(self, prompt: str):
+        """Async twin of LLMService.stream_multilingual."""
+        import httpx
+
+        if not self.api_key:
+            yield f"📝 (GROQ_API_KEY missing) \n\nRaw Data:\n{prompt}"
+            return
+
+        limiter = get_async_limiter()
+        if not await self._aacquire(limiter):
+            yield f"📝 (AI busy)\n\n{prompt}"
+            return
+
+        started = time.perf_counter()
+        response = None
+        first = True
+        try:
+            response = await self._apost(self._payload(prompt, stream=True), stream=True)
+            if response.status_code != 200:
+                await response.aread()
+                yield self._parse_reply(response, prompt)
+                return
+
+            async for line in response.aiter_lines():
+                content = _sse_content(line)
+                if content is None:
+                    continue
+                if content is _SSE_DONE:
+                    break
+                if first:
+                    first = False
+                    record_ttft((time.perf_counter() - started) * 1000)
+                yield content
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Groq stream failed: {e}")
+            if first:
+                yield f"📝 (Cloud AI Offline)\n\n{prompt}"
+        finally:
+            if response is not None:
+                await response.aclose()
+            limiter.release()
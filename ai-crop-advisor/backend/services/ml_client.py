@@ -1,16 +1,33 @@
 """ML Client — sklearn pipeline + XGBoost yield prediction."""
 
 import os
+import logging
 import joblib
 import numpy as np
 import pandas as pd
 from functools import lru_cache
 
+from services.compact_model import COMPACT_DIRNAME, CompactCropModel, export_pipeline
+from services.model_artifacts import LazyYieldModels, load_yield_artifacts
+from services.model_registry import POLL_SECONDS, ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+
+# Distilled student written by ml_engine.trainers.distill_crop_model
+FAST_MODEL_FILENAME = "crop_pipeline_fast.pkl"
+FAST = "fast"
+
+YIELD_FEATURES = [
+    "Crop_Year", "Area", "Annual_Rainfall", "Fertilizer", "Pesticide",
+    "Fertilizer_per_area", "Pesticide_per_area", "Season_enc", "State_enc",
+]
+
 
 class MLClient:
 
-    def __init__(self):
-        models_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+    def __init__(self, models_dir: str = MODELS_DIR, compact: bool = False):
 
         crop_data = joblib.load(os.path.join(models_dir, "crop_pipeline.pkl"))
         self.pipeline = crop_data["pipeline"]
@@ -19,61 +36,145 @@ class MLClient:
         self.feature_order = crop_data["features"]
         self.accuracy = crop_data.get("accuracy")
 
+        self.compact_model = None
+        if compact:
+            try:
+                self.compact_model = CompactCropModel.load(os.path.join(models_dir, COMPACT_DIRNAME))
+            except (OSError, KeyError) as e:
+                logger.warning(f"Compact crop model unavailable, using sklearn pipeline: {e}")
+
+        self.fast_model = None
+        self.fast_version = None
+        self.fast_info = None
+        fast_path = os.path.join(models_dir, FAST_MODEL_FILENAME)
+        if os.path.exists(fast_path):
+            try:
+                self._load_fast_model(fast_path)
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning(f"Fast crop model unavailable, serving every tier from the main model: {e}")
+
         try:
-            yield_data = joblib.load(os.path.join(models_dir, "yield_models.pkl"))
-            self.yield_models = yield_data.get("crop_models", {})
-            self.season_encoder = yield_data.get("season_encoder")
-            self.state_encoder = yield_data.get("state_encoder")
-            self.valid_yield_crops = yield_data.get("valid_crops", [])
+            (self.yield_models, self.season_encoder,
+             self.state_encoder, self.valid_yield_crops) = load_yield_artifacts(models_dir)
         except FileNotFoundError:
             self.yield_models = {}
             self.season_encoder = self.state_encoder = None
             self.valid_yield_crops = []
 
-    def _prepare_input_df(self, features: dict) -> pd.DataFrame:
+        self._build_lookup_tables()
+
+    def _load_fast_model(self, path: str) -> None:
+        """Load the distilled student as a pure-NumPy model.
+
+        Its output columns must be this pipeline's classes, in the same
+        order, so crop_names decodes both tiers.
+        """
+        fast_data = joblib.load(path)
+        classes = np.asarray(fast_data["classes"])
+        if fast_data["features"] != self.feature_order or not np.array_equal(classes, self.pipeline.classes_):
+            raise ValueError("fast model was distilled from a different crop pipeline")
+
+        self.fast_model = CompactCropModel(export_pipeline(fast_data["pipeline"], classes=classes))
+        self.fast_version = fast_data["model_version"]
+        self.fast_info = {
+            "model_version": self.fast_version,
+            "teacher_version": fast_data.get("teacher_version"),
+            **fast_data.get("metrics", {}),
+        }
+
+    def version_for(self, tier: str = None) -> str:
+        """Model version that answers requests for `tier`."""
+        return self.fast_version if tier == FAST and self.fast_model is not None else self.model_version
+
+    def _build_lookup_tables(self):
+        """Plain-Python views of the encoders for the per-request hot path.
+
+        sklearn's transform/inverse_transform validate their input on every
+        call; these give the same answers (including the classes_[0]
+        fallback for unseen seasons/states) with a dict or array lookup.
+        """
+        self.crop_names = np.asarray(self.label_encoder.classes_)
+        self.season_codes = _code_table(self.season_encoder)
+        self.state_codes = _code_table(self.state_encoder)
+        if self.season_encoder is not None and self.state_encoder is not None:
+            self.yield_crop_keys = frozenset(self.valid_yield_crops) & frozenset(self.yield_models)
+        else:
+            self.yield_crop_keys = frozenset()
+
+    def _enrich_row(self, features: dict) -> list:
         enriched = {**features}
         n, p, k = enriched.get("N", 0), enriched.get("P", 0), enriched.get("K", 0)
         enriched["NPK_ratio"] = n / max(p + k, 1)
         enriched["temp_humidity"] = enriched.get("temperature", 0) * enriched.get("humidity", 0)
         enriched["rainfall_humidity"] = enriched.get("rainfall", 0) * enriched.get("humidity", 0)
-        return pd.DataFrame([[enriched.get(c, 0) for c in self.feature_order]], columns=self.feature_order)
+        return [enriched.get(c, 0) for c in self.feature_order]
+
+    def _predict_proba(self, features_list: list, tier: str = None) -> np.ndarray:
+        rows = [self._enrich_row(f) for f in features_list]
+        if tier == FAST and self.fast_model is not None:
+            return self.fast_model.predict_proba(np.asarray(rows, dtype=np.float64))
+        if self.compact_model is not None:
+            return self.compact_model.predict_proba(np.asarray(rows, dtype=np.float64))
+        return self.pipeline.predict_proba(pd.DataFrame(rows, columns=self.feature_order))
+
+    def _yield_row(self, features: dict) -> list:
+        area = float(features.get("area", 1.0))
+        fertilizer = float(features.get("N", 0) + features.get("P", 0) + features.get("K", 0))
+        pesticide = float(features.get("pesticide", 10.0))
+
+        # Unseen seasons/states get code 0, i.e. classes_[0]: the same fallback
+        # the per-request LabelEncoder.transform path used.
+        season_enc = self.season_codes.get(features.get("season", "Kharif"), 0)
+        state_enc = self.state_codes.get(features.get("state", "Maharashtra"), 0)
+
+        return [
+            features.get("crop_year", 2024), area,
+            float(features.get("rainfall", 0) * 12),
+            fertilizer, pesticide,
+            fertilizer / area if area > 0 else 0,
+            pesticide / area if area > 0 else 0,
+            season_enc, state_enc,
+        ]
+
+    def _predict_yields(self, requests: list, features_list: list) -> list:
+        """Yields for (crop, field_index) pairs, one predict() per crop model.
+
+        Each field's yield row is built once, however many of its candidates
+        need it, and rows asking for the same crop are stacked into a single
+        frame for that crop's model.
+        """
+        yields = [None] * len(requests)
+        rows, groups = {}, {}
+
+        for pos, (crop, field) in enumerate(requests):
+            key = crop.capitalize()
+            if key not in self.yield_crop_keys:
+                continue
+            if field not in rows:
+                try:
+                    rows[field] = self._yield_row(features_list[field])
+                except Exception:
+                    rows[field] = None
+            if rows[field] is not None:
+                groups.setdefault(key, []).append(pos)
+
+        for key, positions in groups.items():
+            try:
+                frame = pd.DataFrame([rows[requests[pos][1]] for pos in positions], columns=YIELD_FEATURES)
+                predictions = self.yield_models[key].predict(frame)
+            except Exception:
+                continue
+            for pos, value in zip(positions, predictions):
+                yields[pos] = max(float(value), 0.0)
+
+        return yields
 
     def _predict_yield(self, crop: str, features: dict) -> float:
-        key = crop.capitalize()
-        if not (self.season_encoder and self.state_encoder and key in self.valid_yield_crops and key in self.yield_models):
-            return None
-        try:
-            area = float(features.get("area", 1.0))
-            fertilizer = float(features.get("N", 0) + features.get("P", 0) + features.get("K", 0))
-            pesticide = float(features.get("pesticide", 10.0))
-
-            try: season_enc = self.season_encoder.transform([features.get("season", "Kharif")])[0]
-            except ValueError: season_enc = self.season_encoder.transform([self.season_encoder.classes_[0]])[0]
-            try: state_enc = self.state_encoder.transform([features.get("state", "Maharashtra")])[0]
-            except ValueError: state_enc = self.state_encoder.transform([self.state_encoder.classes_[0]])[0]
-
-            row = pd.DataFrame([[
-                features.get("crop_year", 2024), area,
-                float(features.get("rainfall", 0) * 12),
-                fertilizer, pesticide,
-                fertilizer / area if area > 0 else 0,
-                pesticide / area if area > 0 else 0,
-                season_enc, state_enc,
-            ]], columns=[
-                "Crop_Year", "Area", "Annual_Rainfall", "Fertilizer", "Pesticide",
-                "Fertilizer_per_area", "Pesticide_per_area", "Season_enc", "State_enc",
-            ])
-
-            result = float(self.yield_models[key].predict(row)[0])
-            return max(result, 0.0)
-        except Exception:
-            return None
-
-    def predict(self, features: dict) -> dict:
-        df = self._prepare_input_df(features)
-        idx = self.pipeline.predict(df)[0]
-        crop = self.label_encoder.inverse_transform([idx])[0]
-        probs = self.pipeline.predict_proba(df)[0]
+        return self._predict_yields([(crop, 0)], [features])[0]
+
+    def predict(self, features: dict, tier: str = None) -> dict:
+        probs = self._predict_proba([features], tier)[0]
+        crop = self.crop_names[int(np.argmax(probs))]
 
         return {
             "prediction": {
@@ -82,27 +183,71 @@ class MLClient:
                 "estimated_yield": self._predict_yield(crop, features),
             },
             "source": "sklearn_pipeline",
-            "model_version": self.model_version,
+            "model_version": self.version_for(tier),
             "model_accuracy": self.accuracy,
         }
 
-    def predict_top_k(self, features: dict, k: int = 5) -> list:
-        df = self._prepare_input_df(features)
-        probs = self.pipeline.predict_proba(df)[0]
-        top_indices = np.argsort(probs)[::-1][:k]
+    def predict_top_k(self, features: dict, k: int = 5, tier: str = None) -> list:
+        # Same ranking as the batch endpoint; both fill the decision cache.
+        return self.predict_top_k_batch([features], k=k, tier=tier)[0]
+
+    def predict_top_k_batch(self, features_list: list, k: int = 5, tier: str = None) -> list:
+        """Top-k candidates for many fields with a single predict_proba call."""
+        if not features_list:
+            return []
+
+        probs = self._predict_proba(features_list, tier)
+        # Ties go to the lower class index.
+        top_indices = np.argsort(-probs, axis=1, kind="stable")[:, :k]
+        crops = self.crop_names[top_indices]
+        yields = self._predict_yields(
+            [(crop, row) for row in range(len(features_list)) for crop in crops[row]],
+            features_list,
+        )
+        yields = np.array(yields, dtype=object).reshape(top_indices.shape)
 
         return [
-            {
-                "crop": self.label_encoder.inverse_transform([i])[0],
-                "confidence": float(probs[i]),
-                "estimated_yield": self._predict_yield(
-                    self.label_encoder.inverse_transform([i])[0], features
-                ),
-            }
-            for i in top_indices
+            [
+                {
+                    "crop": crop,
+                    "confidence": float(probs[row, i]),
+                    "estimated_yield": estimated_yield,
+                }
+                for i, crop, estimated_yield in zip(top_indices[row], crops[row], yields[row])
+            ]
+            for row in range(len(features_list))
         ]
 
 
+def _code_table(encoder) -> dict:
+    """Map each class of a fitted LabelEncoder to its integer code.
+
+    Lookups are exact: like LabelEncoder.transform, "kharif" is not "Kharif".
+    """
+    if encoder is None:
+        return {}
+    return {label: code for code, label in enumerate(encoder.classes_.tolist())}
+
+
 @lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    from django.conf import settings
+    return ModelRegistry(
+        MODELS_DIR,
+        compact=getattr(settings, "ML_COMPACT_INFERENCE", False),
+        poll_seconds=getattr(settings, "MODEL_REGISTRY_POLL_SECONDS", POLL_SECONDS),
+    )
+
+
 def get_ml_client() -> MLClient:
-    return MLClient()
\ No newline at end of file
+    """The currently active client; re-fetch per request to pick up swaps."""
+    return get_model_registry().get()
+
+
+def preload_models() -> MLClient:
+    """Fully load the shared client, e.g. in the gunicorn master before fork,
+    so workers inherit the models copy-on-write instead of loading their own."""
+    client = get_ml_client()
+    if isinstance(client.yield_models, LazyYieldModels):
+        client.yield_models.load_all()
+    return client
@@ -0,0 +1,120 @@
+"""
+Model Artifacts
+
+Split layout for the yield models.
+
+`yield_models.pkl` holds every per-crop XGBoost model in one pickle, so each
+process pays for all of them up front. The split layout keeps the shared
+encoders in `yield_models/_meta.pkl` and one joblib file per crop, loaded
+the first time that crop is scored, so a process only holds the crops it
+has actually served.
+
+An XGBoost booster pickles as an opaque byte buffer that is parsed into
+native trees on load, so these files cannot be memory-mapped. Sharing
+between gunicorn workers comes from preloading in the master instead
+(preload_models + gc.freeze() in gunicorn.conf.py), which leaves the
+models in copy-on-write pages.
+
+Split an existing artifact once:
+
+    python -m services.model_artifacts [models_dir]
+"""
+
+import os
+import sys
+import threading
+from collections.abc import Mapping
+
+import joblib
+
+YIELD_DIRNAME = "yield_models"
+YIELD_META_FILENAME = "_meta.pkl"
+
+
+class LazyYieldModels(Mapping):
+    """Read-only crop -> model mapping that loads each model on first use."""
+
+    def __init__(self, directory: str, crops: list):
+        self.directory = directory
+        self._crops = list(crops)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, crop):
+        model = self._loaded.get(crop)
+        if model is not None:
+            return model
+        if crop not in self._crops:
+            raise KeyError(crop)
+
+        with self._lock:
+            if crop not in self._loaded:
+                path = os.path.join(self.directory, f"{crop}.pkl")
+                self._loaded[crop] = joblib.load(path)
+            return self._loaded[crop]
+
+    def __iter__(self):
+        return iter(self._crops)
+
+    def __len__(self):
+        return len(self._crops)
+
+    def __contains__(self, crop):
+        return crop in self._crops
+
+    @property
+    def loaded_count(self) -> int:
+        return len(self._loaded)
+
+    def load_all(self) -> None:
+        for crop in self._crops:
+            self[crop]
+
+
+def load_yield_artifacts(models_dir: str):
+    """Return (models, season_encoder, state_encoder, valid_crops).
+
+    Prefers the split directory; falls back to the single yield_models.pkl.
+    Raises FileNotFoundError when neither exists.
+    """
+    split_dir = os.path.join(models_dir, YIELD_DIRNAME)
+    if os.path.isdir(split_dir):
+        meta = joblib.load(os.path.join(split_dir, YIELD_META_FILENAME))
+        models = LazyYieldModels(split_dir, meta.get("crops", []))
+    else:
+        meta = joblib.load(os.path.join(models_dir, "yield_models.pkl"))
+        models = meta.get("crop_models", {})
+
+    return models, meta.get("season_encoder"), meta.get("state_encoder"), meta.get("valid_crops", [])
+
+
+def split_yield_models(models_dir: str) -> str:
+    yield_data = joblib.load(os.path.join(models_dir, "yield_models.pkl"))
+    split_dir = os.path.join(models_dir, YIELD_DIRNAME)
+    os.makedirs(split_dir, exist_ok=True)
+
+    crop_models = yield_data.get("crop_models", {})
+    for crop, model in crop_models.items():
+        # Uncompressed: loading is a plain read, with no decompression pass.
+        joblib.dump(model, os.path.join(split_dir, f"{crop}.pkl"), compress=0)
+
+    joblib.dump({
+        "crops": list(crop_models),
+        "season_encoder": yield_data.get("season_encoder"),
+        "state_encoder": yield_data.get("state_encoder"),
+        "valid_crops": yield_data.get("valid_crops", []),
+    }, os.path.join(split_dir, YIELD_META_FILENAME))
+
+    return split_dir
+
+
+def main(models_dir: str = None) -> int:
+    from services.ml_client import MODELS_DIR
+
+    split_dir = split_yield_models(models_dir or MODELS_DIR)
+    print(f"Yield models split into {split_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(*sys.argv[1:2]))
@@ -0,0 +1,213 @@
+"""
+Model Registry
+
+Versioned model artifacts with zero-downtime swaps.
+
+Layout under backend/models/:
+
+    manifest.json          {"active": "2025-kharif"}
+    2025-kharif/           crop_pipeline.pkl, yield_models/, ...
+    2025-rabi/
+
+Without a manifest the flat backend/models/ directory is served as before.
+The manifest is re-checked at most every MODEL_REGISTRY_POLL_SECONDS; a new
+active version is loaded on a background thread and swapped in with a single
+reference assignment, so in-flight requests finish on the client they
+already hold.
+
+Activate a version:
+
+    python -m services.model_registry <version> [models_dir]
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+POLL_SECONDS = 30
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Peak RSS is the best portable fallback (KiB on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ModelRegistry:
+
+    def __init__(self, models_dir: str, compact: bool = False, poll_seconds: float = POLL_SECONDS):
+        self.models_dir = models_dir
+        self.manifest_path = os.path.join(models_dir, MANIFEST_FILENAME)
+        self.compact = compact
+        self.poll_seconds = poll_seconds
+
+        self._client = None
+        self._manifest_mtime = None
+        self._next_poll = 0.0
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.stats = {
+            "active_version": None,
+            "loaded_at": None,
+            "last_reload_seconds": None,
+            "last_reload_memory_delta_bytes": None,
+            "reload_count": 0,
+            "last_error": None,
+        }
+
+    # ---------------------------------
+    # Manifest
+    # ---------------------------------
+    def read_manifest(self) -> dict:
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _resolve(self, version: str = None) -> tuple:
+        """Return (version, directory) for the requested or active version."""
+        if version is None:
+            if not os.path.exists(self.manifest_path):
+                return None, self.models_dir
+            version = self.read_manifest()["active"]
+
+        validate_version(version)
+        version_dir = os.path.join(self.models_dir, version)
+        if not os.path.isdir(version_dir):
+            raise FileNotFoundError(f"Model version not found: {version_dir}")
+        return version, version_dir
+
+    def _current_manifest_mtime(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _manifest_changed(self) -> bool:
+        return self._current_manifest_mtime() != self._manifest_mtime
+
+    # ---------------------------------
+    # Loading
+    # ---------------------------------
+    def _load(self, version: str = None):
+        from services.ml_client import MLClient
+
+        # Taken before reading the manifest so a change made during the load
+        # is still seen, but only recorded once the swap succeeded: after a
+        # failure the next poll retries.
+        manifest_mtime = self._current_manifest_mtime()
+        version, directory = self._resolve(version)
+
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        client = MLClient(models_dir=directory, compact=self.compact)
+        elapsed = time.perf_counter() - started
+
+        # A single reference assignment: callers holding the old client keep it.
+        self._client = client
+        self._manifest_mtime = manifest_mtime
+        self.stats.update({
+            "active_version": version or client.model_version,
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+            "last_reload_seconds": round(elapsed, 3),
+            "last_reload_memory_delta_bytes": _rss_bytes() - rss_before,
+            "last_error": None,
+        })
+        logger.info(f"Loaded model version {self.stats['active_version']} in {elapsed:.2f}s")
+        return client
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._load_lock:
+                if self._client is None:
+                    self._load()
+                client = self._client
+
+        now = time.monotonic()
+        if self.poll_seconds is not None and now >= self._next_poll:
+            self._next_poll = now + self.poll_seconds
+            if self._manifest_changed():
+                self.reload()
+
+        return client
+
+    def reload(self, version: str = None, background: bool = True) -> bool:
+        """Load `version` (default: manifest's active one) and swap it in.
+
+        Returns False if a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._load(version)
+                self.stats["reload_count"] += 1
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                logger.error(f"Model reload failed, keeping {self.stats['active_version']}: {e}")
+            finally:
+                self._reload_lock.release()
+
+        if background:
+            threading.Thread(target=run, name="model-reload", daemon=True).start()
+        else:
+            run()
+        return True
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "reloading": self._reload_lock.locked(),
+            "process_rss_bytes": _rss_bytes(),
+        }
+
+
+def validate_version(version) -> None:
+    """Versions are plain directory names inside models_dir; anything that
+    could point elsewhere (separators, "..", absolute paths) is rejected."""
+    separators = {"/", "\\", os.sep} | ({os.altsep} if os.altsep else set())
+    if (
+        not isinstance(version, str) or version.strip(".") == "" or ".." in version
+        or os.path.isabs(version) or any(sep in version for sep in separators)
+    ):
+        raise ValueError(f"Invalid model version: {version!r}")
+
+
+def activate(version: str, models_dir: str) -> None:
+    """Point the manifest at `version`, atomically."""
+    validate_version(version)
+    if not os.path.isdir(os.path.join(models_dir, version)):
+        raise FileNotFoundError(f"Model version not found: {version}")
+
+    manifest_path = os.path.join(models_dir, MANIFEST_FILENAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"active": version, "activated_at": datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def main(version: str, models_dir: str = None) -> int:
+    from services.ml_client import MODELS_DIR
+
+    activate(version, models_dir or MODELS_DIR)
+    print(f"Activated model version {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m services.model_registry <version> [models_dir]")
+        raise SystemExit(1)
+    raise SystemExit(main(*sys.argv[1:3]))
@@ -0,0 +1,156 @@
+"""
+Recommendation Log
+
+Write-behind persistence of served recommendations.
+
+Views call record(); it only puts a Recommendation on an in-memory queue and
+never blocks the request. A background thread drains the queue and writes
+rows with bulk_create once RECOMMENDATION_LOG_BATCH_SIZE rows are waiting or
+RECOMMENDATION_LOG_FLUSH_SECONDS have passed. When the queue is full (the
+database can't keep up) new rows are dropped and counted rather than slowing
+requests down.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class RecommendationWriter:
+
+    def __init__(self, batch_size: int = 500, flush_seconds: float = 2.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def _ensure_thread(self):
+        # Started lazily, and again after a fork: threads don't survive
+        # gunicorn's preload fork.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name="recommendation-log", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _count(self, **increments):
+        # Request threads and the writer thread both update the stats.
+        with self._lock:
+            for name, n in increments.items():
+                self.stats[name] += n
+
+    def submit(self, row) -> bool:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count(dropped=1)
+            return False
+        self._count(queued=1)
+        return True
+
+    def _next_batch(self) -> tuple:
+        """(rows, stop): up to batch_size rows or whatever arrived in flush_seconds."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                if deadline is None:
+                    row = self._queue.get()
+                    deadline = time.monotonic() + self.flush_seconds
+                else:
+                    row = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _write(self, batch: list):
+        from django.db import close_old_connections
+        from recommendations.models import Recommendation
+
+        try:
+            Recommendation.objects.bulk_create(batch, batch_size=self.batch_size)
+            self._count(written=len(batch), batches=1)
+        except Exception as e:
+            self._count(failed=len(batch))
+            logger.error(f"Failed to write {len(batch)} recommendations: {e}")
+            close_old_connections()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued rows and stop the writer thread (called at exit)."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Recommendation log queue full at shutdown; pending rows are lost")
+            return
+        thread.join(timeout)
+
+    def info(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, "pending": self._queue.qsize()}
+
+
+@lru_cache(maxsize=1)
+def get_recommendation_writer() -> RecommendationWriter:
+    from django.conf import settings
+    writer = RecommendationWriter(
+        batch_size=getattr(settings, "RECOMMENDATION_LOG_BATCH_SIZE", 500),
+        flush_seconds=getattr(settings, "RECOMMENDATION_LOG_FLUSH_SECONDS", 2.0),
+        max_queue=getattr(settings, "RECOMMENDATION_LOG_MAX_QUEUE", 10000),
+    )
+    atexit.register(writer.close)
+    return writer
+
+
+def record(inputs: dict, result: dict, latency_ms: float, explanation=None) -> None:
+    """Queue a served recommendation for persistence."""
+    from django.conf import settings
+    from recommendations.models import Recommendation
+
+    if not getattr(settings, "RECOMMENDATION_LOG_ENABLED", True):
+        return
+
+    get_recommendation_writer().submit(Recommendation(
+        crop=result.get("crop") or "",
+        confidence=result.get("confidence"),
+        inputs=inputs,
+        outputs={
+            "estimated_yield": result.get("estimated_yield"),
+            "financials": result.get("financials"),
+            "reason": result.get("reason"),
+            "explanation": explanation,
+        },
+        model_version=result.get("model_version") or "",
+        source=result.get("source") or "",
+        latency_ms=round(latency_ms, 1),
+        created_at=timezone.now(),
+    ))
@@ -0,0 +1,159 @@
+"""
+Response Cache
+
+Bounded LRU/TTL caches for expensive, repeatable service calls.
+
+The default backend is an in-process OrderedDict; DjangoCacheBackend puts
+entries in a Django cache (Redis, database, file) so every worker shares hits.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class LocalLRUBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Entries in a configured Django cache; eviction is the cache's job.
+
+    The cache may be shared with other users, so clear() cannot empty it.
+    Values are stored with the prefix's current generation token instead,
+    clear() replaces the token, and entries from older generations read as
+    misses until the cache expires them.
+    """
+
+    shared = True
+    evictions = None
+    expirations = None
+
+    def __init__(self, alias: str = "default", ttl: float = 3600, prefix: str = "response"):
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+        self._generation_key = f"{prefix}:__generation__"
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key):
+        # Token and entry in one round trip.
+        key = f"{self.prefix}:{key}"
+        found = self._cache.get_many([self._generation_key, key])
+        entry = found.get(key)
+        # Anything but a (generation, value) pair predates generations.
+        if not isinstance(entry, tuple) or len(entry) != 2 or entry[0] != found.get(self._generation_key):
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        cache = self._cache
+        cache.set(f"{self.prefix}:{key}", (cache.get(self._generation_key), value), timeout=self.ttl)
+
+    def clear(self):
+        self._cache.set(self._generation_key, uuid.uuid4().hex, timeout=None)
+
+    def __len__(self):
+        return 0
+
+
+class ResponseCache:
+    """Counting front for a backend; values are deep-copied in and out so
+    callers can never mutate a shared cached response."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, count: bool = True):
+        """The cached value or None; count=False leaves hits/misses alone."""
+        value = self.backend.get(key)
+        if count:
+            with self._lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        if value is None:
+            return None
+        return copy.deepcopy(value) if not self.backend.shared else value
+
+    def set(self, key, value):
+        self.backend.set(key, copy.deepcopy(value) if not self.backend.shared else value)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend) if not self.backend.shared else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "evictions": self.backend.evictions,
+            "expirations": self.backend.expirations,
+        }
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of JSON-serializable key parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_cache(backend: str, max_entries: int, ttl: float, prefix: str, alias: str = "default") -> ResponseCache:
+    if backend == "django":
+        return ResponseCache(DjangoCacheBackend(alias=alias, ttl=ttl, prefix=prefix))
+    return ResponseCache(LocalLRUBackend(max_entries=max_entries, ttl=ttl))
@@ -1,18 +1,176 @@
 """
-Session-based in-memory history storage for recommendations.
-Stores last 5 recommendations per session.
+Session-based history storage for recommendations.
+Stores the last few recommendations per session.
+
+The default backend keeps history in process memory, bounded by a per-session
+deque, an idle TTL, a global session cap and a global byte budget (least
+recently used sessions are evicted first). DjangoCacheHistoryBackend stores it
+in a Django cache (Redis, database, ...) so every gunicorn worker sees the
+same history.
 """
 
-from collections import defaultdict
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
+from functools import lru_cache
 
+# Longest crop name kept in an entry; longer values are truncated.
+MAX_TEXT_CHARS = 64
 
-class SessionHistoryStore:
-    """In-memory store for session-based recommendation history."""
 
-    def __init__(self, max_per_session=5):
+def entry_bytes(entry: dict) -> int:
+    """Approximate memory held by one history entry."""
+    return sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+
+
+class LocalHistoryBackend:
+    """Thread-safe in-process history with LRU/TTL eviction of idle sessions.
+
+    Besides max_sessions, the entries of all sessions together are kept
+    under max_bytes (approximate, see entry_bytes).
+    """
+
+    shared = False
+
+    def __init__(self, max_per_session: int = 5, max_sessions: int = 10000, ttl: float = 24 * 3600,
+                 max_bytes: int = 32 * 1024 * 1024):
         self.max_per_session = max_per_session
-        self.store = defaultdict(list)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # session_id -> (last_used, history deque, bytes of its entries)
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop_oldest(self):
+        _, (_, _, size) = self._sessions.popitem(last=False)
+        self._bytes -= size
+
+    def _expire(self, now: float):
+        # Sessions are kept in last-used order, so idle ones sit at the front.
+        while self._sessions:
+            last_used = next(iter(self._sessions.values()))[0]
+            if last_used + self.ttl >= now:
+                break
+            self._drop_oldest()
+            self.expirations += 1
+
+    def add(self, session_id: str, entry: dict):
+        now = time.monotonic()
+        size = entry_bytes(entry)
+        with self._lock:
+            self._expire(now)
+            _, history, session_bytes = self._sessions.pop(session_id, (None, None, 0))
+            if history is None:
+                history = deque(maxlen=self.max_per_session)
+            # The deque drops its oldest entry once full.
+            delta = size - (entry_bytes(history[0]) if len(history) == history.maxlen else 0)
+            history.append(entry)
+            self._bytes += delta
+            self._sessions[session_id] = (now, history, session_bytes + delta)
+            while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+                self._drop_oldest()
+                self.evictions += 1
+
+    def get(self, session_id: str) -> list:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            item = self._sessions.get(session_id)
+            if item is None:
+                return []
+            self._sessions[session_id] = (now, *item[1:])
+            self._sessions.move_to_end(session_id)
+            return list(item[1])
+
+    def clear(self, session_id: str):
+        with self._lock:
+            _, _, size = self._sessions.pop(session_id, (None, None, 0))
+            self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = len(self._sessions)
+            entries = sum(len(history) for _, history, _ in self._sessions.values())
+            entry_total = self._bytes
+        return {
+            "sessions": sessions,
+            "entries": entries,
+            "approx_bytes": entry_total,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class DjangoCacheHistoryBackend:
+    """History in a configured Django cache; eviction and expiry are the cache's job.
+
+    Each entry gets its own key, numbered by cache.incr on a per-session
+    counter, so simultaneous requests for one session append without
+    overwriting each other. incr is atomic on Redis, Memcached and LocMem;
+    on the database and file caches it is itself a read-modify-write.
+    """
+
+    shared = True
+
+    def __init__(self, alias: str = "default", max_per_session: int = 5, ttl: float = 24 * 3600,
+                 prefix: str = "session_history"):
+        self.alias = alias
+        self.max_per_session = max_per_session
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _key(self, session_id: str, seq=None) -> str:
+        return f"{self.prefix}:{session_id}" if seq is None else f"{self.prefix}:{session_id}:{seq}"
+
+    def add(self, session_id: str, entry: dict):
+        cache = self._cache
+        counter = self._key(session_id)
+        cache.add(counter, 0, timeout=self.ttl)
+        try:
+            seq = cache.incr(counter)
+        except ValueError:
+            # The counter expired between add() and incr().
+            cache.add(counter, 0, timeout=self.ttl)
+            seq = cache.incr(counter)
+        cache.set(self._key(session_id, seq), entry, timeout=self.ttl)
+        cache.touch(counter, timeout=self.ttl)
+        if seq > self.max_per_session:
+            # Only the newest max_per_session entries are read.
+            cache.delete(self._key(session_id, seq - self.max_per_session))
+
+    def get(self, session_id: str) -> list:
+        cache = self._cache
+        seq = cache.get(self._key(session_id))
+        if not seq:
+            return []
+        keys = [self._key(session_id, n) for n in range(max(1, seq - self.max_per_session + 1), seq + 1)]
+        found = cache.get_many(keys)
+        return [found[key] for key in keys if key in found]
+
+    def clear(self, session_id: str):
+        self._cache.delete(self._key(session_id))
+
+    def stats(self) -> dict:
+        return {"alias": self.alias}
+
+
+class SessionHistoryStore:
+    """Session-based recommendation history on a pluggable backend."""
+
+    def __init__(self, backend=None, max_per_session=5):
+        self.backend = backend or LocalHistoryBackend(max_per_session=max_per_session)
 
     def add(self, session_id: str, crop: str, confidence: float):
         """Add recommendation to session history."""
@@ -20,33 +178,46 @@ class SessionHistoryStore:
         if not session_id:
             return
 
-        history = self.store[session_id]
-
-        # Add new recommendation
-        history.append({
-            "crop": crop,
+        self.backend.add(session_id, {
+            "crop": str(crop)[:MAX_TEXT_CHARS],
             "confidence": confidence,
             "timestamp": datetime.now().isoformat()
         })
 
-        # Keep only last N
-        if len(history) > self.max_per_session:
-            history.pop(0)
-
     def get(self, session_id: str):
         """Get session history."""
 
         if not session_id:
             return []
 
-        return self.store.get(session_id, [])
+        return self.backend.get(session_id)
 
     def clear(self, session_id: str):
         """Clear session history."""
 
-        if session_id in self.store:
-            del self.store[session_id]
-
-
-# Global store instance
-history_store = SessionHistoryStore(max_per_session=5)
+        self.backend.clear(session_id)
+
+    def stats(self) -> dict:
+        return {"backend": type(self.backend).__name__, **self.backend.stats()}
+
+
+@lru_cache(maxsize=1)
+def get_history_store() -> SessionHistoryStore:
+    from django.conf import settings
+
+    max_per_session = getattr(settings, "SESSION_HISTORY_MAX_PER_SESSION", 5)
+    ttl = getattr(settings, "SESSION_HISTORY_TTL_SECONDS", 24 * 3600)
+    if getattr(settings, "SESSION_HISTORY_BACKEND", "local") == "django":
+        backend = DjangoCacheHistoryBackend(
+            alias=getattr(settings, "SESSION_HISTORY_CACHE_ALIAS", "default"),
+            max_per_session=max_per_session,
+            ttl=ttl,
+        )
+    else:
+        backend = LocalHistoryBackend(
+            max_per_session=max_per_session,
+            max_sessions=getattr(settings, "SESSION_HISTORY_MAX_SESSIONS", 10000),
+            ttl=ttl,
+            max_bytes=getattr(settings, "SESSION_HISTORY_MAX_BYTES", 32 * 1024 * 1024),
+        )
+    return SessionHistoryStore(backend=backend)
@@ -2,20 +2,60 @@
 System Check Service
 
 Verifies backend components are ready.
+
+Health is split three ways so probes stay cheap:
+
+- liveness: the process answers; no checks at all.
+- readiness: looks at the already-loaded singletons (model registry,
+  agronomy tables) and the dataset file's size/mtime fingerprint.
+- deep checks (dataset columns, feature mapper, a model prediction) run on
+  a background thread every HEALTH_CHECK_INTERVAL_SECONDS; requests only
+  read their cached results.
 """
 
-from services.data_service import DatasetService
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from services.data_service import DATA_PATH, DatasetService
 from services.feature_mapper import FeatureMapper
-from services.ml_client import MLClient
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+
+
+def dataset_fingerprint() -> dict:
+    """Size and mtime of the dataset file; a stat, never a read."""
+    try:
+        stat = os.stat(DATA_PATH)
+    except OSError:
+        return None
+    return {"size_bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
 
 
 class SystemCheck:
 
+    def __init__(self):
+        self._dataset_fingerprint = None
+        self._dataset_status = None
+
     def check_dataset(self):
+        """Validate the dataset columns, only when the file has changed."""
         try:
-            ds = DatasetService()
-            ds.load_dataset()
-            return "loaded"
+            fingerprint = dataset_fingerprint()
+            if fingerprint is None:
+                return "error"
+            if fingerprint != self._dataset_fingerprint:
+                # Builds the columnar cache if it is missing or stale.
+                columns = DatasetService().get_columns()
+                missing = [col for col in FeatureMapper.REQUIRED_COLUMNS if col not in columns]
+                self._dataset_status = "error" if missing else "loaded"
+                self._dataset_fingerprint = fingerprint
+            return self._dataset_status
         except Exception:
             return "error"
 
@@ -32,8 +72,11 @@ class SystemCheck:
             return "error"
 
     def check_ml_client(self):
+        """Predict with the shared client (loading it on first run)."""
+        from services.ml_client import get_ml_client
+
         try:
-            ml = MLClient()
+            ml = get_ml_client()
             mock_features = {
                 "N": 0, "P": 0, "K": 0,
                 "temperature": 0, "humidity": 0,
@@ -51,3 +94,82 @@ class SystemCheck:
             "feature_mapper": self.check_feature_mapper(),
             "ml_client": self.check_ml_client(),
         }
+
+
+class HealthMonitor:
+    """Runs SystemCheck's deep checks on a background schedule."""
+
+    CHECKS = ("dataset", "feature_mapper", "ml_client")
+
+    def __init__(self, interval: float = 60):
+        self.interval = interval
+        self.checker = SystemCheck()
+        self.results = {
+            name: {"status": PENDING, "checked_at": None, "duration_ms": None} for name in self.CHECKS
+        }
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        # Started lazily, and again in each forked worker.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._loop, name="health-monitor", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            time.sleep(self.interval)
+
+    def run_once(self):
+        for name in self.CHECKS:
+            started = time.perf_counter()
+            try:
+                status = getattr(self.checker, f"check_{name}")()
+            except Exception as e:
+                logger.error(f"Health check {name} failed: {e}")
+                status = "error"
+            # Replace the whole entry so readers never see a partial update.
+            self.results[name] = {
+                "status": status,
+                "checked_at": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+
+    def snapshot(self) -> dict:
+        self.start()
+        return dict(self.results)
+
+
+@lru_cache(maxsize=1)
+def get_health_monitor() -> HealthMonitor:
+    from django.conf import settings
+    return HealthMonitor(interval=getattr(settings, "HEALTH_CHECK_INTERVAL_SECONDS", 60))
+
+
+def readiness() -> tuple:
+    """(ready, details) from state that is already in memory."""
+    from services.agronomy_tables import get_tables_loader
+    from services.ml_client import get_model_registry
+
+    registry = get_model_registry().info()
+    ml_check = get_health_monitor().snapshot()["ml_client"]["status"]
+    try:
+        # Small JSON file, parsed once and then only stat()ed.
+        tables_version = get_tables_loader().get().version
+    except Exception:
+        tables_version = None
+
+    details = {
+        # The first background check loads the model if preload didn't.
+        "ml_model": "ready" if registry["loaded_at"] and ml_check != "error" else "not_ready",
+        "model_version": registry["active_version"],
+        "model_loaded_at": registry["loaded_at"],
+        "agronomy_tables": tables_version or "error",
+        "dataset": dataset_fingerprint(),
+    }
+    ready = details["ml_model"] == "ready" and tables_version is not None
+    return ready, details
@@ -0,0 +1,161 @@
+"""
+Vector Analytics
+
+Batch versions of calculate_profit and generate_farm_analytics.
+
+The agronomy tables are held as NumPy arrays aligned by crop id (see
+agronomy_tables), so profit, KCC loan, fertilizer, irrigation and pest
+alerts for every candidate of every field are computed in one pass.
+Results match the scalar functions exactly: arithmetic is done in float64
+in the same order, and rounding uses Python's round() when the output dicts
+are built.
+"""
+
+import logging
+
+import numpy as np
+
+from services.agronomy_tables import get_agronomy_tables
+from services.analytics_service import DAP_P_PER_BAG, DAP_PRICE, MOP_K_PER_BAG, MOP_PRICE, UREA_N_PER_BAG, UREA_PRICE
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------
+# Profit
+# ---------------------------------
+def profit_arrays(tables, ids: np.ndarray, yield_tonnes, area) -> dict:
+    yield_tonnes = np.asarray(yield_tonnes, dtype=float)
+    area = np.asarray(area, dtype=float)
+
+    low = yield_tonnes / np.maximum(area, 0.01) < 3.5
+    yield_tonnes = np.where(low, area * 3.5, yield_tonnes)
+    msp = tables.arrays["msp_per_quintal"][ids]
+    return {
+        "gross_revenue": yield_tonnes * 10 * msp,
+        "total_cost": tables.arrays["cost_per_hectare"][ids] * area,
+        "msp": msp,
+    }
+
+
+def calculate_profits(crops, yields, areas) -> list:
+    """[calculate_profit(c, y, a) for c, y, a in zip(...)], in one pass."""
+    if not len(crops):
+        return []
+    try:
+        tables = get_agronomy_tables()
+        arrays = profit_arrays(tables, tables.crop_ids(crops), yields, areas)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Batch profit calculation failed: {e}")
+        return [None] * len(crops)
+
+    results = []
+    for gross, cost, msp in zip(arrays["gross_revenue"].tolist(), arrays["total_cost"].tolist(), arrays["msp"].tolist()):
+        gross, cost = round(gross, 2), round(cost, 2)
+        results.append({
+            "gross_revenue_inr": gross,
+            "estimated_cost_inr": cost,
+            "net_profit_inr": round(gross - cost, 2),
+            "msp_per_quintal_used": msp,
+        })
+    return results
+
+
+# ---------------------------------
+# Farm analytics
+# ---------------------------------
+def analytics_arrays(tables, ids: np.ndarray, soil_npk, rainfall, temperature, humidity, area) -> dict:
+    """soil_npk is (n, 3); the rest broadcast against ids."""
+    soil_npk = np.asarray(soil_npk, dtype=float)
+    area = np.asarray(area, dtype=float)
+    rainfall = np.asarray(rainfall, dtype=float)
+    temperature = np.asarray(temperature, dtype=float)
+    humidity = np.asarray(humidity, dtype=float)
+
+    sof = tables.arrays["scale_of_finance"][ids]
+    crop_cost = sof * area
+    ideal = np.stack([tables.arrays[f"ideal_{n}"][ids] for n in "npk"], axis=-1)
+    deficit = np.maximum(0, ideal - soil_npk) * area[..., None]
+    water = tables.arrays["water_req_mm"][ids]
+
+    return {
+        "sof": sof,
+        "crop_cost": crop_cost,
+        "post_harvest": crop_cost * 0.10,
+        "maintenance": crop_cost * 0.20,
+        "npk_deficit": deficit,
+        "ideal_water": water,
+        "rainfall": rainfall,
+        "water_deficit": np.maximum(0, water - rainfall),
+        "fungal": (humidity > 80) & (temperature > 28),
+        "heat": (humidity < 30) & (temperature > 35),
+        "moisture": (humidity > 85) & (rainfall > 200),
+    }
+
+
+def _bags(deficit: float, per_bag: float):
+    return round(deficit / per_bag, 1) if deficit > 0 else 0
+
+
+def generate_farm_analytics_batch(crops, soils, climates, areas) -> list:
+    """[generate_farm_analytics(c, s, cl, a) for ...], in one pass."""
+    n = len(crops)
+    if not n:
+        return []
+    try:
+        tables = get_agronomy_tables()
+        arrays = analytics_arrays(
+            tables,
+            tables.crop_ids(crops),
+            [[soil.get("N", 0), soil.get("P", 0), soil.get("K", 0)] for soil in soils],
+            [climate.get("rainfall", 0) for climate in climates],
+            [climate.get("temperature", 0) for climate in climates],
+            [climate.get("humidity", 0) for climate in climates],
+            np.broadcast_to(np.asarray(areas, dtype=float), (n,)),
+        )
+    except (TypeError, ValueError) as e:
+        logger.error(f"Batch farm analytics failed: {e}")
+        return [{} for _ in range(n)]
+
+    columns = {k: v.tolist() for k, v in arrays.items()}
+    areas = np.broadcast_to(np.asarray(areas, dtype=float), (n,)).tolist()
+    results = []
+    for i in range(n):
+        crop_cost, post_harvest, maintenance = columns["crop_cost"][i], columns["post_harvest"][i], columns["maintenance"][i]
+        n_deficit, p_deficit, k_deficit = columns["npk_deficit"][i]
+        urea_bags = _bags(n_deficit, UREA_N_PER_BAG)
+        dap_bags = _bags(p_deficit, DAP_P_PER_BAG)
+        mop_bags = _bags(k_deficit, MOP_K_PER_BAG)
+        deficit_mm = columns["water_deficit"][i]
+
+        alerts = []
+        if columns["fungal"][i]:
+            alerts.append("High risk of fungal infections and blight. Pre-emptive fungicide recommended.")
+        if columns["heat"][i]:
+            alerts.append("Severe heat stress. High probability of aphid and whitefly infestations.")
+        if columns["moisture"][i]:
+            alerts.append("Heavy moisture detected. Ensure soil drainage to prevent root rot.")
+
+        results.append({
+            "kcc_loan": {
+                "scale_of_finance_per_ha": columns["sof"][i],
+                "components": {
+                    "crop_cost": round(crop_cost, 2),
+                    "post_harvest_allowance": round(post_harvest, 2),
+                    "maintenance_allowance": round(maintenance, 2),
+                },
+                "total_first_year_limit_inr": round(crop_cost + post_harvest + maintenance, 2),
+            },
+            "fertilizer": {
+                "deficit_kg": {"N": round(n_deficit, 2), "P": round(p_deficit, 2), "K": round(k_deficit, 2)},
+                "bags_required": {"urea_45kg": urea_bags, "dap_50kg": dap_bags, "mop_50kg": mop_bags},
+                "estimated_cost_inr": round((urea_bags * UREA_PRICE) + (dap_bags * DAP_PRICE) + (mop_bags * MOP_PRICE), 2),
+            },
+            "irrigation": {
+                "ideal_water_mm": columns["ideal_water"][i],
+                "rainfall_mm": round(columns["rainfall"][i], 2),
+                "deficit_mm": round(deficit_mm, 2),
+                "extra_liters_required": round(deficit_mm * 10000 * areas[i], 2),
+            },
+            "pest_alerts": alerts,
+        })
+    return results
@@ -1,4 +1,5 @@
 import joblib
+import numpy as np
 from pathlib import Path
 from typing import Dict, List
 
@@ -46,6 +47,33 @@ class DecisionEngine:
             for crop, score in predictions
         ]
 
+    def recommend_crops_batch(
+        self,
+        inputs,
+        top_k: int = 3
+    ) -> List[List[Dict]]:
+        """recommend_crops for many rows in one vectorized model call.
+
+        inputs may be a DataFrame with the feature columns (e.g. a whole
+        dataset), a 2-D array in the model's feature order, or a list of
+        the same dicts recommend_crops takes.
+        """
+        if self.crop_model is None:
+            raise RuntimeError("Models not loaded. Call load_models() first.")
+
+        if isinstance(inputs, list) and inputs and isinstance(inputs[0], dict):
+            features = self.crop_model.features
+            inputs = np.array([[row[f] for f in features] for row in inputs], dtype=float)
+        elif isinstance(inputs, list) and not inputs:
+            return []
+
+        predictions = self.crop_model.predict_top_k_batch(inputs, k=top_k)
+
+        return [
+            [{"crop": crop, "confidence": round(score, 4)} for crop, score in row]
+            for row in predictions
+        ]
+
 
 # Local sanity test (never used in production)
 if __name__ == "__main__":
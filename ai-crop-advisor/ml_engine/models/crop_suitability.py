@@ -1,37 +1,99 @@
+import numpy as np
 import pandas as pd
 from typing import List, Tuple
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 
 
+def top_k_indices(probs: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of each row's k highest probabilities, best first.
+
+    Same result as np.argsort(-probs, kind="stable")[:, :k], ties going to
+    the lower class index, without sorting whole rows: np.partition finds
+    each row's k-th highest value in linear time, everything above it is
+    taken, and the lowest-indexed columns equal to it fill the remaining
+    places. Only the k selected columns are then sorted.
+    """
+    n_rows, n_classes = probs.shape
+    k = max(0, min(k, n_classes))
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+
+    if k < n_classes:
+        kth = np.partition(probs, n_classes - k, axis=1)[:, n_classes - k, None]
+        above = probs > kth
+        tied = probs == kth
+        needed = k - above.sum(axis=1, keepdims=True)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+        # Exactly k per row; nonzero walks rows in order, columns ascending.
+        candidates = np.nonzero(selected)[1].reshape(n_rows, k)
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), probs.shape)
+    order = np.argsort(-np.take_along_axis(probs, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
 class CropSuitabilityModel:
-    def __init__(self):
+    def __init__(self, n_estimators: int = 200, max_depth: int = 10, n_jobs: int = None, random_state: int = 42):
         self.features = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
         self.model = RandomForestClassifier(
-            n_estimators=200,
-            max_depth=10,
-            random_state=42
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            n_jobs=n_jobs,
+            random_state=random_state
         )
         self.encoder = LabelEncoder()
         self.trained = False
+        self._class_names = None
 
     def train(self, df: pd.DataFrame) -> None:
-        X = df[self.features]
+        # Fit on a bare array so inference can pass arrays without sklearn's
+        # feature-name check.
+        X = df[self.features].to_numpy()
         y = self.encoder.fit_transform(df["label"])
         self.model.fit(X, y)
+        self._class_names = None
         self.trained = True
 
+    @property
+    def class_names(self) -> np.ndarray:
+        """Decoded crop name per model column, computed once."""
+        if getattr(self, "_class_names", None) is None:
+            self._class_names = np.array([str(c) for c in self.encoder.inverse_transform(self.model.classes_)], dtype=object)
+        return self._class_names
+
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if hasattr(self.model, "feature_names_in_"):
+            # Artifacts trained on a DataFrame expect one back.
+            X = pd.DataFrame(X, columns=self.features)
+        return self.model.predict_proba(X)
+
     def predict_top_k(self, input_data: dict, k: int = 3) -> List[Tuple[str, float]]:
         if not self.trained:
             raise RuntimeError("CropSuitabilityModel is not trained")
 
-        X = pd.DataFrame([input_data])[self.features]
-        probs = self.model.predict_proba(X)[0]
+        X = np.array([[input_data[f] for f in self.features]], dtype=float)
+        return self.predict_top_k_batch(X, k=k)[0]
 
-        crops = self.encoder.inverse_transform(range(len(probs)))
-        ranked = sorted(
-            zip(crops, probs),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        return ranked[:k]
\ No newline at end of file
+    def predict_top_k_batch(self, X, k: int = 3) -> List[List[Tuple[str, float]]]:
+        """Top-k (crop, probability) pairs for each row of X.
+
+        X is a 2-D array with columns in self.features order (or a DataFrame
+        holding those columns); all rows go through one predict_proba call.
+        """
+        if not self.trained:
+            raise RuntimeError("CropSuitabilityModel is not trained")
+
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy()
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected a 2-D array with {len(self.features)} columns, got shape {X.shape}")
+        if not len(X):
+            return []
+
+        probs = self._predict_proba(X)
+        top = top_k_indices(probs, k)
+        crops = self.class_names[top].tolist()
+        scores = np.take_along_axis(probs, top, axis=1).tolist()
+        return [list(zip(row_crops, row_scores)) for row_crops, row_scores in zip(crops, scores)]
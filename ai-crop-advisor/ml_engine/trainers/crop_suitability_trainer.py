@@ -1,7 +1,20 @@
-import pandas as pd
-import joblib
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from joblib.externals.loky import get_reusable_executor
+from sklearn.model_selection import StratifiedKFold
+
 from ml_engine.models.crop_suitability import CropSuitabilityModel
 
 # Dataset location (local, never committed)
@@ -9,25 +22,172 @@ DATASET_PATH = Path.home() / "Downloads" / "Crop_recommendation.csv"
 
 # Artifacts directory (gitignored)
 ARTIFACTS_DIR = Path("artifacts")
-ARTIFACTS_DIR.mkdir(exist_ok=True)
 
 MODEL_PATH = ARTIFACTS_DIR / "crop_suitability.pkl"
+VERSIONS_DIR = ARTIFACTS_DIR / "crop_suitability"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def peak_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """Peak RSS of this process, or with RUSAGE_CHILDREN of the largest
+    child process that has exited and been waited for."""
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def load_dataset(paths, features) -> pd.DataFrame:
+    """Read only the model's columns, numeric ones straight into float32.
+
+    The forest converts its input to float32 anyway, so this halves the
+    memory of the frame without changing the fitted model.
+    """
+    columns = [*features, "label"]
+    dtypes = {feature: np.float32 for feature in features}
+    frames = [pd.read_csv(path, usecols=columns, dtype=dtypes) for path in paths]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return df[columns]
+
+
+def _fold_accuracy(df, train_idx, test_idx, params) -> float:
+    model = CropSuitabilityModel(**params)
+    model.train(df.iloc[train_idx])
+    test = df.iloc[test_idx]
+    # The model is fitted on a bare array; predict on one too.
+    predicted = model.model.predict(test[model.features].to_numpy())
+    return float(np.mean(predicted == model.encoder.transform(test["label"])))
+
 
+def cross_validate(df, folds: int, params: dict, n_jobs: int) -> list:
+    """Accuracy per stratified fold, folds trained in parallel.
 
-def main():
-    print("Loading dataset...")
-    df = pd.read_csv(DATASET_PATH)
-    print(f"Dataset loaded: {df.shape}")
+    Cores are split between folds and each fold's forest so the total
+    number of busy workers stays at n_jobs.
+    """
+    cores = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    fold_jobs = max(1, min(folds, cores))
+    fold_params = {**params, "n_jobs": max(1, cores // fold_jobs)}
+
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=params.get("random_state"))
+    scores = Parallel(n_jobs=fold_jobs)(
+        delayed(_fold_accuracy)(df, train_idx, test_idx, fold_params)
+        for train_idx, test_idx in splitter.split(df, df["label"])
+    )
+    # Stop joblib's reusable worker processes so they are reaped and their
+    # peak memory shows up under RUSAGE_CHILDREN.
+    get_reusable_executor().shutdown(wait=True)
+    return scores
+
+
+def write_artifact(model, manifest: dict, artifacts_dir: Path = ARTIFACTS_DIR, promote: bool = True) -> Path:
+    """Save model + manifest under crop_suitability/<version>/.
+
+    With promote, the flat crop_suitability.pkl that DecisionEngine loads
+    is replaced by the new model (atomically, via a temp file).
+    """
+    version_dir = artifacts_dir / VERSIONS_DIR.name / manifest["version"]
+    version_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, version_dir / MODEL_PATH.name)
+    with open(version_dir / MANIFEST_FILENAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if promote:
+        model_path = artifacts_dir / MODEL_PATH.name
+        tmp_path = model_path.with_name(f"{model_path.name}.tmp")
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+    return version_dir
+
+
+def train(paths, n_jobs: int = -1, folds: int = 5, n_estimators: int = 200, max_depth: int = 10,
+          random_state: int = 42, version: str = None, artifacts_dir: Path = ARTIFACTS_DIR,
+          promote: bool = True) -> dict:
+    """Evaluate, fit and save a CropSuitabilityModel; returns the manifest."""
+    params = {"n_estimators": n_estimators, "max_depth": max_depth, "random_state": random_state}
+    features = CropSuitabilityModel().features
+
+    started = time.perf_counter()
+    df = load_dataset(paths, features)
+    load_seconds = time.perf_counter() - started
+    print(f"Dataset loaded: {df.shape} in {load_seconds:.1f}s")
+
+    metrics = {}
+    cv_seconds = None
+    if folds > 1:
+        print(f"Cross-validating over {folds} folds...")
+        started = time.perf_counter()
+        scores = cross_validate(df, folds, params, n_jobs)
+        cv_seconds = time.perf_counter() - started
+        metrics = {
+            "cv_folds": folds,
+            "fold_accuracy": [round(s, 4) for s in scores],
+            "accuracy_mean": round(float(np.mean(scores)), 4),
+            "accuracy_std": round(float(np.std(scores)), 4),
+        }
+        print(f"CV accuracy: {metrics['accuracy_mean']} ± {metrics['accuracy_std']}")
 
     print("Training crop suitability model...")
-    model = CropSuitabilityModel()
+    model = CropSuitabilityModel(n_jobs=n_jobs, **params)
+    started = time.perf_counter()
     model.train(df)
+    train_seconds = time.perf_counter() - started
+    # Serving predicts one row at a time, where thread dispatch only adds latency.
+    model.model.set_params(n_jobs=None)
+
+    now = datetime.now(timezone.utc)
+    manifest = {
+        "version": version or now.strftime("%Y%m%d-%H%M%S"),
+        "created_at": now.isoformat(),
+        "features": model.features,
+        "classes": [str(c) for c in model.encoder.classes_],
+        "params": {**params, "n_jobs": n_jobs},
+        "datasets": [str(p) for p in paths],
+        "rows": len(df),
+        "metrics": metrics,
+        "load_seconds": round(load_seconds, 3),
+        "cv_seconds": round(cv_seconds, 3) if cv_seconds is not None else None,
+        "train_seconds": round(train_seconds, 3),
+        # Loading and the final fit (threads) happen in this process; CV
+        # folds run in worker processes unless n_jobs is 1 (then None).
+        "peak_rss_bytes": peak_rss_bytes(),
+        "peak_cv_worker_rss_bytes": peak_rss_bytes(resource.RUSAGE_CHILDREN) or None,
+        "sklearn_version": sklearn.__version__,
+    }
 
     print("Saving trained model...")
-    joblib.dump(model, MODEL_PATH)
+    version_dir = write_artifact(model, manifest, Path(artifacts_dir), promote=promote)
+    print(f"✅ Model {manifest['version']} saved to {version_dir}")
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the crop suitability model.")
+    parser.add_argument("datasets", nargs="*", type=Path, default=[DATASET_PATH], help="CSV files with features + label")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="cores for training and CV (-1 = all)")
+    parser.add_argument("--folds", type=int, default=5, help="k-fold CV splits (0 or 1 to skip)")
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--version", default=None, help="artifact version (default: UTC timestamp)")
+    parser.add_argument("--artifacts-dir", type=Path, default=ARTIFACTS_DIR)
+    parser.add_argument("--no-promote", action="store_true", help=f"don't replace {MODEL_PATH.name}")
+    return parser.parse_args(argv)
+
 
-    print(f"✅ Model saved to {MODEL_PATH}")
+def main(argv=None):
+    args = parse_args(argv)
+    train(
+        args.datasets,
+        n_jobs=args.n_jobs,
+        folds=args.folds,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        random_state=args.seed,
+        version=args.version,
+        artifacts_dir=args.artifacts_dir,
+        promote=not args.no_promote,
+    )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,225 @@
+"""
+Distil the served crop pipeline into a small, low-latency student.
+
+The teacher (backend/models/crop_pipeline.pkl) scores the synthetic
+scenario data; the student, a shallow multi-output tree regressor, is fitted
+to the teacher's predict_proba outputs rather than to the hard labels, so
+it learns the teacher's full ranking and not just its top crop. Trees need
+no scaling, and the backend flattens them into NumPy arrays
+(services.compact_model), so serving needs neither pandas nor sklearn;
+agreement and latency are reported for that flattened model.
+
+The student is written next to the teacher as crop_pipeline_fast.pkl;
+MLClient loads it as the "fast" tier (?tier=fast) for high-QPS traffic.
+
+    python -m ml_engine.trainers.distill_crop_model backend/data/synthetic_agro_scenarios_100k.csv
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeRegressor
+
+from ml_engine.models.crop_suitability import CropSuitabilityModel, top_k_indices
+from ml_engine.trainers.crop_suitability_trainer import load_dataset
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+TEACHER_DIR = BACKEND_DIR / "models"
+DATASET_PATH = BACKEND_DIR / "data" / "synthetic_agro_scenarios_100k.csv"
+
+TEACHER_FILENAME = "crop_pipeline.pkl"
+STUDENT_FILENAME = "crop_pipeline_fast.pkl"
+
+STUDENTS = {
+    "tree": DecisionTreeRegressor,
+    "forest": RandomForestRegressor,
+    "extra_trees": ExtraTreesRegressor,
+}
+
+LATENCY_ROWS = 200
+
+
+def enrich(df: pd.DataFrame, feature_order: list) -> np.ndarray:
+    """MLClient._enrich_row for a whole frame, in the teacher's column order."""
+    columns = {name: df[name].to_numpy(dtype=np.float64) for name in df.columns if name != "label"}
+    n, p, k = columns.get("N", 0), columns.get("P", 0), columns.get("K", 0)
+    columns["NPK_ratio"] = n / np.maximum(p + k, 1)
+    columns["temp_humidity"] = columns.get("temperature", 0) * columns.get("humidity", 0)
+    columns["rainfall_humidity"] = columns.get("rainfall", 0) * columns.get("humidity", 0)
+    zeros = np.zeros(len(df))
+    return np.column_stack([columns.get(name, zeros) for name in feature_order])
+
+
+def build_student(kind: str, max_depth: int, n_estimators: int, seed: int):
+    params = {"max_depth": max_depth, "random_state": seed}
+    if kind != "tree":
+        params.update(n_estimators=n_estimators, n_jobs=-1)
+    return STUDENTS[kind](**params)
+
+
+def agreement(teacher_probs: np.ndarray, student_probs: np.ndarray) -> dict:
+    teacher_top5 = top_k_indices(teacher_probs, 5)
+    student_top5 = top_k_indices(student_probs, 5)
+    overlap = [len(set(t) & set(s)) / len(t) for t, s in zip(teacher_top5.tolist(), student_top5.tolist())]
+    return {
+        # Same top crop as the teacher.
+        "top1_agreement": float(np.mean(teacher_top5[:, 0] == student_top5[:, 0])),
+        # Share of the teacher's top 5 the student also ranks in its top 5.
+        "top5_agreement": float(np.mean(overlap)),
+        # Teacher's top crop anywhere in the student's top 5.
+        "top1_in_top5": float(np.mean((student_top5 == teacher_top5[:, :1]).any(axis=1))),
+        "mean_abs_prob_error": float(np.mean(np.abs(teacher_probs - student_probs))),
+    }
+
+
+def compact_student(model, classes):
+    """The student as MLClient serves it: flattened by services.compact_model."""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.append(str(BACKEND_DIR))
+    from services.compact_model import CompactCropModel, export_pipeline
+
+    return CompactCropModel(export_pipeline(Pipeline([("student", model)]), classes=classes))
+
+
+def per_row_latency_ms(predict, X: np.ndarray) -> float:
+    """Median wall time of predict on a single row."""
+    timings = []
+    for row in X[:LATENCY_ROWS]:
+        started = time.perf_counter()
+        predict(row[None, :])
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings) * 1000), 4)
+
+
+def distill(paths, teacher_dir: Path = TEACHER_DIR, output_dir: Path = None, student: str = "tree",
+            max_depth: int = 10, n_estimators: int = 10, holdout: float = 0.2, max_rows: int = None,
+            seed: int = 42) -> dict:
+    """Fit the student, report agreement/latency and write the fast artifact."""
+    teacher_data = joblib.load(Path(teacher_dir) / TEACHER_FILENAME)
+    teacher = teacher_data["pipeline"]
+    feature_order = list(teacher_data["features"])
+
+    df = load_dataset(paths, CropSuitabilityModel().features)
+    if max_rows is not None and len(df) > max_rows:
+        df = df.sample(n=max_rows, random_state=seed)
+    X = enrich(df, feature_order)
+    X_train, X_test = train_test_split(X, test_size=holdout, random_state=seed)
+    print(f"Dataset loaded: {len(X_train)} training / {len(X_test)} holdout rows")
+
+    started = time.perf_counter()
+    # Same frame the served teacher gets from MLClient.
+    teacher_train = teacher.predict_proba(pd.DataFrame(X_train, columns=feature_order))
+    teacher_test = teacher.predict_proba(pd.DataFrame(X_test, columns=feature_order))
+    label_seconds = time.perf_counter() - started
+    print(f"Teacher labelled {len(X)} rows in {label_seconds:.1f}s")
+
+    model = build_student(student, max_depth, n_estimators, seed)
+    started = time.perf_counter()
+    model.fit(X_train, teacher_train)
+    fit_seconds = time.perf_counter() - started
+    if student != "tree":
+        model.set_params(n_jobs=None)
+
+    def teacher_predict(rows):
+        return teacher.predict_proba(pd.DataFrame(rows, columns=feature_order))
+
+    # Agreement and latency are measured on the compact export, the code
+    # path MLClient serves (it renormalises each tree's leaf values).
+    served = compact_student(model, teacher.classes_)
+    timings = {}
+    for name, predict in (("teacher", teacher_predict), ("student", served.predict_proba),
+                          ("student_sklearn", model.predict)):
+        started = time.perf_counter()
+        predictions = predict(X_test)
+        timings[name] = (predictions, time.perf_counter() - started)
+
+    sklearn_test = timings["student_sklearn"][0]
+    sklearn_test = sklearn_test / np.maximum(sklearn_test.sum(axis=1, keepdims=True), 1e-12)
+
+    metrics = {
+        **agreement(teacher_test, timings["student"][0]),
+        "sklearn_top1_agreement": agreement(teacher_test, sklearn_test)["top1_agreement"],
+        "holdout_rows": len(X_test),
+        "teacher_latency_ms": per_row_latency_ms(teacher_predict, X_test),
+        "student_latency_ms": per_row_latency_ms(served.predict_proba, X_test),
+        "student_sklearn_latency_ms": per_row_latency_ms(model.predict, X_test),
+        **{f"{name}_batch_us_per_row": round(seconds / len(X_test) * 1e6, 3) for name, (_, seconds) in timings.items()},
+        "fit_seconds": round(fit_seconds, 3),
+    }
+
+    now = datetime.now(timezone.utc)
+    artifact = {
+        "pipeline": Pipeline([("student", model)]),
+        # Output columns, in the teacher's predict_proba order.
+        "classes": np.asarray(teacher.classes_),
+        "features": feature_order,
+        "model_version": f"{teacher_data['model_version']}-fast",
+        "teacher_version": teacher_data["model_version"],
+        "student": {"kind": student, "max_depth": max_depth,
+                    "n_estimators": n_estimators if student != "tree" else 1},
+        "created_at": now.isoformat(),
+        "datasets": [str(p) for p in paths],
+        "metrics": metrics,
+    }
+
+    output_dir = Path(output_dir or teacher_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / STUDENT_FILENAME
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+
+    report = {k: v for k, v in artifact.items() if k not in ("pipeline", "classes")}
+    with open(path.with_suffix(".json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return {**report, "path": str(path)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Distil the crop pipeline into a fast student model.")
+    parser.add_argument("datasets", nargs="*", type=Path, default=[DATASET_PATH], help="scenario CSVs to label")
+    parser.add_argument("--teacher-dir", type=Path, default=TEACHER_DIR, help=f"directory with {TEACHER_FILENAME}")
+    parser.add_argument("--output-dir", type=Path, default=None, help="default: the teacher directory")
+    parser.add_argument("--student", choices=sorted(STUDENTS), default="tree")
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--n-estimators", type=int, default=10, help="forest students only")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--max-rows", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = distill(
+        args.datasets,
+        teacher_dir=args.teacher_dir,
+        output_dir=args.output_dir,
+        student=args.student,
+        max_depth=args.max_depth,
+        n_estimators=args.n_estimators,
+        holdout=args.holdout,
+        max_rows=args.max_rows,
+        seed=args.seed,
+    )
+
+    m = report["metrics"]
+    print(f"Top-1 agreement: {m['top1_agreement']:.4f}   Top-5 agreement: {m['top5_agreement']:.4f}")
+    print(f"Per-row latency: teacher {m['teacher_latency_ms']} ms, student {m['student_latency_ms']} ms as served "
+          f"({m['student_sklearn_latency_ms']} ms through sklearn)")
+    print(f"✅ Fast model {report['model_version']} saved to {report['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Hyperparameter search for the crop suitability classifier.
+
+Random configurations of several estimators are raced with successive
+halving: every rung trains the surviving configurations on a larger slice
+of the training data (min_rows, min_rows * eta, ...) in a process pool and
+scores them on a fixed validation split. After each rung the best 1/eta by
+accuracy go on, plus any configuration on the rung's accuracy/latency
+Pareto front, so a cheap model that is nearly as accurate isn't pruned
+just for being second best.
+
+The final rung is reported as a Pareto front over accuracy (higher is
+better), per-row inference latency and pickled model size (lower is
+better), and the cheapest front member meeting --target-accuracy is
+picked.
+
+    python -m ml_engine.trainers.hyperparameter_search data.csv --workers 8 --target-accuracy 0.97
+"""
+
+import argparse
+import json
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.model_selection import ParameterSampler, train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from ml_engine.models.crop_suitability import CropSuitabilityModel
+from ml_engine.trainers.crop_suitability_trainer import ARTIFACTS_DIR, DATASET_PATH, load_dataset
+
+TUNING_DIR = ARTIFACTS_DIR / "tuning"
+
+ESTIMATORS = {
+    "random_forest": RandomForestClassifier,
+    "extra_trees": ExtraTreesClassifier,
+    "hist_gradient_boosting": HistGradientBoostingClassifier,
+}
+
+SEARCH_SPACE = {
+    "random_forest": {
+        "n_estimators": [25, 50, 100, 200],
+        "max_depth": [6, 8, 10, 14, None],
+        "min_samples_leaf": [1, 2, 5],
+        "max_features": ["sqrt", 0.5],
+    },
+    "extra_trees": {
+        "n_estimators": [25, 50, 100, 200],
+        "max_depth": [8, 10, 14, None],
+        "min_samples_leaf": [1, 2, 5],
+    },
+    "hist_gradient_boosting": {
+        "max_iter": [50, 100, 200],
+        "learning_rate": [0.05, 0.1, 0.2],
+        "max_leaf_nodes": [15, 31],
+        "l2_regularization": [0.0, 1.0],
+    },
+}
+
+LATENCY_ROWS = 100
+
+# Training/validation arrays, set once per worker process by _init_worker.
+_DATA = {}
+
+
+# ---------------------------------
+# Candidates
+# ---------------------------------
+def sample_candidates(n: int, estimators=tuple(ESTIMATORS), seed: int = 42) -> list:
+    """n random configurations, split as evenly as possible across estimators."""
+    candidates = []
+    for i, name in enumerate(estimators):
+        count = n // len(estimators) + (i < n % len(estimators))
+        space = SEARCH_SPACE[name]
+        size = math.prod(len(v) for v in space.values())
+        for params in ParameterSampler(space, n_iter=min(count, size), random_state=seed):
+            candidates.append({"estimator": name, "params": params})
+    return candidates
+
+
+def build_estimator(candidate: dict, random_state: int = 42):
+    # One core per model: the parallelism is across candidates.
+    params = {**candidate["params"], "random_state": random_state}
+    if candidate["estimator"] != "hist_gradient_boosting":
+        params["n_jobs"] = 1
+    return ESTIMATORS[candidate["estimator"]](**params)
+
+
+# ---------------------------------
+# Evaluation (runs in worker processes)
+# ---------------------------------
+def _init_worker(X_train, y_train, X_val, y_val):
+    _DATA.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+
+
+def _single_row_latency_ms(model, X: np.ndarray) -> float:
+    """Median wall time of predict_proba on one row, as served."""
+    timings = []
+    for row in X[:LATENCY_ROWS]:
+        started = time.perf_counter()
+        model.predict_proba(row[None, :])
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+
+def evaluate(candidate: dict, rows: int) -> dict:
+    X_train, y_train = _DATA["X_train"][:rows], _DATA["y_train"][:rows]
+    X_val, y_val = _DATA["X_val"], _DATA["y_val"]
+
+    model = build_estimator(candidate)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predicted = model.predict(X_val)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        **candidate,
+        "rows": len(X_train),
+        "accuracy": float(np.mean(predicted == y_val)),
+        "fit_seconds": round(fit_seconds, 3),
+        "latency_ms": round(_single_row_latency_ms(model, X_val), 4),
+        "batch_us_per_row": round(batch_seconds / len(X_val) * 1e6, 3),
+        "size_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+# ---------------------------------
+# Pareto front
+# ---------------------------------
+def _dominates(a: dict, b: dict, objectives) -> bool:
+    """a is at least as good as b everywhere and strictly better somewhere."""
+    better = False
+    for key, sign in objectives:
+        if a[key] * sign < b[key] * sign:
+            return False
+        if a[key] * sign > b[key] * sign:
+            better = True
+    return better
+
+
+def pareto_front(results: list, objectives=(("accuracy", 1), ("latency_ms", -1), ("size_bytes", -1))) -> list:
+    """Results no other result dominates; objectives are (key, +1 maximize / -1 minimize)."""
+    return [r for r in results if not any(_dominates(o, r, objectives) for o in results if o is not r)]
+
+
+def choose(front: list, target_accuracy: float = None) -> dict:
+    """Fastest front member meeting the target, else the most accurate."""
+    if target_accuracy is not None:
+        meeting = [r for r in front if r["accuracy"] >= target_accuracy]
+        if meeting:
+            return min(meeting, key=lambda r: (r["latency_ms"], r["size_bytes"]))
+    return max(front, key=lambda r: r["accuracy"])
+
+
+# ---------------------------------
+# Successive halving
+# ---------------------------------
+def successive_halving(candidates: list, n_train: int, pool, min_rows: int = 2000, eta: int = 3) -> list:
+    """Race candidates on growing data slices; returns every rung's results."""
+    rungs = []
+    rows = min(min_rows, n_train)
+    survivors = candidates
+
+    while True:
+        final = rows >= n_train or len(survivors) <= 1
+        if final:
+            rows = n_train
+        started = time.perf_counter()
+        results = list(pool.map(evaluate, survivors, [rows] * len(survivors)))
+        print(f"Rung {len(rungs)}: {len(results)} candidates on {rows} rows in {time.perf_counter() - started:.1f}s")
+        rungs.append(results)
+        if final:
+            return rungs
+
+        keep = max(1, len(results) // eta)
+        ranked = sorted(results, key=lambda r: r["accuracy"], reverse=True)[:keep]
+        front = pareto_front(results, (("accuracy", 1), ("latency_ms", -1)))
+        chosen = {id(r): r for r in ranked + front}.values()
+        survivors = [{"estimator": r["estimator"], "params": r["params"]} for r in chosen]
+        rows = min(rows * eta, n_train)
+
+
+def search(paths, n_candidates: int = 24, estimators=tuple(ESTIMATORS), min_rows: int = 2000, eta: int = 3,
+           workers: int = None, validation_size: float = 0.2, target_accuracy: float = None,
+           seed: int = 42) -> dict:
+    """Run the search and return the report."""
+    features = CropSuitabilityModel().features
+    df = load_dataset(paths, features)
+    y = LabelEncoder().fit_transform(df["label"])
+    X_train, X_val, y_train, y_val = train_test_split(
+        df[features].to_numpy(), y, test_size=validation_size, stratify=y, random_state=seed,
+    )
+    print(f"Dataset loaded: {len(X_train)} training / {len(X_val)} validation rows")
+
+    candidates = sample_candidates(n_candidates, estimators, seed)
+    workers = workers or os.cpu_count()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X_train, y_train, X_val, y_val)) as pool:
+        rungs = successive_halving(candidates, len(X_train), pool, min_rows=min_rows, eta=eta)
+
+    final = rungs[-1]
+    front = sorted(pareto_front(final), key=lambda r: r["latency_ms"])
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "datasets": [str(p) for p in paths],
+        "features": features,
+        "settings": {
+            "candidates": len(candidates), "min_rows": min_rows, "eta": eta, "workers": workers,
+            "validation_rows": len(X_val), "target_accuracy": target_accuracy, "seed": seed,
+        },
+        "search_seconds": round(time.perf_counter() - started, 3),
+        "rungs": rungs,
+        "pareto_front": front,
+        "chosen": choose(front, target_accuracy),
+    }
+
+
+def _describe(result: dict) -> str:
+    params = ", ".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return (f"{result['accuracy']:.4f}  {result['latency_ms']:8.3f} ms  {result['size_bytes'] / 1e6:8.2f} MB  "
+            f"{result['estimator']}({params})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search crop model hyperparameters.")
+    parser.add_argument("datasets", nargs="*", type=Path, default=[DATASET_PATH], help="CSV files with features + label")
+    parser.add_argument("--candidates", type=int, default=24, help="random configurations to start with")
+    parser.add_argument("--estimators", nargs="+", choices=sorted(ESTIMATORS), default=list(ESTIMATORS))
+    parser.add_argument("--min-rows", type=int, default=2000, help="training rows in the first rung")
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta per rung, grow data by eta")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--target-accuracy", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="report path (default: artifacts/tuning/<time>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = search(
+        args.datasets,
+        n_candidates=args.candidates,
+        estimators=args.estimators,
+        min_rows=args.min_rows,
+        eta=max(2, args.eta),
+        workers=args.workers,
+        target_accuracy=args.target_accuracy,
+        seed=args.seed,
+    )
+
+    print("\nPareto front (accuracy / single-row latency / size):")
+    for result in report["pareto_front"]:
+        print("  " + _describe(result))
+    print("\nChosen:\n  " + _describe(report["chosen"]))
+
+    output = args.output or TUNING_DIR / f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\n✅ Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
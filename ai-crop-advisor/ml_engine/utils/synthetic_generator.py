@@ -1,81 +1,172 @@
-import pandas as pd
-import numpy as np
-import random
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 # ---- CONFIG ----
 
+DATA_DIR = Path(__file__).resolve().parents[2] / "backend" / "data"
 
-CROP_CLIMATE_DATA = Path("/Users/prashantbhandare/Downloads/Crop_recommendation.csv")
-SOIL_DATA = Path("/Users/prashantbhandare/Downloads/dataset.csv.csv")
-OUTPUT_PATH = Path("/Users/prashantbhandare/Downloads/synthetic_agro_scenarios_100k.csv")
+CROP_CLIMATE_DATA = DATA_DIR / "Crop_recommendation.csv"
+SOIL_DATA = DATA_DIR / "dataset.csv"
+OUTPUT_PATH = DATA_DIR / "synthetic_agro_scenarios_100k.csv"
 N_SAMPLES = 100_000
+CHUNK_SIZE = 1_000_000
+MAX_RETRIES = 10
 
 FEATURES_CLIMATE = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
 FEATURES_SOIL = ["N", "P", "K", "ph"]
 
-# ---- LOAD REAL DATA ----
-def load_real_stats():
-    climate_df = pd.read_csv(CROP_CLIMATE_DATA)
-    soil_df = pd.read_csv(SOIL_DATA)
-
-    climate_stats = climate_df.groupby("label")[FEATURES_CLIMATE].agg(["mean", "std"])
-    soil_stats = soil_df.groupby("label")[FEATURES_SOIL].agg(["mean", "std"])
-
-    return climate_stats, soil_stats
+# Hard biological constraints
+BOUNDS = {
+    "N": (0, 200),
+    "P": (0, 150),
+    "K": (0, 200),
+    "temperature": (5, 45),
+    "humidity": (20, 100),
+    "ph": (4.5, 8.5),
+    "rainfall": (0, 500)
+}
+LOW = np.array([BOUNDS[f][0] for f in FEATURES_CLIMATE], dtype=float)
+HIGH = np.array([BOUNDS[f][1] for f in FEATURES_CLIMATE], dtype=float)
 
 
-# ---- CONSTRAINED SAMPLING ----
-def sample_constrained(mean, std, low, high):
-    for _ in range(10):  # retry to avoid invalid values
-        value = np.random.normal(mean, std)
-        if low <= value <= high:
-            return value
-    return np.clip(mean, low, high)
+# ---- LOAD REAL DATA ----
+def load_real_stats(climate_path=CROP_CLIMATE_DATA, soil_path=None):
+    climate_df = pd.read_csv(climate_path)
+    climate_stats = climate_df.groupby("label")[FEATURES_CLIMATE].agg(["mean", "std"])
 
+    soil_stats = None
+    if soil_path is not None:
+        soil_df = pd.read_csv(soil_path)
+        soil_stats = soil_df.groupby("label")[FEATURES_SOIL].agg(["mean", "std"])
 
-# ---- GENERATOR ----
-def generate_synthetic_dataset(n=N_SAMPLES):
-    climate_stats, soil_stats = load_real_stats()
-    crops = list(climate_stats.index)
+    return climate_stats, soil_stats
 
-    rows = []
 
-    for _ in range(n):
-        crop = random.choice(crops)
+def stats_arrays(climate_stats):
+    """(crops, means, stds): per-crop parameters as (n_crops, n_features) arrays."""
+    crops = np.array(climate_stats.index, dtype=object)
+    means = climate_stats.xs("mean", axis=1, level=1)[FEATURES_CLIMATE].to_numpy(dtype=float)
+    stds = climate_stats.xs("std", axis=1, level=1)[FEATURES_CLIMATE].to_numpy(dtype=float)
+    return crops, means, stds
 
-        row = {"label": crop}
 
-        # --- Climate + Soil features ---
-        for feature in FEATURES_CLIMATE:
-            mean = climate_stats.loc[crop][(feature, "mean")]
-            std = climate_stats.loc[crop][(feature, "std")]
+# ---- CONSTRAINED SAMPLING ----
+def sample_truncated_normal(rng, mean, std, low, high, max_retries=MAX_RETRIES):
+    """Normal draws kept inside [low, high].
+
+    Out-of-range values are redrawn up to max_retries times; values that
+    never land in range fall back to the clipped mean.
+    """
+    values = rng.normal(mean, std)
+    bad = (values < low) | (values > high)
+    for _ in range(max_retries - 1):
+        if not bad.any():
+            break
+        values[bad] = rng.normal(mean[bad], std[bad])
+        bad[bad] = (values[bad] < low[bad]) | (values[bad] > high[bad])
+    if bad.any():
+        values[bad] = np.clip(mean, low, high)[bad]
+    return values
 
-            # Hard biological constraints
-            bounds = {
-                "N": (0, 200),
-                "P": (0, 150),
-                "K": (0, 200),
-                "temperature": (5, 45),
-                "humidity": (20, 100),
-                "ph": (4.5, 8.5),
-                "rainfall": (0, 500)
-            }
 
-            low, high = bounds[feature]
-            row[feature] = sample_constrained(mean, std, low, high)
+# ---- GENERATOR ----
+def generate_chunk(crops, means, stds, n, rng):
+    crop_idx = rng.integers(len(crops), size=n)
+    shape = (n, len(FEATURES_CLIMATE))
+    values = sample_truncated_normal(
+        rng,
+        means[crop_idx],
+        stds[crop_idx],
+        np.broadcast_to(LOW, shape),
+        np.broadcast_to(HIGH, shape),
+    )
+
+    df = pd.DataFrame(values, columns=FEATURES_CLIMATE)
+    df.insert(0, "label", crops[crop_idx])
+    return df
+
+
+def generate_synthetic_dataset(n=N_SAMPLES, climate_path=CROP_CLIMATE_DATA, seed=None):
+    climate_stats, _ = load_real_stats(climate_path)
+    crops, means, stds = stats_arrays(climate_stats)
+    return generate_chunk(crops, means, stds, n, np.random.default_rng(seed))
+
+
+def _chunk_csv(args):
+    crops, means, stds, n, seed_seq, header, decimals = args
+    df = generate_chunk(crops, means, stds, n, np.random.default_rng(seed_seq))
+    if decimals is not None:
+        # Shorter numbers are also much faster to format.
+        df = df.round(decimals)
+    return df.to_csv(index=False, header=header)
+
+
+def write_synthetic_dataset(output_path=OUTPUT_PATH, n=N_SAMPLES, climate_path=CROP_CLIMATE_DATA,
+                            seed=None, chunk_size=CHUNK_SIZE, workers=1, decimals=None):
+    """Generate n rows in chunks and stream them to a CSV.
+
+    Every chunk gets its own seed stream spawned from `seed`, so the output
+    is identical whatever the number of workers. Chunks are generated and
+    formatted as CSV in worker processes (formatting is the slow part) and
+    written in order.
+    """
+    climate_stats, _ = load_real_stats(climate_path)
+    crops, means, stds = stats_arrays(climate_stats)
+
+    sizes = [min(chunk_size, n - start) for start in range(0, n, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(crops, means, stds, size, s, i == 0, decimals) for i, (size, s) in enumerate(zip(sizes, seeds))]
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+
+    with open(tmp_path, "w", newline="") as f:
+        if workers > 1:
+            # A bounded window of futures, written in submission order: only
+            # O(workers) chunks of CSV text are held at once, however large n is
+            # (pool.map would submit every chunk up front and buffer them all).
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                for task in tasks:
+                    if len(pending) >= 2 * workers:
+                        f.write(pending.popleft().result())
+                    pending.append(pool.submit(_chunk_csv, task))
+                while pending:
+                    f.write(pending.popleft().result())
+        else:
+            for task in tasks:
+                f.write(_chunk_csv(task))
+    os.replace(tmp_path, output_path)
+    return output_path
 
-        rows.append(row)
 
-    return pd.DataFrame(rows)
+# ---- MAIN ----
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic agro scenarios.")
+    parser.add_argument("--climate", type=Path, default=CROP_CLIMATE_DATA, help="Crop_recommendation.csv")
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--rows", type=int, default=N_SAMPLES)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating chunks in parallel")
+    parser.add_argument("--decimals", type=int, default=None, help="round values before writing")
+    return parser.parse_args(argv)
 
 
-# ---- MAIN ----
 if __name__ == "__main__":
-    df = generate_synthetic_dataset()
-    Path("data").mkdir(exist_ok=True)
-    df.to_csv(OUTPUT_PATH, index=False)
+    args = parse_args()
+    path = write_synthetic_dataset(
+        args.output, args.rows, args.climate,
+        seed=args.seed, chunk_size=args.chunk_size, workers=args.workers, decimals=args.decimals,
+    )
 
     print("✅ Synthetic dataset generated")
-    print("Shape:", df.shape)
-    print(df.head())
\ No newline at end of file
+    print("Rows:", args.rows, "->", path)
+    print(pd.read_csv(path, nrows=5))